@@ -0,0 +1,63 @@
+"""
+Accuracy-drift and latency report for the EmotionAnalyzer backends.
+Every backend is compared with the full-precision "float" path on the same corpus.
+
+Usage:
+    python benchmarks/bench_emotion_backends.py [model_name_or_dir] [n_messages] [--offline]
+
+Pass a local model directory with --offline to run without network access.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_emotion_batch import make_corpus
+from emotion_analysis import BACKENDS, EmotionAnalyzer
+
+
+def drift_report(reference, candidate):
+    """Label agreement and score differences of candidate results against reference results."""
+    agree = [a['label'] == b['label'] for a, b in zip(reference, candidate)]
+    score_diffs = [abs(a['score'] - b['score']) for a, b in zip(reference, candidate) if a['label'] == b['label']]
+    return {
+        'label_agreement': sum(agree) / len(agree) if agree else 0,
+        'mean_score_diff': sum(score_diffs) / len(score_diffs) if score_diffs else 0,
+        'max_score_diff': max(score_diffs) if score_diffs else 0
+    }
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '--offline']
+    offline = '--offline' in sys.argv
+    model_name = args[0] if args else "tabularisai/multilingual-sentiment-analysis"
+    n_messages = int(args[1]) if len(args) > 1 else 300
+    corpus = make_corpus(n_messages)
+
+    results = {}
+    for backend in BACKENDS:
+        try:
+            start = time.perf_counter()
+            analyzer = EmotionAnalyzer(model_name, backend=backend, local_files_only=offline, lazy=False)
+            load_time = time.perf_counter() - start
+        except ImportError as e:
+            print(f"[{backend}] skipped: {e}")
+            continue
+        analyzer.analyze_emotions(corpus[:16])  # warm-up
+        start = time.perf_counter()
+        results[backend] = analyzer.analyze_emotions(corpus)
+        run_time = time.perf_counter() - start
+        print(f"[{backend}] load {load_time:.2f}s | {n_messages / run_time:.1f} msg/s")
+
+    print("\n=== DRIFT AGAINST FLOAT ===")
+    for backend, outputs in results.items():
+        if backend == "float":
+            continue
+        report = drift_report(results["float"], outputs)
+        print(f"{backend}: label agreement {report['label_agreement']:.2%} | "
+              f"mean score diff {report['mean_score_diff']:.4f} | max score diff {report['max_score_diff']:.4f}")
+
+
+if __name__ == '__main__':
+    main()
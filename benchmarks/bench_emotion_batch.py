@@ -0,0 +1,65 @@
+"""
+Benchmark: EmotionAnalyzer.analyze_emotions (length-bucketed batches) vs. the
+per-item analyze_emotion loop. Intended for CPU-only machines.
+
+Usage:
+    python benchmarks/bench_emotion_batch.py [n_messages] [batch_size]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import torch
+
+from emotion_analysis import EmotionAnalyzer
+
+SENTENCES = [
+    "I am so happy today!",
+    "This is incredibly frustrating and I feel angry.",
+    "I am feeling very sad about the news.",
+    "What a surprise, I did not expect that!",
+    "I am so scared right now.",
+    "The weather is nice today.",
+    "You never listen to me and it makes me furious.",
+    "Thanks for helping me move, I really appreciate it."
+]
+
+
+def make_corpus(n_messages, seed=0):
+    """Deterministic messages of one to eight sentences."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 8)))
+            for _ in range(n_messages)]
+
+
+def main():
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    torch.set_num_threads(os.cpu_count() or 1)
+
+    analyzer = EmotionAnalyzer()
+    corpus = make_corpus(n_messages)
+    analyzer.analyze_emotions(corpus[:batch_size], batch_size=batch_size)  # warm-up
+
+    start = time.perf_counter()
+    looped = [analyzer.analyze_emotion(text) for text in corpus]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = analyzer.analyze_emotions(corpus, batch_size=batch_size)
+    batch_time = time.perf_counter() - start
+
+    label_agreement = sum(a['label'] == b['label'] for a, b in zip(looped, batched)) / n_messages
+    max_score_diff = max(abs(a['score'] - b['score']) for a, b in zip(looped, batched))
+    print(f"Messages: {n_messages} | batch size: {batch_size}")
+    print(f"Per-item loop: {loop_time:.2f}s ({n_messages / loop_time:.1f} msg/s)")
+    print(f"Batched:       {batch_time:.2f}s ({n_messages / batch_time:.1f} msg/s)")
+    print(f"Speedup: {loop_time / batch_time:.2f}x")
+    print(f"Label agreement: {label_agreement:.2%} | max score difference: {max_score_diff:.2e}")
+
+
+if __name__ == '__main__':
+    main()
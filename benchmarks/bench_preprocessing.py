@@ -0,0 +1,55 @@
+"""
+Benchmark: preprocess_text with a shared, warmed TextPreprocessor vs. building a
+new TextPreprocessor on every call (the previous behaviour).
+
+Usage:
+    python benchmarks/bench_preprocessing.py [n_messages]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from text_preprocessing import TextPreprocessor, preprocess_text, warmup
+
+VOCABULARY = [
+    "hey", "are", "you", "coming", "tonight", "i", "was", "thinking", "about", "the",
+    "meetings", "calls", "running", "late", "again", "sorry", "thanks", "for", "helping",
+    "me", "with", "boxes", "it", "is", "fine", "we", "talked", "yesterday", "feelings",
+    "hurt", "when", "ignored", "messages", "plans", "changed", "https://example.com", "ok!!"
+]
+
+
+def make_corpus(n_messages, seed=0):
+    """Deterministic chat-like messages drawn from a small vocabulary."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(3, 30)))
+            for _ in range(n_messages)]
+
+
+def main():
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    corpus = make_corpus(n_messages)
+
+    start = time.perf_counter()
+    rebuilt = [TextPreprocessor().preprocess(text) for text in corpus]
+    rebuilt_time = time.perf_counter() - start
+
+    warmup()
+    start = time.perf_counter()
+    shared = [preprocess_text(text) for text in corpus]
+    shared_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(rebuilt, shared) if a != b)
+    print(f"Messages: {n_messages}")
+    print(f"New preprocessor per call: {rebuilt_time / n_messages * 1e6:.1f} us/call")
+    print(f"Shared preprocessor:       {shared_time / n_messages * 1e6:.1f} us/call")
+    print(f"Speedup: {rebuilt_time / shared_time:.2f}x")
+    print(f"Mismatched results: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
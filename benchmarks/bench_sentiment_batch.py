@@ -0,0 +1,44 @@
+"""
+Benchmark: SentimentAnalyzer.analyze_sentiment_batch (interned tokens, lexicon
+lookups once per distinct token) vs. one analyze_sentiment call per message.
+Also checks that both paths produce identical scores.
+
+Usage:
+    python benchmarks/bench_sentiment_batch.py [n_messages] [processes]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_preprocessing import make_corpus
+from sentiment_analysis import SENTIMENT_KEYS, SentimentAnalyzer
+
+
+def main():
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    corpus = make_corpus(n_messages)
+    analyzer = SentimentAnalyzer()
+
+    start = time.perf_counter()
+    per_text = [analyzer.analyze_sentiment(text) for text in corpus]
+    per_text_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = analyzer.analyze_sentiment_batch(corpus, processes=processes)
+    batch_time = time.perf_counter() - start
+
+    mismatches = sum(1 for i, scores in enumerate(per_text)
+                     if any(batch[key][i] != scores[key] for key in SENTIMENT_KEYS))
+
+    print(f"messages:            {n_messages}")
+    print(f"analyze_sentiment:   {per_text_time:.2f}s ({n_messages / per_text_time:.0f} msg/s)")
+    print(f"batch ({processes} process(es)): {batch_time:.2f}s ({n_messages / batch_time:.0f} msg/s)")
+    print(f"speedup:             {per_text_time / batch_time:.1f}x")
+    print(f"mismatches:          {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
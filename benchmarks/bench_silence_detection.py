@@ -0,0 +1,74 @@
+"""
+Benchmark: NumPy silence detection (silence_detection.split_on_silence) vs.
+pydub.silence.split_on_silence on generated long audio, with the parameters
+convert_audio_to_text uses.
+
+Usage:
+    python benchmarks/bench_silence_detection.py [minutes] [--skip-pydub]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from pydub import AudioSegment
+from pydub.generators import Sine, WhiteNoise
+import pydub.silence
+
+import silence_detection
+
+PARAMS = dict(min_silence_len=500, silence_thresh=-40, keep_silence=200)
+TOLERANCE_MS = 10
+
+
+def make_long_audio(minutes, frame_rate=16000, seed=0):
+    """Speech-like tone bursts separated by low-level noise gaps of random length."""
+    rng = random.Random(seed)
+    pieces = []
+    duration = 0
+    while duration < minutes * 60000:
+        burst = rng.randint(300, 4000)
+        gap = rng.randint(100, 1500)
+        pieces.append(Sine(rng.randint(120, 400), sample_rate=frame_rate)
+                      .to_audio_segment(duration=burst, volume=rng.uniform(-30, -5)))
+        pieces.append(WhiteNoise(sample_rate=frame_rate)
+                      .to_audio_segment(duration=gap, volume=rng.uniform(-70, -45)))
+        duration += burst + gap
+    audio = AudioSegment.empty()
+    for piece in pieces:
+        audio += piece
+    return audio.set_frame_rate(frame_rate)
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    minutes = float(args[0]) if args else 5
+    audio = make_long_audio(minutes)
+
+    start = time.perf_counter()
+    fast = silence_detection.split_on_silence(audio, **PARAMS)
+    fast_time = time.perf_counter() - start
+    print(f"Audio: {len(audio) / 60000:.1f} min")
+    print(f"NumPy segmenter: {fast_time:.3f}s, {len(fast)} chunks")
+
+    if '--skip-pydub' in sys.argv:
+        return 0
+
+    start = time.perf_counter()
+    reference = pydub.silence.split_on_silence(audio, **PARAMS)
+    reference_time = time.perf_counter() - start
+    print(f"pydub:           {reference_time:.3f}s, {len(reference)} chunks")
+    print(f"Speedup: {reference_time / fast_time:.1f}x")
+
+    fast_ranges = silence_detection.detect_nonsilent(audio, PARAMS['min_silence_len'], PARAMS['silence_thresh'])
+    reference_ranges = pydub.silence.detect_nonsilent(audio, PARAMS['min_silence_len'], PARAMS['silence_thresh'])
+    within_tolerance = len(fast_ranges) == len(reference_ranges) and all(
+        abs(a - b) <= TOLERANCE_MS for fa, ra in zip(fast_ranges, reference_ranges) for a, b in zip(fa, ra))
+    print(f"Ranges within {TOLERANCE_MS} ms of pydub: {within_tolerance} (exact: {fast_ranges == reference_ranges})")
+    return 0 if within_tolerance else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Benchmark: peak Python memory (tracemalloc) and time to the first partial transcript
+for whole-file decoding (convert_audio_to_text) vs. streaming ingestion
+(transcribe_stream) at increasing recording lengths. Requires ffmpeg.
+
+Usage:
+    python benchmarks/bench_streaming_ingestion.py [minutes ...]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_silence_detection import make_long_audio
+from bench_transcription import FakeRecognizer
+from speech_to_text import convert_audio_to_text, transcribe_stream
+
+
+def measure(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+def main():
+    durations = [float(arg) for arg in sys.argv[1:]] or [1, 5, 10]
+    recognizer = FakeRecognizer(latency=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for minutes in durations:
+            path = os.path.join(tmp, f"speech_{minutes}.wav")
+            make_long_audio(minutes).export(path, format="wav")
+
+            _, whole_time, whole_peak = measure(lambda: convert_audio_to_text(path, recognizer=recognizer))
+
+            first = {}
+
+            def stream():
+                start = time.perf_counter()
+                for item in transcribe_stream(path, recognizer=recognizer):
+                    first.setdefault('seconds', time.perf_counter() - start)
+                return item
+
+            _, stream_time, stream_peak = measure(stream)
+            print(f"{minutes:>5.1f} min | whole file: {whole_time:6.2f}s, peak {whole_peak:7.1f} MiB"
+                  f" | streaming: {stream_time:6.2f}s, peak {stream_peak:5.1f} MiB,"
+                  f" first transcript after {first.get('seconds', float('nan')):.2f}s")
+
+
+if __name__ == '__main__':
+    main()
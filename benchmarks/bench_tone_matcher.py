@@ -0,0 +1,68 @@
+"""
+Benchmark: single-pass LexiconMatcher vs. the per-list count_word_matches scan.
+
+Usage:
+    python benchmarks/bench_tone_matcher.py [n_messages]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from tone_analysis import ToneAnalyzer
+
+FILLER_WORDS = [
+    "the", "a", "we", "you", "it", "was", "is", "and", "but", "so", "then",
+    "meeting", "call", "message", "plan", "week", "home", "work", "thing",
+    "yesterday", "tonight", "okay", "sorry", "thanks", "please", "later"
+]
+PUNCTUATION = ["", "", "", ".", "!", "?", "...", "!!!", "?!"]
+
+
+def make_corpus(analyzer, n_messages, seed=0):
+    """Deterministic synthetic chat messages mixing lexicon and filler words."""
+    rng = random.Random(seed)
+    lexicon_words = [w for words in analyzer.tone_lexicons.values() for w in words]
+    corpus = []
+    for _ in range(n_messages):
+        words = []
+        for _ in range(rng.randint(3, 40)):
+            word = rng.choice(lexicon_words) if rng.random() < 0.2 else rng.choice(FILLER_WORDS)
+            if rng.random() < 0.05:
+                word = word.upper()
+            words.append(word + rng.choice(PUNCTUATION))
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def legacy_matches(analyzer, text):
+    return {name: analyzer.count_word_matches(text, words)
+            for name, words in analyzer.tone_lexicons.items()}
+
+
+def main():
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    analyzer = ToneAnalyzer()
+    corpus = make_corpus(analyzer, n_messages)
+
+    start = time.perf_counter()
+    legacy = [legacy_matches(analyzer, text) for text in corpus]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = [analyzer.lexicon_matcher.match(text) for text in corpus]
+    compiled_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(legacy, compiled) if a != b)
+    print(f"Messages: {n_messages}")
+    print(f"Per-list scan:   {legacy_time:.3f}s ({legacy_time / n_messages * 1e6:.1f} us/message)")
+    print(f"Compiled matcher: {compiled_time:.3f}s ({compiled_time / n_messages * 1e6:.1f} us/message)")
+    print(f"Speedup: {legacy_time / compiled_time:.2f}x")
+    print(f"Mismatched results: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Benchmark: concurrent chunk transcription in convert_audio_to_text, using a local
+fake recognizer with injected latency instead of the Google API.
+
+Usage:
+    python benchmarks/bench_transcription.py [n_chunks] [latency_seconds]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from pydub import AudioSegment
+from pydub.generators import Sine
+
+from speech_to_text import convert_audio_to_text
+
+
+class FakeRecognizer:
+    """Recognizer backend that sleeps for `latency` seconds and names the chunk by its duration."""
+    def __init__(self, latency=0.2):
+        self.latency = latency
+
+    def recognize(self, audio_data):
+        time.sleep(self.latency)
+        duration_ms = len(audio_data.frame_data) * 1000 // (audio_data.sample_rate * audio_data.sample_width)
+        return f"chunk{duration_ms // 100}"
+
+
+def make_speech_like_audio(n_chunks, seed_ms=700):
+    """Tone bursts of increasing length separated by one second of silence."""
+    audio = AudioSegment.silent(duration=300)
+    for i in range(n_chunks):
+        audio += Sine(220 + 20 * i).to_audio_segment(duration=seed_ms + 100 * i, volume=-10)
+        audio += AudioSegment.silent(duration=1000)
+    return audio
+
+
+def main():
+    n_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    recognizer = FakeRecognizer(latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "speech.wav")
+        make_speech_like_audio(n_chunks).export(path, format="wav")
+
+        timings = {}
+        transcripts = {}
+        for workers in (1, 4, 8):
+            start = time.perf_counter()
+            transcripts[workers] = convert_audio_to_text(path, recognizer=recognizer, max_workers=workers)
+            timings[workers] = time.perf_counter() - start
+
+    print(f"Chunks: {n_chunks} | injected latency: {latency:.2f}s")
+    for workers, elapsed in timings.items():
+        print(f"max_workers={workers}: {elapsed:.2f}s ({timings[1] / elapsed:.2f}x)")
+    same_order = len(set(transcripts.values())) == 1
+    print(f"Transcripts identical across worker counts: {same_order}")
+    print(f"Transcript: {transcripts[1]}")
+    return 0 if same_order else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Load test for src/server.py: p50/p99 latency of answered requests, throughput and
+503 rejections of POST /analyze at increasing client concurrency, plus the average
+inference batch size the server formed (from /metrics). Each client keeps one
+keep-alive connection and sends its next request as soon as the previous one answers.
+
+Start the server first, e.g.:
+    python src/server.py --port 8080
+Then:
+    python benchmarks/load_test_server.py [--port 8080] [--levels 1 4 16 64] [--requests 400]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_preprocessing import make_corpus
+
+
+async def request(reader, writer, host, method, path, payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, texts, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for text in texts:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host, 'POST', '/analyze', {'text': text})
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def batch_totals(host, port):
+    """(batches, texts) the server has run so far, from /metrics."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, body = await request(reader, writer, host, 'GET', '/metrics')
+    finally:
+        writer.close()
+    totals = {}
+    for line in body.decode('utf-8').splitlines():
+        if line.startswith(('analysis_batch_size_count', 'analysis_batch_size_sum')):
+            name, value = line.split()
+            totals[name] = float(value)
+    return totals.get('analysis_batch_size_count', 0), totals.get('analysis_batch_size_sum', 0)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+async def run_level(host, port, concurrency, corpus):
+    latencies = []
+    statuses = {}
+    batches_before, texts_before = await batch_totals(host, port)
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, corpus[i::concurrency], latencies, statuses)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    batches_after, texts_after = await batch_totals(host, port)
+    batches = batches_after - batches_before
+    mean_batch = (texts_after - texts_before) / batches if batches else 0
+    print(f"{concurrency:>11} {percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.99) * 1000:>9.1f} "
+          f"{len(latencies) / elapsed:>9.0f} {mean_batch:>10.1f} {statuses.get(503, 0):>6}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument('--requests', type=int, default=400, help="Requests per concurrency level")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.requests)
+    print(f"{'concurrency':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'req/s':>9} {'mean batch':>10} {'503s':>6}")
+    for concurrency in args.levels:
+        await run_level(args.host, args.port, concurrency, corpus)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,347 @@
+"""
+Reproducible benchmark suite: throughput, per-call latency and tracemalloc peak of
+every analyzer, the flag rules, the full pipeline and the audio path, on synthetic
+inputs from benchmarks/synthetic.py. Runs offline: transcription uses a stub
+recognizer, and the emotion model is only benchmarked when --emotion-model points
+at a local model directory.
+
+Usage:
+    python benchmarks/suite.py run [--messages 2000] [--audio-seconds 60] [--output results.json]
+                                   [--emotion-model DIR] [--cases sentiment tone ...]
+    python benchmarks/suite.py compare baseline.json results.json [--tolerance 0.15]
+
+compare exits with status 1 when any case is slower, has a higher p95 latency or
+a higher memory peak than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_transcription import FakeRecognizer
+from synthetic import LENGTH_DISTRIBUTIONS, make_corpus, make_speech_audio
+
+SUITE_VERSION = 1
+SPLIT_PARAMS = dict(min_silence_len=500, silence_thresh=-40, keep_silence=200)
+
+
+class Case:
+    """
+    One benchmark: setup(context) returns (items, calls), where calls are
+    zero-argument functions timed one by one and items is how much work they do
+    together (texts, or seconds of audio).
+    """
+    def __init__(self, name, unit, setup):
+        self.name = name
+        self.unit = unit
+        self.setup = setup
+
+
+def _per_text(function):
+    return lambda context: (len(context['corpus']), [lambda text=text: function(context, text)
+                                                      for text in context['corpus']])
+
+
+def _batched(function, batch_size=256):
+    def setup(context):
+        corpus = context['corpus']
+        batches = [corpus[i:i + batch_size] for i in range(0, len(corpus), batch_size)]
+        return len(corpus), [lambda batch=batch: function(context, batch) for batch in batches]
+    return setup
+
+
+def _flag_inputs(context):
+    if 'flag_inputs' not in context:
+        sentiment = context['sentiment'].analyze_sentiment_batch(context['corpus'])
+        tones = context['tone'].analyze_tone_batch(context['corpus'])
+        labels = [context['sentiment'].get_sentiment_label(score) for score in sentiment['compound']]
+        codes = context['flags'].encode(labels, [None] * len(labels), list(tones['dominant_tone']))
+        scores = {'compound': sentiment['compound'], 'tone_confidence': tones['confidence_level']}
+        context['flag_inputs'] = codes, scores
+    return context['flag_inputs']
+
+
+def _flags_batch(context):
+    codes, scores = _flag_inputs(context)
+    size = 1024
+    calls = [lambda start=start: context['flags'].detect_flags_batch(
+                 *(array[start:start + size] for array in codes),
+                 scores={key: values[start:start + size] for key, values in scores.items()})
+             for start in range(0, len(codes[0]), size)]
+    return len(codes[0]), calls
+
+
+def _emotion(context):
+    if context['emotion'] is None:
+        return 0, []
+    return _batched(lambda context, batch: context['emotion'].analyze_emotions(batch), batch_size=32)(context)
+
+
+def _audio_split(context):
+    from silence_detection import speech_ranges
+    audio = context['audio']
+    return len(audio) / 1000, [lambda: speech_ranges(audio, **SPLIT_PARAMS)]
+
+
+def _audio_stream_split(context):
+    from silence_detection import StreamingSplitter
+    audio = context['audio']
+    window = audio.frame_rate * audio.sample_width  # one second of PCM
+    pcm = audio.raw_data
+
+    def run():
+        splitter = StreamingSplitter(audio.frame_rate, audio.sample_width, audio.channels, **SPLIT_PARAMS)
+        chunks = []
+        for start in range(0, len(pcm), window):
+            chunks.extend(splitter.feed(pcm[start:start + window]))
+        return chunks + splitter.finish()
+    return len(audio) / 1000, [run]
+
+
+def _transcription(context):
+    from speech_to_text import iter_transcription
+    audio = context['audio']
+    recognizer = FakeRecognizer(latency=0)
+    return len(audio) / 1000, [lambda: list(iter_transcription(audio, recognizer=recognizer))]
+
+
+CASES = [
+    Case('tokenize', 'texts', _per_text(lambda context, text: context['preprocessor'].token_stream(text))),
+    Case('preprocess', 'texts', _per_text(lambda context, text: context['preprocessor'].preprocess(text))),
+    Case('sentiment', 'texts', _per_text(lambda context, text: context['sentiment'].analyze_sentiment(text))),
+    Case('sentiment_batch', 'texts', _batched(lambda context, batch: context['sentiment'].analyze_sentiment_batch(batch))),
+    Case('tone', 'texts', _per_text(lambda context, text: context['tone'].analyze_tone(text))),
+    Case('tone_batch', 'texts', _batched(lambda context, batch: context['tone'].analyze_tone_batch(batch))),
+    Case('flags_batch', 'texts', _flags_batch),
+    Case('emotion', 'texts', _emotion),
+    Case('pipeline', 'texts', _per_text(lambda context, text: context['pipeline'].run(text))),
+    Case('audio_split', 'audio_s', _audio_split),
+    Case('audio_stream_split', 'audio_s', _audio_stream_split),
+    Case('transcription', 'audio_s', _transcription),
+]
+CASE_NAMES = [case.name for case in CASES]
+
+
+class Context(dict):
+    """
+    Synthetic inputs and freshly built analyzers without result caches, each created
+    the first time a case asks for it. A partial run (--cases tone) therefore never
+    loads corpora or models it does not use. Analyzers load their NLTK data on the
+    first call, which run_case makes before timing anything.
+    """
+    def __init__(self, args):
+        super().__init__()
+        self.args = args
+
+    def __missing__(self, key):
+        value = self[key] = getattr(self, f'_build_{key}')()
+        return value
+
+    def _build_corpus(self):
+        args = self.args
+        return make_corpus(args.messages, args.distribution, args.min_words, args.max_words, args.mean_words, args.seed)
+
+    def _build_audio(self):
+        return make_speech_audio(self.args.audio_seconds, seed=self.args.seed)
+
+    def _build_preprocessor(self):
+        from text_preprocessing import get_preprocessor
+        return get_preprocessor()
+
+    def _build_sentiment(self):
+        from sentiment_analysis import SentimentAnalyzer
+        return SentimentAnalyzer()
+
+    def _build_tone(self):
+        from tone_analysis import ToneAnalyzer
+        return ToneAnalyzer()
+
+    def _build_flags(self):
+        from red_green_flag import FlagDetector
+        return FlagDetector()
+
+    def _build_emotion(self):
+        if not self.args.emotion_model:
+            return None
+        from emotion_analysis import EmotionAnalyzer
+        return EmotionAnalyzer(self.args.emotion_model, local_files_only=True, lazy=False)
+
+    def _build_pipeline(self):
+        from pipeline import AnalysisPipeline
+        return AnalysisPipeline(self['sentiment'], self['emotion'], self['tone'], self['flags'],
+                                preprocessor=self['preprocessor'])
+
+    def close(self):
+        if 'pipeline' in self:
+            self['pipeline'].close()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def run_case(case, context, repeat):
+    """
+    Time every call over `repeat` passes (throughput from the fastest pass), then
+    run one more pass under tracemalloc for the memory peak, so tracing does not
+    slow down the timed passes.
+    """
+    items, calls = case.setup(context)
+    if not calls:
+        return None
+    calls[0]()  # warm caches and lazy imports outside the measurement
+
+    latencies = []
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for call in calls:
+            call_start = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - call_start)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    for call in calls:
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'unit': case.unit,
+        'items': round(items, 3),
+        'calls': len(calls),
+        'seconds': round(best, 6),
+        'throughput': round(items / best, 3) if best else 0.0,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 4),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 4),
+        'peak_mib': round(peak / 2 ** 20, 3)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    config = {key: getattr(args, key) for key in ('messages', 'distribution', 'min_words', 'max_words', 'mean_words',
+                                                  'audio_seconds', 'seed', 'repeat', 'emotion_model')}
+    context = Context(args)
+    selected = [case for case in CASES if not args.cases or case.name in args.cases]
+
+    results = {}
+    print(f"{'case':<20} {'throughput':>16} {'p50 (ms)':>10} {'p95 (ms)':>10} {'peak (MiB)':>11}")
+    for case in selected:
+        result = run_case(case, context, args.repeat)
+        if result is None:
+            print(f"{case.name:<20} skipped")
+            continue
+        results[case.name] = result
+        print(f"{case.name:<20} {result['throughput']:>10.1f} {case.unit + '/s':<5} {result['p50_ms']:>10.3f} "
+              f"{result['p95_ms']:>10.3f} {result['peak_mib']:>11.2f}")
+    context.close()
+
+    report = {
+        'suite_version': SUITE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'machine': platform.machine(), 'cpus': os.cpu_count(), 'commit': git_commit()},
+        'config': config,
+        'cases': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+def compare_reports(baseline, current, tolerance=0.15, memory_tolerance=0.10, min_latency_ms=0.05):
+    """
+    [(case, metric, baseline value, current value, change, regressed)] for every case
+    in both reports. Lower throughput, or higher p95 latency or memory peak, beyond
+    the tolerance (a fraction) is a regression; latency changes smaller than
+    min_latency_ms are treated as noise.
+    """
+    rows = []
+    for name, base in baseline['cases'].items():
+        result = current['cases'].get(name)
+        if result is None:
+            continue
+        for metric, higher_is_worse, limit in (('throughput', False, tolerance), ('p95_ms', True, tolerance),
+                                               ('peak_mib', True, memory_tolerance)):
+            old, new = base[metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            worse = change > limit if higher_is_worse else change < -limit
+            if metric == 'p95_ms' and new - old < min_latency_ms:
+                worse = False
+            rows.append((name, metric, old, new, change, worse))
+    return rows
+
+
+def compare(args):
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    if baseline.get('config') != current.get('config'):
+        print("Warning: the runs used different settings, so the numbers may not be comparable")
+    missing = sorted(set(baseline['cases']) - set(current['cases']))
+    if missing:
+        print(f"Not in the current run: {', '.join(missing)}")
+
+    rows = compare_reports(baseline, current, args.tolerance, args.memory_tolerance)
+    print(f"{'case':<20} {'metric':<11} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, metric, old, new, change, worse in rows:
+        print(f"{name:<20} {metric:<11} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{'  REGRESSION' if worse else ''}")
+    regressions = sum(1 for row in rows if row[-1])
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproducible benchmark suite")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Run the benchmarks")
+    run_parser.add_argument('--messages', type=int, default=2000, help="Messages in the text corpus")
+    run_parser.add_argument('--distribution', choices=LENGTH_DISTRIBUTIONS, default="lognormal",
+                            help="Message length distribution")
+    run_parser.add_argument('--min-words', type=int, default=3)
+    run_parser.add_argument('--max-words', type=int, default=60)
+    run_parser.add_argument('--mean-words', type=int, default=14)
+    run_parser.add_argument('--audio-seconds', type=float, default=60, help="Length of the synthetic recording")
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--repeat', type=int, default=5, help="Timed passes per case")
+    run_parser.add_argument('--emotion-model', default=None,
+                            help="Local model directory for the emotion case (skipped without one)")
+    run_parser.add_argument('--cases', nargs='+', choices=CASE_NAMES, default=None, help="Only run these cases")
+    run_parser.add_argument('--output', default=None, help="Write results to this JSON file")
+
+    compare_parser = commands.add_parser('compare', help="Compare results against a baseline")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--tolerance', type=float, default=0.15,
+                                help="Allowed throughput/latency change as a fraction")
+    compare_parser.add_argument('--memory-tolerance', type=float, default=0.10,
+                                help="Allowed memory peak increase as a fraction")
+
+    args = parser.parse_args(argv)
+    return run(args) if args.command == 'run' else compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Deterministic synthetic inputs for the benchmark suite: chat-like text corpora with
+a configurable size and message-length distribution, and speech-like mono 16-bit
+audio (harmonic voiced bursts separated by low-level noise gaps) as an AudioSegment
+or WAV file. The same arguments and seed always give the same data, so results from
+different runs and machines are comparable.
+
+Usage:
+    python benchmarks/synthetic.py corpus 1000 --distribution lognormal > corpus.txt
+    python benchmarks/synthetic.py wav 60 speech.wav
+"""
+import argparse
+import math
+import random
+import sys
+import wave
+
+import numpy as np
+from pydub import AudioSegment
+
+LENGTH_DISTRIBUTIONS = ("uniform", "lognormal", "fixed")
+
+NEUTRAL_WORDS = [
+    "hey", "are", "you", "coming", "tonight", "i", "was", "thinking", "about", "the",
+    "meetings", "calls", "running", "late", "again", "we", "talked", "yesterday", "plans",
+    "changed", "it", "is", "with", "boxes", "me", "for", "when", "messages", "dinner", "work"
+]
+POSITIVE_WORDS = [
+    "thanks", "love", "appreciate", "great", "happy", "support", "respect", "understand",
+    "wonderful", "proud", "glad", "sorry", "helping", "together", "trust"
+]
+NEGATIVE_WORDS = [
+    "hate", "stupid", "never", "always", "angry", "hurt", "ignored", "worthless", "shut",
+    "blame", "fault", "terrible", "scared", "alone", "whatever"
+]
+DECORATIONS = ["!", "!!", "?", "...", "ok!!", "https://example.com", "WHY", "NOW", ":)"]
+
+
+def message_lengths(n_messages, distribution="lognormal", min_words=3, max_words=60, mean_words=14, seed=0):
+    """Word counts per message, clipped to [min_words, max_words]."""
+    if distribution not in LENGTH_DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution '{distribution}', expected one of {LENGTH_DISTRIBUTIONS}")
+    rng = random.Random(seed)
+    if distribution == "fixed":
+        return [max(min_words, min(max_words, mean_words))] * n_messages
+    if distribution == "uniform":
+        return [rng.randint(min_words, max_words) for _ in range(n_messages)]
+    # Most chat messages are short with a long tail of long ones
+    sigma = 0.6
+    mu = math.log(mean_words) - sigma ** 2 / 2
+    return [max(min_words, min(max_words, round(rng.lognormvariate(mu, sigma)))) for _ in range(n_messages)]
+
+
+def make_corpus(n_messages, distribution="lognormal", min_words=3, max_words=60, mean_words=14, seed=0):
+    """
+    Chat-like messages mixing neutral, positive and negative words with punctuation,
+    shouting and links, so every analyzer and flag rule has something to match.
+    """
+    rng = random.Random(f"words:{seed}")  # independent of the length draws
+    corpus = []
+    for length in message_lengths(n_messages, distribution, min_words, max_words, mean_words, seed):
+        mood = rng.choice((POSITIVE_WORDS, NEGATIVE_WORDS, NEUTRAL_WORDS))
+        words = []
+        for _ in range(length):
+            roll = rng.random()
+            if roll < 0.25:
+                words.append(rng.choice(mood))
+            elif roll < 0.3:
+                words.append(rng.choice(DECORATIONS))
+            else:
+                words.append(rng.choice(NEUTRAL_WORDS))
+        if rng.random() < 0.1:
+            words = [word.upper() for word in words]
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def make_speech_audio(seconds, frame_rate=16000, min_burst_ms=300, max_burst_ms=4000,
+                      min_gap_ms=100, max_gap_ms=1500, seed=0):
+    """
+    Mono 16-bit AudioSegment of roughly `seconds` of speech-like audio: bursts of a
+    few harmonics with a syllable-rate envelope, separated by noise gaps at -70 to
+    -45 dBFS (silent for the -40 dBFS threshold the transcription path uses).
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * frame_rate)
+    samples = np.empty(total, dtype=np.float64)
+    position = 0
+    while position < total:
+        burst = min(total - position, int(rng.integers(min_burst_ms, max_burst_ms + 1) * frame_rate / 1000))
+        t = np.arange(burst) / frame_rate
+        pitch = rng.uniform(100, 250)
+        voice = sum(np.sin(2 * np.pi * pitch * harmonic * t) / harmonic for harmonic in (1, 2, 3))
+        envelope = 0.6 + 0.4 * np.sin(2 * np.pi * rng.uniform(3, 6) * t) ** 2
+        samples[position:position + burst] = voice * envelope * 10 ** (rng.uniform(-25, -8) / 20) / 1.84
+        position += burst
+
+        gap = min(total - position, int(rng.integers(min_gap_ms, max_gap_ms + 1) * frame_rate / 1000))
+        samples[position:position + gap] = rng.standard_normal(gap) * 10 ** (rng.uniform(-70, -45) / 20) / 3
+        position += gap
+
+    pcm = (np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes()
+    return AudioSegment(data=pcm, sample_width=2, frame_rate=frame_rate, channels=1)
+
+
+def write_wav(path, audio):
+    """Write an AudioSegment as a PCM WAV without ffmpeg."""
+    with wave.open(path, 'wb') as output:
+        output.setnchannels(audio.channels)
+        output.setsampwidth(audio.sample_width)
+        output.setframerate(audio.frame_rate)
+        output.writeframes(audio.raw_data)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark inputs")
+    commands = parser.add_subparsers(dest='command', required=True)
+    corpus_parser = commands.add_parser('corpus', help="Print a text corpus, one message per line")
+    corpus_parser.add_argument('n_messages', type=int)
+    corpus_parser.add_argument('--distribution', choices=LENGTH_DISTRIBUTIONS, default="lognormal")
+    corpus_parser.add_argument('--min-words', type=int, default=3)
+    corpus_parser.add_argument('--max-words', type=int, default=60)
+    corpus_parser.add_argument('--mean-words', type=int, default=14)
+    corpus_parser.add_argument('--seed', type=int, default=0)
+    wav_parser = commands.add_parser('wav', help="Write a speech-like WAV file")
+    wav_parser.add_argument('seconds', type=float)
+    wav_parser.add_argument('path')
+    wav_parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == 'corpus':
+        for message in make_corpus(args.n_messages, args.distribution, args.min_words, args.max_words,
+                                   args.mean_words, args.seed):
+            sys.stdout.write(message + "\n")
+    else:
+        write_wav(args.path, make_speech_audio(args.seconds, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,16 @@
 import streamlit as st
-from speech_to_text import convert_audio_to_text
-from text_preprocessing import preprocess_text
+from speech_to_text import RECOGNIZER_BACKENDS, can_stream, get_recognizer, iter_transcription, transcribe_stream
+from live_analysis import analyze_transcript_stream
+from text_preprocessing import get_preprocessor
 from sentiment_analysis import SentimentAnalyzer
 from emotion_analysis import EmotionAnalyzer
 from tone_analysis import ToneAnalyzer
 from red_green_flag import FlagDetector
+from result_cache import ResultCache
+from pipeline import AnalysisPipeline
+from segmented_analysis import POOLINGS, SEGMENTATIONS, SegmentedAnalyzer
+from assets import load_timings, warmup_in_background
+from instrumentation import profile_call, stage_summary
 import os
 
 # Page configuration
@@ -18,17 +24,36 @@ st.set_page_config(
 st.title("🛡️ BRAVE HAVEN")
 st.markdown("**Analyze text and voice input for behavioral red/green flags using advanced AI**")
 
-# Initialize analyzers (with caching to improve performance)
+# Shared result cache: in-process LRU plus an optional SQLite tier
+# (set BRAVE_HAVEN_CACHE_DB to a file path to persist results across restarts)
+@st.cache_resource
+def load_result_cache():
+    return ResultCache(max_entries=2048, db_path=os.environ.get("BRAVE_HAVEN_CACHE_DB"))
+
+# Initialize analyzers (with caching to improve performance). Construction is cheap:
+# corpora and models load in a background thread while the page renders, and a
+# request that arrives first simply loads whatever it needs itself.
 @st.cache_resource
 def load_analyzers():
-    return {
-        'sentiment': SentimentAnalyzer(),
-        'emotion': EmotionAnalyzer(),
-        'tone': ToneAnalyzer(),
+    cache = load_result_cache()
+    analyzers = {
+        'sentiment': SentimentAnalyzer(cache=cache),
+        'emotion': EmotionAnalyzer(cache=cache),
+        'tone': ToneAnalyzer(cache=cache),
         'flag': FlagDetector()
     }
+    warmup_in_background(get_preprocessor(), analyzers['sentiment'], analyzers['emotion'])
+    return analyzers
+
+@st.cache_resource
+def load_pipeline():
+    analyzers = load_analyzers()
+    return AnalysisPipeline(analyzers['sentiment'], analyzers['emotion'], analyzers['tone'], analyzers['flag'],
+                            cache=load_result_cache())
 
 analyzers = load_analyzers()
+pipeline = load_pipeline()
+result_cache = load_result_cache()
 
 # Sidebar for sample texts and information
 st.sidebar.header("📝 Sample Texts for Testing")
@@ -58,6 +83,39 @@ This AI system analyzes human communication to identify potential behavioral pat
 - **🚩 Flag Detection**: Red flags (concerning) or green flags (positive)
 """)
 
+with st.sidebar.expander("🗄️ Result Cache"):
+    cache_stats = result_cache.stats()
+    st.write(f"- Hits: {cache_stats['memory_hits'] + cache_stats['disk_hits']}")
+    st.write(f"- Misses: {cache_stats['misses']}")
+    st.write(f"- Hit rate: {cache_stats['hit_rate']:.0%}")
+
+rule_file = analyzers['flag'].rule_file
+if rule_file is not None and rule_file.last_error:
+    st.sidebar.warning(f"Flag rules not reloaded, keeping the previous version: {rule_file.last_error}")
+
+with st.sidebar.expander("⏱️ Startup"):
+    for asset, seconds in load_timings().items():
+        if asset.startswith('failed:'):
+            st.write(f"- {asset[len('failed:'):]}: failed to load")
+        else:
+            st.write(f"- {asset}: {seconds:.2f}s")
+
+with st.sidebar.expander("📈 Timing breakdown"):
+    stage_rows = stage_summary()
+    if stage_rows:
+        st.table(stage_rows)
+    else:
+        st.write("No requests analyzed yet.")
+
+# Opt-in, since profiling slows the request down and runs every stage inline
+profile_request = st.sidebar.checkbox("Profile this request")
+
+with st.sidebar.expander("📜 Long texts"):
+    segment_request = st.checkbox("Analyze by segment",
+                                  help="Score each sentence or word window separately and show where flags occur")
+    segmentation = st.selectbox("Segments:", SEGMENTATIONS)
+    pooling = st.selectbox("Pooling:", POOLINGS, index=POOLINGS.index("weighted"))
+
 # Main interface
 col1, col2 = st.columns([2, 1])
 
@@ -70,6 +128,9 @@ with col1:
 
     # Audio file upload
     audio_file = st.file_uploader("Or upload an audio file (WAV, MP3, M4A):", type=["wav", "mp3", "m4a"])
+    recognizer_labels = {"google": "Google Web Speech (online)", "whisper": "Whisper (offline, runs locally)"}
+    recognizer_backend = st.selectbox("Speech recognizer:", list(RECOGNIZER_BACKENDS),
+                                      format_func=lambda name: recognizer_labels.get(name, name))
 
 with col2:
     st.markdown("### 🎯 Quick Actions")
@@ -84,16 +145,50 @@ if analyze_button:
     
     # Handle audio file
     if audio_file:
-        with st.spinner("🎵 Converting audio to text..."):
-            # Save the uploaded audio file temporarily
-            audio_path = os.path.join("temp_audio", audio_file.name)
-            os.makedirs("temp_audio", exist_ok=True)
-            with open(audio_path, "wb") as f:
-                f.write(audio_file.getbuffer())
-            
-            input_text = convert_audio_to_text(audio_path)
-            st.success(f"**Transcribed Text:** {input_text}")
-            os.remove(audio_path) # Clean up temp file
+        # Decode the upload straight from memory (no temporary files) and show the
+        # partial transcript with rolling sentiment/tone flags as each chunk finishes
+        audio_format = os.path.splitext(audio_file.name)[1].lstrip(".").lower() or None
+        live = st.empty()
+        snapshot = None
+        failed_chunks = []
+        try:
+            with st.spinner("🎙️ Loading speech recognizer..."):
+                recognizer = get_recognizer(recognizer_backend)
+            # Without ffmpeg, pydub still decodes WAV natively in iter_transcription
+            if can_stream(audio_format):
+                chunks = transcribe_stream(audio_file.getbuffer(), recognizer=recognizer, errors=failed_chunks)
+            else:
+                chunks = iter_transcription(audio_file.getbuffer(), recognizer=recognizer, format=audio_format,
+                                            errors=failed_chunks)
+            for chunk_index, start_ms, end_ms, text, snapshot in analyze_transcript_stream(
+                    chunks, analyzers['sentiment'], analyzers['tone'], analyzers['flag']):
+                with live.container():
+                    st.caption(f"🎵 Converting audio to text... {end_ms / 1000:.0f}s transcribed")
+                    st.write(f"**Partial Transcript:** {snapshot['transcript']}")
+                    st.write(f"**Live Assessment:** {snapshot['flags']['overall_status']} | "
+                             f"Sentiment: {snapshot['sentiment_label']} | "
+                             f"Tone: {snapshot['tone']['dominant_tone'].title()}")
+                    for flag in snapshot['flags']['red_flags']:
+                        st.error(f"• {flag}")
+                    for flag in snapshot['flags']['green_flags']:
+                        st.success(f"• {flag}")
+            live.empty()
+            if snapshot is None:
+                st.error("Error: No speech detected or audio too short.")
+            elif not snapshot['transcript']:
+                # Nothing to analyze: every chunk failed or none contained recognizable speech
+                if failed_chunks:
+                    st.error(f"Error: none of the audio could be transcribed ({failed_chunks[0][1]})")
+                else:
+                    st.error("Error: No recognizable speech in the audio.")
+            else:
+                if failed_chunks:
+                    st.warning(f"⚠️ {len(failed_chunks)} audio chunk(s) could not be transcribed and were skipped "
+                               f"(first error: {failed_chunks[0][1]})")
+                input_text = snapshot['transcript']
+                st.success(f"**Transcribed Text:** {input_text}")
+        except Exception as e:
+            st.error(f"Error processing audio file: {e}")
     
     # Handle text input
     elif text_input:
@@ -103,13 +198,42 @@ if analyze_button:
         st.markdown("---")
         st.header("📊 Analysis Results")
         
+        # Clean and tokenize once; every analyzer shares the same token stream, and
+        # sentiment, emotion and tone run concurrently
+        with st.spinner("Analyzing text..."):
+            if profile_request:
+                results, profile_report = profile_call(pipeline.run, input_text, concurrent=False)
+            else:
+                results = pipeline.run(input_text)
+        if profile_request:
+            with st.expander("🔬 Profile"):
+                st.code(profile_report)
+
+        if segment_request:
+            segmented_analyzer = SegmentedAnalyzer(analyzers['sentiment'], analyzers['emotion'], analyzers['tone'],
+                                                   analyzers['flag'], segmentation=segmentation, pooling=pooling)
+            with st.spinner("Analyzing segments..."):
+                segmented = segmented_analyzer.analyze(input_text)
+            with st.expander("🕒 Segment timeline", expanded=True):
+                st.write(f"**Pooled ({pooling}):** {segmented['flags']['overall_status']} | "
+                         f"{segmented['sentiment_label']} | {segmented['emotion_label']} | "
+                         f"{segmented['tone']['dominant_tone']}")
+                if segmented['timeline']:
+                    st.line_chart([entry['sentiment'] for entry in segmented['timeline']])
+                    st.table([{'#': entry['index'], 'text': entry['text'], 'status': entry['flags']['overall_status'],
+                               'sentiment': entry['sentiment_label'], 'emotion': entry['emotion_label'],
+                               'tone': entry['dominant_tone']} for entry in segmented['timeline']])
+                if segmented['red_flag_segments']:
+                    st.warning(f"Red flags in segments {', '.join(map(str, segmented['red_flag_segments']))}")
+        with st.expander("⏱️ Stage timings"):
+            st.write(" | ".join(f"{stage}: {seconds * 1000:.1f} ms" for stage, seconds in results['timings'].items()))
+        
         # Create tabs for organized display
         tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📝 Preprocessing", "😊 Sentiment", "🎭 Emotion", "🎯 Tone", "🚩 Flags", "📋 Summary"])
         
         with tab1:
             st.subheader("Text Preprocessing")
-            with st.spinner("Processing text..."):
-                processed_data = preprocess_text(input_text)
+            processed_data = results['preprocessing']
             
             col1, col2 = st.columns(2)
             with col1:
@@ -125,9 +249,8 @@ if analyze_button:
 
         with tab2:
             st.subheader("Sentiment Analysis")
-            with st.spinner("Analyzing sentiment..."):
-                sentiment_scores = analyzers['sentiment'].analyze_sentiment(processed_data["cleaned_text"])
-                sentiment_label = analyzers['sentiment'].get_sentiment_label(sentiment_scores["compound"])
+            sentiment_scores = results['sentiment']
+            sentiment_label = results['sentiment_label']
             
             # Display sentiment with color coding
             if sentiment_label == "Positive":
@@ -148,13 +271,9 @@ if analyze_button:
 
         with tab3:
             st.subheader("Emotion Analysis")
-            with st.spinner("Detecting emotions..."):
-                emotion_result = analyzers['emotion'].analyze_emotion(processed_data["cleaned_text"])
-            
-            emotion_label = "neutral"  # Default
+            emotion_result = results['emotion']
+            emotion_label = results['emotion_label']  # "neutral" when no emotion was detected
             if emotion_result:
-                emotion_label = emotion_result["label"]
-                
                 # Display emotion with appropriate emoji
                 emotion_emojis = {
                     "joy": "😊", "anger": "😠", "fear": "😨", 
@@ -172,8 +291,7 @@ if analyze_button:
 
         with tab4:
             st.subheader("Tone Analysis")
-            with st.spinner("Analyzing tone..."):
-                tone_result = analyzers['tone'].analyze_tone(processed_data["cleaned_text"])
+            tone_result = results['tone']
             
             dominant_tone = tone_result["dominant_tone"]
             
@@ -203,8 +321,7 @@ if analyze_button:
 
         with tab5:
             st.subheader("Red/Green Flag Detection")
-            with st.spinner("Detecting flags..."):
-                flag_result = analyzers['flag'].detect_flags(sentiment_label, emotion_label, dominant_tone)
+            flag_result = results['flags']
             
             # Display overall status with prominent styling
             status = flag_result["overall_status"]
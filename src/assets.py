@@ -0,0 +1,201 @@
+"""
+Model and corpus assets: where they are loaded from, offline mode and load timings.
+
+Analyzers load their NLTK data and Hugging Face models lazily on first use (or in
+warmup()). Assets are looked up in a local bundle first, created with:
+
+    python src/assets.py prefetch [--dir assets] [--model NAME ...]
+
+Environment:
+- BRAVE_HAVEN_ASSETS_DIR: bundle directory (default: <project>/assets)
+- BRAVE_HAVEN_OFFLINE=1: strict offline mode; nothing is downloaded and a missing
+  asset raises AssetUnavailableError immediately instead of trying the network
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import nltk
+
+from instrumentation import REGISTRY
+
+# NLTK resources the analyzers use: name -> path checked with nltk.data.find
+NLTK_RESOURCES = {
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+    'punkt': 'tokenizers/punkt',
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet'
+}
+
+# Emotion model (EmotionAnalyzer) and offline speech recognizer (WhisperRecognizer)
+DEFAULT_MODELS = ("tabularisai/multilingual-sentiment-analysis", "openai/whisper-tiny.en")
+
+DEFAULT_ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+
+class AssetUnavailableError(LookupError):
+    """A model or corpus is not available locally and may not be downloaded."""
+
+_configured = False
+_lock = threading.Lock()
+_load_timings = {}
+_process_start = time.perf_counter()
+
+def assets_dir():
+    return os.environ.get('BRAVE_HAVEN_ASSETS_DIR') or DEFAULT_ASSETS_DIR
+
+def offline_mode():
+    return os.environ.get('BRAVE_HAVEN_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+def configure():
+    """
+    Put the local bundle on NLTK's search path and, in offline mode, switch the
+    Hugging Face libraries to offline too. Called by the loaders; safe to repeat.
+    """
+    global _configured
+    if _configured:
+        return
+    with _lock:
+        if _configured:
+            return
+        nltk_dir = os.path.join(assets_dir(), 'nltk_data')
+        if os.path.isdir(nltk_dir) and nltk_dir not in nltk.data.path:
+            nltk.data.path.insert(0, nltk_dir)
+        if offline_mode():
+            os.environ.setdefault('HF_HUB_OFFLINE', '1')
+            os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+        _configured = True
+
+def ensure_nltk_resource(name):
+    """
+    Make sure an NLTK resource (a key of NLTK_RESOURCES) can be loaded, downloading
+    it unless offline mode is on. Raises AssetUnavailableError if it is missing.
+    """
+    configure()
+    path = NLTK_RESOURCES[name]
+    try:
+        nltk.data.find(path)
+        return
+    except LookupError:
+        if offline_mode():
+            raise AssetUnavailableError(
+                f"NLTK resource '{name}' is not installed and offline mode is on; "
+                f"run 'python src/assets.py prefetch' on a machine with network access") from None
+
+    with timed_load(f"download:{name}"):
+        nltk.download(name, quiet=True)
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        raise AssetUnavailableError(f"NLTK resource '{name}' could not be downloaded") from None
+
+def model_dir(model_name, root=None):
+    """Directory of a bundled Hugging Face model."""
+    return os.path.join(root or assets_dir(), 'models', model_name.strip('/\\').replace('/', '--').replace('\\', '--'))
+
+def resolve_model(model_name, local_files_only=False):
+    """
+    Return (model path, local_files_only) for from_pretrained: the bundled copy if
+    there is one, and local-only loading whenever offline mode is on.
+    """
+    configure()
+    bundled = model_dir(model_name)
+    if os.path.isdir(bundled):
+        return bundled, True
+    return model_name, local_files_only or offline_mode()
+
+@contextmanager
+def timed_load(name):
+    """Record how long loading an asset takes (see load_timings)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _load_timings[name] = round(time.perf_counter() - start, 3)
+        REGISTRY.gauge('analysis_asset_load_seconds', "Seconds spent loading each model or corpus",
+                       asset=name).set(_load_timings[name])
+
+def load_timings():
+    """Seconds spent loading each asset so far, plus seconds since this module was imported."""
+    timings = dict(_load_timings)
+    timings['since_start'] = round(time.perf_counter() - _process_start, 3)
+    return timings
+
+def warmup_in_background(*components):
+    """
+    Call warmup() on each component in a daemon thread, so models and corpora load
+    while the caller keeps serving. Returns the thread; failures are recorded in
+    load_timings as 'failed:<component>' and surface again on first use.
+    """
+    def run():
+        for component in components:
+            name = type(component).__name__
+            try:
+                with timed_load(f"warmup:{name}"):
+                    component.warmup()
+            except Exception:
+                _load_timings[f"failed:{name}"] = True
+
+    thread = threading.Thread(target=run, name="asset-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def prefetch(target_dir=None, models=DEFAULT_MODELS):
+    """Download every NLTK resource and Hugging Face model into a local bundle."""
+    target_dir = target_dir or assets_dir()
+    nltk_dir = os.path.join(target_dir, 'nltk_data')
+    os.makedirs(nltk_dir, exist_ok=True)
+    for name in NLTK_RESOURCES:
+        print(f"nltk: {name}", file=sys.stderr)
+        if not nltk.download(name, download_dir=nltk_dir, quiet=True):
+            raise AssetUnavailableError(f"Could not download NLTK resource '{name}'")
+
+    if models:
+        from transformers import (AutoConfig, AutoModelForSequenceClassification, AutoModelForSpeechSeq2Seq,
+                                  AutoProcessor, AutoTokenizer)
+        for model_name in models:
+            print(f"model: {model_name}", file=sys.stderr)
+            destination = model_dir(model_name, target_dir)
+            # Speech-to-text checkpoints need their feature extractor as well as the tokenizer
+            if AutoConfig.from_pretrained(model_name).model_type == 'whisper':
+                AutoProcessor.from_pretrained(model_name).save_pretrained(destination)
+                AutoModelForSpeechSeq2Seq.from_pretrained(model_name).save_pretrained(destination)
+            else:
+                AutoTokenizer.from_pretrained(model_name).save_pretrained(destination)
+                AutoModelForSequenceClassification.from_pretrained(model_name).save_pretrained(destination)
+    return target_dir
+
+def status(target_dir=None):
+    """{asset: bool} telling which assets the bundle in target_dir holds."""
+    target_dir = target_dir or assets_dir()
+    nltk_dir = os.path.join(target_dir, 'nltk_data')
+    report = {}
+    for name, path in NLTK_RESOURCES.items():
+        base = os.path.join(nltk_dir, path)
+        report[f"nltk:{name}"] = os.path.exists(base) or os.path.exists(base + '.zip')
+    for model_name in DEFAULT_MODELS:
+        report[f"model:{model_name}"] = os.path.isdir(model_dir(model_name, target_dir))
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local bundle of models and corpora.")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    prefetch_parser = subcommands.add_parser('prefetch', help="Download all assets into the bundle")
+    prefetch_parser.add_argument('--dir', default=None, help="Bundle directory (default: BRAVE_HAVEN_ASSETS_DIR or ./assets)")
+    prefetch_parser.add_argument('--model', action='append', default=None, help="Hugging Face model to bundle (repeatable)")
+    prefetch_parser.add_argument('--skip-models', action='store_true', help="Only bundle the NLTK data")
+    status_parser = subcommands.add_parser('status', help="Show which assets the bundle holds")
+    status_parser.add_argument('--dir', default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'prefetch':
+        models = () if args.skip_models else (args.model or DEFAULT_MODELS)
+        print(prefetch(args.dir, models))
+    else:
+        for asset, present in status(args.dir).items():
+            print(f"{'ok     ' if present else 'missing'} {asset}")
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,217 @@
-from transformers import pipeline
+import os
+import threading
+from importlib.metadata import PackageNotFoundError, version
+
+from assets import resolve_model, timed_load
+from instrumentation import timer
+
+# Bump when inference or post-processing changes so cached results are not reused
+ANALYZER_VERSION = "1"
+
+# "float": full-precision PyTorch, "quantized": dynamic int8 PyTorch,
+# "onnx": exported ONNX graph run by onnxruntime (optional dependency)
+BACKENDS = ("float", "quantized", "onnx")
 
 class EmotionAnalyzer:
-    def __init__(self, model_name="tabularisai/multilingual-sentiment-analysis"):
-        self.classifier = pipeline("sentiment-analysis", model=model_name)
+    def __init__(self, model_name="tabularisai/multilingual-sentiment-analysis", backend="float",
+                 local_files_only=False, onnx_path=None, cache=None, lazy=True):
+        """
+        model_name may be a Hub id or a local model directory; with local_files_only=True
+        nothing is fetched from the network. A copy bundled by `assets.py prefetch` is
+        preferred over the Hub. onnx_path is where the "onnx" backend exports (or
+        reuses) the graph; defaults to models/<model_name>.onnx.
+        cache is an optional ResultCache shared with the other analyzers.
+        With lazy=True (default) torch, transformers and the model are loaded on the
+        first inference or by warmup(), so cache hits never load the model.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+
+        self.model_name = model_name
+        self.backend = backend
+        self.local_files_only = local_files_only
+        self.onnx_path = onnx_path
+        self.cache = cache
+        self._cache_version = None
+        self.tokenizer = None
+        self.model = None
+        self.config = None
+        self.onnx_session = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        if not lazy:
+            self.warmup()
+
+    @property
+    def cache_version(self):
+        """
+        Cache key version: analyzer, model, backend and transformers version. Looked up
+        on first use so a missing transformers install only fails once inference
+        needs it; until then no cached result can match.
+        """
+        if self._cache_version is None:
+            try:
+                transformers_version = version('transformers')
+            except PackageNotFoundError:
+                transformers_version = "missing"
+            self._cache_version = f"{ANALYZER_VERSION}:{self.model_name}:{self.backend}:transformers-{transformers_version}"
+        return self._cache_version
+
+    def warmup(self):
+        """Load the tokenizer and model now. Safe to call from several threads; loads once."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                with timed_load(f"emotion:{self.model_name}:{self.backend}"):
+                    self._load()
+                self._loaded = True
+
+    def _load(self):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        path, local_files_only = resolve_model(self.model_name, self.local_files_only)
+        self.tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=local_files_only)
+        self.model = AutoModelForSequenceClassification.from_pretrained(path, local_files_only=local_files_only)
+        self.model.eval()
+        self.config = self.model.config
+
+        if self.backend == "quantized":
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        if self.backend == "onnx":
+            onnx_path = self.onnx_path
+            if onnx_path is None:
+                onnx_path = os.path.join("models", self.model_name.strip("/\\").replace("/", "--").replace("\\", "--") + ".onnx")
+            self.onnx_session = self._load_onnx_session(onnx_path)
+            self.model = None  # The graph replaces the PyTorch weights
 
     def analyze_emotion(self, text):
         """
         Analyzes the emotion of the given text using a pre-trained Hugging Face model.
-        Returns a list of dictionaries, each containing 'label' and 'score'.
+        Returns the top {'label', 'score'} ([] for empty or non-string input). Runs
+        through analyze_emotions, so it truncates like the batch path and gives the
+        same result with or without a cache.
+        """
+        return self.analyze_emotions([text])[0]
+
+    @timer("analyze_emotions")
+    def analyze_emotions(self, texts, batch_size=32):
         """
-        if not text or not isinstance(text, str):
-            return []
-        
-        # The pipeline returns a list of dictionaries, e.g., [{'label': 'joy', 'score': 0.99}]
-        # We are interested in the top emotion.
-        results = self.classifier(text)
-        return results[0] if results else None
+        Analyzes the emotion of many texts with batched model inference.
+        Texts are sorted by token length so each batch is padded only to its own
+        longest sequence. Returns the top {'label', 'score'} per text, in input order
+        ([] for empty or non-string inputs, like analyze_emotion).
+        """
+        results = [[] for _ in texts]
+        valid = [(i, text) for i, text in enumerate(texts) if text and isinstance(text, str)]
+
+        # Cached texts skip inference entirely
+        if self.cache is not None:
+            keys = {}
+            misses = []
+            for i, text in valid:
+                keys[i] = self.cache.make_key("emotion", self.cache_version, text)
+                cached = self.cache.get(keys[i])
+                if cached is None:
+                    misses.append((i, text))
+                else:
+                    results[i] = cached
+            self._predict(misses, results, batch_size)
+            for i, _ in misses:
+                self.cache.set(keys[i], results[i])
+        else:
+            self._predict(valid, results, batch_size)
+        return results
+
+    def _predict(self, valid, results, batch_size):
+        """Run (index, text) pairs through the model, writing top predictions into results."""
+        if not valid:
+            return
+        self.warmup()
+        import torch
+
+        # Tokenize once without padding, then bucket by length
+        encodings = self.tokenizer([text for _, text in valid], truncation=True)
+        lengths = [len(ids) for ids in encodings['input_ids']]
+        order = sorted(range(len(valid)), key=lambda j: lengths[j])
+
+        with torch.inference_mode():
+            for start in range(0, len(order), batch_size):
+                batch_rows = order[start:start + batch_size]
+                features = [{key: encodings[key][j] for key in encodings.keys()} for j in batch_rows]
+                batch = self.tokenizer.pad(features, padding='longest', return_tensors='pt')
+                logits = self._forward(batch)
+                scores = self._logits_to_scores(logits)
+                top_scores, top_ids = scores.max(dim=-1)
+                for j, score, label_id in zip(batch_rows, top_scores.tolist(), top_ids.tolist()):
+                    results[valid[j][0]] = {
+                        'label': self.config.id2label[label_id],
+                        'score': score
+                    }
+
+    def _forward(self, batch):
+        """Run one padded batch through the active backend and return logits."""
+        if self.onnx_session is not None:
+            import torch
+            inputs = {name: batch[name].numpy() for name in self._onnx_input_names}
+            return torch.from_numpy(self.onnx_session.run(["logits"], inputs)[0])
+        batch = {key: value.to(self.model.device) for key, value in batch.items()}
+        return self.model(**batch).logits
+
+    def _load_onnx_session(self, onnx_path):
+        """Export the model to onnx_path if it is not there yet and open a CPU inference session."""
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The 'onnx' backend requires onnxruntime: pip install onnxruntime") from e
+
+        if not os.path.exists(onnx_path):
+            self._export_onnx(onnx_path)
+
+        session = onnxruntime.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+        self._onnx_input_names = [node.name for node in session.get_inputs()]
+        return session
+
+    def _export_onnx(self, onnx_path):
+        """Export the float model with dynamic batch and sequence axes."""
+        import torch
+
+        class _LogitsModule(torch.nn.Module):
+            """Wraps a sequence classifier so ONNX export sees positional inputs and a single logits output."""
+            def __init__(self, model, input_names):
+                super().__init__()
+                self.model = model
+                self.input_names = input_names
+
+            def forward(self, *inputs):
+                return self.model(**dict(zip(self.input_names, inputs))).logits
+
+        sample = self.tokenizer(["Export sample text."], return_tensors="pt")
+        input_names = list(sample.keys())
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+
+        os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+        with torch.no_grad():
+            torch.onnx.export(
+                _LogitsModule(self.model, input_names),
+                tuple(sample[name] for name in input_names),
+                onnx_path,
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+
+    def _logits_to_scores(self, logits):
+        """Apply the same activation the text-classification pipeline uses by default."""
+        import torch
+        config = self.config
+        if config.problem_type == 'multi_label_classification' or config.num_labels == 1:
+            return torch.sigmoid(logits.float())
+        return torch.softmax(logits.float(), dim=-1)
 
 if __name__ == '__main__':
     analyzer = EmotionAnalyzer()
@@ -33,4 +229,4 @@ if __name__ == '__main__':
         emotion = analyzer.analyze_emotion(text)
         print(f"Text: \"{text}\"\nEmotion: {emotion}\n")
 
-
+    print("Batched:", analyzer.analyze_emotions(texts, batch_size=4))
@@ -0,0 +1,365 @@
+"""
+Declarative red/green flag rules: loading, compilation and hot reload.
+
+Rules live in a YAML or JSON file (default: rules/flag_rules.yaml, or the path in
+BRAVE_HAVEN_FLAG_RULES):
+
+    rules:
+      - id: negative_sentiment
+        kind: red                       # red | green
+        message: Overall negative sentiment detected.
+        when:
+          sentiment: [Negative]         # label conditions: sentiment, emotion, tone
+          compound: {lte: -0.5}         # score conditions: compound, emotion_score,
+                                        # tone_confidence with gt/gte/lt/lte
+      - id: critical_combination
+        kind: red
+        message: ...
+        requires: [negative_sentiment, anger_emotion, aggressive_tone]
+    labels:                             # optional: labels added to the default vocabularies
+      emotion: [optimism]
+
+The default emotion vocabulary holds the labels of common emotion models and of the
+configured tabularisai/multilingual-sentiment-analysis model ("Very Negative" to
+"Very Positive"); a model with other labels declares them under `labels`.
+
+compile_rules turns the rules into a CompiledRules evaluator: label conditions are
+folded into a decision table indexed by (sentiment, emotion, tone) codes whose cells
+hold a bitmask of candidate rules (bit i is rule i). Rules with no score conditions
+and no dependencies fire straight from the table; the others are checked in
+dependency order, and only when they are candidates and every rule they require has
+already fired. A rule whose score is missing (None/NaN) does not fire.
+"""
+import json
+import operator
+import os
+import threading
+import time
+
+import numpy as np
+
+from tone_analysis import TONE_CATEGORIES
+
+# Default label vocabularies; code 0 stands for any label not listed (including None)
+SENTIMENT_LABELS = (None, "Positive", "Negative", "Neutral")
+EMOTION_LABELS = (None, "anger", "fear", "disgust", "sadness", "joy", "surprise", "neutral",
+                  "Very Negative", "Negative", "Neutral", "Positive", "Very Positive")
+TONE_LABELS = (None,) + tuple(TONE_CATEGORIES) + ("neutral",)
+LABEL_FIELDS = {'sentiment': SENTIMENT_LABELS, 'emotion': EMOTION_LABELS, 'tone': TONE_LABELS}
+
+# Numeric inputs rules can test: VADER compound, emotion model confidence and
+# ToneAnalyzer confidence_level
+SCORE_FIELDS = ('compound', 'emotion_score', 'tone_confidence')
+COMPARISONS = {'gt': operator.gt, 'gte': operator.ge, 'lt': operator.lt, 'lte': operator.le}
+
+# Status code = 1 if any red flag fired + 2 if any green flag fired
+STATUS_LABELS = ("Neutral", "Red Flag", "Green Flag", "Mixed (Both Red and Green Flags)")
+
+RULE_KINDS = ("red", "green")
+MAX_RULES = 64
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'rules', 'flag_rules.yaml')
+
+class RuleError(ValueError):
+    """A rule file is malformed or inconsistent."""
+
+def rules_path():
+    return os.environ.get('BRAVE_HAVEN_FLAG_RULES') or DEFAULT_RULES_PATH
+
+def load_rule_spec(path):
+    """Read a rule file (.yaml/.yml or .json) into a dict."""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("YAML rule files require PyYAML: pip install pyyaml") from e
+        try:
+            spec = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise RuleError(f"{path}: {e}") from None
+    else:
+        try:
+            spec = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise RuleError(f"{path}: {e}") from None
+    if not isinstance(spec, dict) or not isinstance(spec.get('rules'), list):
+        raise RuleError(f"{path}: expected a mapping with a 'rules' list")
+    return spec
+
+def extend_vocabularies(vocabularies, extra, source=None):
+    """
+    Vocabularies (field -> label tuple) with the labels of a spec's `labels` section
+    appended. Existing labels keep their codes, so labels only ever get added.
+    """
+    prefix = f"{source}: " if source else ""
+    if extra is None:
+        extra = {}
+    if not isinstance(extra, dict):
+        raise RuleError(f"{prefix}'labels' must map sentiment/emotion/tone to lists of labels")
+    unknown = set(extra) - set(LABEL_FIELDS)
+    if unknown:
+        raise RuleError(f"{prefix}unknown label fields {sorted(unknown)}")
+    extended = {}
+    for field, labels in vocabularies.items():
+        added = extra.get(field) or []
+        if not isinstance(added, list) or not all(isinstance(label, str) and label for label in added):
+            raise RuleError(f"{prefix}'labels.{field}' must be a list of non-empty strings")
+        extended[field] = labels + tuple(dict.fromkeys(label for label in added if label not in labels))
+    return extended
+
+class CompiledRule:
+    __slots__ = ('id', 'kind', 'message', 'bit', 'labels', 'checks', 'requires', 'requires_mask')
+
+    def __init__(self, index, spec, vocabularies):
+        if not isinstance(spec, dict):
+            raise RuleError(f"Rule {index}: expected a mapping")
+        unknown = set(spec) - {'id', 'kind', 'message', 'when', 'requires'}
+        if unknown:
+            raise RuleError(f"Rule {index}: unknown keys {sorted(unknown)}")
+        self.id = spec.get('id')
+        if not isinstance(self.id, str) or not self.id:
+            raise RuleError(f"Rule {index}: 'id' must be a non-empty string")
+        self.kind = spec.get('kind')
+        if self.kind not in RULE_KINDS:
+            raise RuleError(f"Rule '{self.id}': 'kind' must be one of {RULE_KINDS}")
+        self.message = spec.get('message')
+        if not isinstance(self.message, str):
+            raise RuleError(f"Rule '{self.id}': 'message' must be a string")
+        self.bit = 1 << index
+
+        # field -> allowed labels, and (field, comparison, threshold) checks
+        self.labels = {}
+        self.checks = []
+        when = spec.get('when') or {}
+        if not isinstance(when, dict):
+            raise RuleError(f"Rule '{self.id}': 'when' must be a mapping")
+        for field, condition in when.items():
+            if field in vocabularies:
+                allowed = [condition] if isinstance(condition, str) else condition
+                if not isinstance(allowed, list) or not allowed:
+                    raise RuleError(f"Rule '{self.id}': '{field}' must be a label or a list of labels")
+                for label in allowed:
+                    if label not in vocabularies[field][1:]:
+                        raise RuleError(f"Rule '{self.id}': unknown {field} label {label!r}")
+                self.labels[field] = frozenset(allowed)
+            elif field in SCORE_FIELDS:
+                if not isinstance(condition, dict) or not condition:
+                    raise RuleError(f"Rule '{self.id}': '{field}' must map gt/gte/lt/lte to numbers")
+                for comparison, threshold in condition.items():
+                    if comparison not in COMPARISONS:
+                        raise RuleError(f"Rule '{self.id}': unknown comparison '{comparison}' for '{field}'")
+                    if isinstance(threshold, bool) or not isinstance(threshold, (int, float)):
+                        raise RuleError(f"Rule '{self.id}': threshold for '{field}' must be a number")
+                    self.checks.append((field, COMPARISONS[comparison], float(threshold)))
+            else:
+                raise RuleError(f"Rule '{self.id}': unknown condition '{field}'")
+
+        requires = spec.get('requires') or []
+        if isinstance(requires, str):
+            requires = [requires]
+        if not isinstance(requires, list) or not all(isinstance(rule_id, str) for rule_id in requires):
+            raise RuleError(f"Rule '{self.id}': 'requires' must be a list of rule ids")
+        self.requires = tuple(requires)
+        self.requires_mask = 0
+
+class CompiledRules:
+    """
+    Immutable evaluator built from a rule spec. Evaluations never share mutable
+    state with a reload: a reload builds a new CompiledRules and swaps it in.
+    vocabularies (field -> label tuple, default LABEL_FIELDS) is extended with the
+    spec's `labels`; codes maps each label to its code, per field in LABEL_FIELDS order.
+    """
+    def __init__(self, spec, source=None, vocabularies=None):
+        rule_specs = spec['rules']
+        if len(rule_specs) > MAX_RULES:
+            raise RuleError(f"At most {MAX_RULES} rules are supported, got {len(rule_specs)}")
+        self.source = source
+        self.vocabularies = extend_vocabularies(vocabularies or LABEL_FIELDS, spec.get('labels'), source)
+        self.codes = tuple({label: code for code, label in enumerate(labels) if label is not None}
+                           for labels in self.vocabularies.values())
+        self.rules = tuple(CompiledRule(index, rule_spec, self.vocabularies)
+                           for index, rule_spec in enumerate(rule_specs))
+
+        bits = {}
+        for rule in self.rules:
+            if rule.id in bits:
+                raise RuleError(f"Duplicate rule id '{rule.id}'")
+            bits[rule.id] = rule.bit
+        for rule in self.rules:
+            for rule_id in rule.requires:
+                if rule_id not in bits:
+                    raise RuleError(f"Rule '{rule.id}' requires unknown rule '{rule_id}'")
+                rule.requires_mask |= bits[rule_id]
+
+        self.red_mask = sum(rule.bit for rule in self.rules if rule.kind == "red")
+        self.green_mask = sum(rule.bit for rule in self.rules if rule.kind == "green")
+        self.label_table = self._compile_label_table()
+        # Rules decided by the table alone, and the rest in dependency order
+        self.static_mask = sum(rule.bit for rule in self.rules if not rule.checks and not rule.requires)
+        self.dynamic_rules = tuple(rule for rule in self._dependency_order() if rule.checks or rule.requires)
+        self._descriptions = {}
+
+    def _compile_label_table(self):
+        """Evaluate every rule's label conditions on the whole (sentiment, emotion, tone) grid."""
+        shape = tuple(len(labels) for labels in self.vocabularies.values())
+        table = np.zeros(shape, dtype=np.uint64)
+        for rule in self.rules:
+            candidates = np.ones(shape, dtype=bool)
+            for axis, (field, labels) in enumerate(self.vocabularies.items()):
+                if field not in rule.labels:
+                    continue
+                member = np.array([label in rule.labels[field] for label in labels])
+                candidates &= member.reshape([-1 if i == axis else 1 for i in range(len(shape))])
+            table[candidates] |= np.uint64(rule.bit)
+        return table
+
+    def _dependency_order(self):
+        """Rules sorted so each comes after the rules it requires (file order otherwise)."""
+        by_id = {rule.id: rule for rule in self.rules}
+        ordered = []
+        state = {}  # rule id -> "visiting" | "done"
+
+        def visit(rule, path):
+            if state.get(rule.id) == "done":
+                return
+            if state.get(rule.id) == "visiting":
+                raise RuleError(f"Rule dependency cycle: {' -> '.join(path + [rule.id])}")
+            state[rule.id] = "visiting"
+            for rule_id in rule.requires:
+                visit(by_id[rule_id], path + [rule.id])
+            state[rule.id] = "done"
+            ordered.append(rule)
+
+        for rule in self.rules:
+            visit(rule, [])
+        return ordered
+
+    def evaluate(self, cell, scores=None):
+        """Bitmask of the rules that fire for one (sentiment, emotion, tone) code cell."""
+        candidates = int(self.label_table[cell])
+        fired = candidates & self.static_mask
+        for rule in self.dynamic_rules:
+            if not candidates & rule.bit or fired & rule.requires_mask != rule.requires_mask:
+                continue
+            if rule.checks:
+                if scores is None:
+                    continue
+                passed = True
+                for field, compare, threshold in rule.checks:
+                    value = scores.get(field)
+                    # NaN compares False, so a missing score never fires
+                    if value is None or not compare(float(value), threshold):
+                        passed = False
+                        break
+                if not passed:
+                    continue
+            fired |= rule.bit
+        return fired
+
+    def evaluate_batch(self, cells, scores=None):
+        """uint64 bitmasks for arrays of code cells; scores maps SCORE_FIELDS to arrays."""
+        candidates = self.label_table[cells]
+        fired = candidates & np.uint64(self.static_mask)
+        for rule in self.dynamic_rules:
+            bit = np.uint64(rule.bit)
+            active = (candidates & bit) != 0
+            if not active.any():
+                continue
+            if rule.requires_mask:
+                requires_mask = np.uint64(rule.requires_mask)
+                active &= (fired & requires_mask) == requires_mask
+            for field, compare, threshold in rule.checks:
+                column = None if scores is None else scores.get(field)
+                if column is None:
+                    active[:] = False
+                    break
+                with np.errstate(invalid='ignore'):
+                    active &= compare(np.asarray(column, dtype=float), threshold)
+            fired |= np.where(active, bit, np.uint64(0))
+        return fired
+
+    def status_codes(self, fired):
+        """Status codes (index into STATUS_LABELS) for an array of bitmasks."""
+        has_red = (fired & np.uint64(self.red_mask)) != 0
+        has_green = (fired & np.uint64(self.green_mask)) != 0
+        return has_red.astype(np.int8) + 2 * has_green.astype(np.int8)
+
+    def describe(self, mask):
+        """detect_flags-style dictionary for one bitmask; flags are listed in file order."""
+        mask = int(mask)
+        description = self._descriptions.get(mask)
+        if description is None:
+            red_flags = tuple(rule.message for rule in self.rules if mask & rule.bit and rule.kind == "red")
+            green_flags = tuple(rule.message for rule in self.rules if mask & rule.bit and rule.kind == "green")
+            status = STATUS_LABELS[bool(red_flags) + 2 * bool(green_flags)]
+            description = self._descriptions[mask] = (status, red_flags, green_flags)
+        status, red_flags, green_flags = description
+        return {
+            "overall_status": status,
+            "red_flags": list(red_flags),
+            "green_flags": list(green_flags)
+        }
+
+def compile_rules(spec, source=None, vocabularies=None):
+    """Validate a rule spec (see load_rule_spec) and build its CompiledRules."""
+    if not isinstance(spec, dict) or not isinstance(spec.get('rules'), list):
+        raise RuleError("Expected a mapping with a 'rules' list")
+    return CompiledRules(spec, source, vocabularies)
+
+class RuleFile:
+    """
+    A rule file that reloads itself when it changes.
+    current() stats the file at most every check_interval seconds; when it changed,
+    the one caller that gets the reload lock compiles the new rules and swaps them in
+    with a single assignment, while every other caller keeps evaluating with the
+    rules it already holds. A file that fails to load or compile leaves the previous
+    rules active and is reported in last_error until a valid version is saved.
+    Reloads start from the previous vocabularies, so label codes encoded before a
+    reload keep their meaning after it.
+    """
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.last_error = None
+        self.reloads = 0
+        self._reload_lock = threading.Lock()
+        self._stamp = self._file_stamp()
+        self._rules = compile_rules(load_rule_spec(path), source=path)
+        self._next_check = time.monotonic() + check_interval
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def current(self):
+        """The active CompiledRules, reloading the file first if it changed."""
+        if time.monotonic() >= self._next_check and self._reload_lock.acquire(blocking=False):
+            try:
+                self._next_check = time.monotonic() + self.check_interval
+                self._reload_if_changed()
+            finally:
+                self._reload_lock.release()
+        return self._rules
+
+    def reload(self):
+        """Reload now if the file changed; returns the active CompiledRules."""
+        with self._reload_lock:
+            self._reload_if_changed()
+        return self._rules
+
+    def _reload_if_changed(self):
+        try:
+            stamp = self._file_stamp()
+            if stamp == self._stamp:
+                return
+            rules = compile_rules(load_rule_spec(self.path), source=self.path,
+                                  vocabularies=self._rules.vocabularies)
+        except (OSError, RuleError, ImportError) as e:
+            self.last_error = str(e)
+            return
+        self._rules = rules
+        self._stamp = stamp
+        self.last_error = None
+        self.reloads += 1
@@ -0,0 +1,267 @@
+"""
+Lightweight in-process metrics: counters, gauges and latency histograms.
+
+Metrics live in one process-wide registry (REGISTRY) and are exported in the
+Prometheus text format (render_prometheus, served by server.py at /metrics) or as a
+JSON-friendly dict (snapshot). Recording is a perf_counter pair plus a locked
+bucket increment, cheap enough to stay on in production.
+
+Stage timings go to the analysis_stage_seconds{stage=...} histogram:
+
+    @timer("analyze_sentiment")           # as a decorator
+    def analyze_sentiment(...): ...
+
+    with timer("audio_decode"):           # or around a block
+        audio = load_audio(source)
+
+profile_call captures a cProfile (or pyinstrument, if installed) report for one call.
+"""
+import cProfile
+import functools
+import io
+import pstats
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+class Counter:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def reset(self):
+        self.value = 0
+
+class Gauge:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def reset(self):
+        self.value = 0.0
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout, plus the largest value seen."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count', 'max', '_lock')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile (an estimate, like Prometheus')."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+class MetricsRegistry:
+    """Named metrics keyed by (name, labels); asking for an existing one returns it."""
+    def __init__(self):
+        self._metrics = {}  # (name, labels) -> metric
+        self._types = {}    # name -> (kind, help)
+        self._lock = threading.Lock()
+
+    def _get(self, kind, factory, name, help, labels):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    registered = self._types.setdefault(name, (kind, help))
+                    if registered[0] != kind:
+                        raise ValueError(f"Metric '{name}' is already registered as a {registered[0]}")
+                    metric = self._metrics[key] = factory()
+        return metric
+
+    def counter(self, name, help='', **labels):
+        return self._get('counter', Counter, name, help, labels)
+
+    def gauge(self, name, help='', **labels):
+        return self._get('gauge', Gauge, name, help, labels)
+
+    def histogram(self, name, help='', buckets=LATENCY_BUCKETS, **labels):
+        return self._get('histogram', lambda: Histogram(buckets), name, help, labels)
+
+    def collect(self, name):
+        """{labels dict as tuple: metric} for every metric registered under name."""
+        return {labels: metric for (metric_name, labels), metric in list(self._metrics.items()) if metric_name == name}
+
+    def reset(self):
+        """Zero every metric (in place, so timers bound at import time keep recording)."""
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.reset()
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        by_name = {}
+        for (name, labels), metric in sorted(list(self._metrics.items()), key=lambda item: item[0]):
+            by_name.setdefault(name, []).append((labels, metric))
+        for name, metrics in by_name.items():
+            kind, help = self._types[name]
+            if help:
+                lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, metric in metrics:
+                if kind == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float('inf'),), metric.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {metric.sum}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {metric.count}')
+                else:
+                    lines.append(f'{name}{_format_labels(labels)} {metric.value}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """
+        JSON-friendly dump: {name: [{'labels': {...}, 'value': n}]} for counters and
+        gauges, and count/sum/mean/max/p50/p95/p99 for histograms.
+        """
+        result = {}
+        for (name, labels), metric in sorted(list(self._metrics.items()), key=lambda item: item[0]):
+            entry = {'labels': dict(labels)}
+            if isinstance(metric, Histogram):
+                entry.update(count=metric.count, sum=metric.sum, mean=metric.mean, max=metric.max,
+                             p50=metric.quantile(0.5), p95=metric.quantile(0.95), p99=metric.quantile(0.99))
+            else:
+                entry['value'] = metric.value
+            result.setdefault(name, []).append(entry)
+        return result
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+REGISTRY = MetricsRegistry()
+
+class timer:
+    """
+    Time a block (context manager) or every call of a function (decorator) into the
+    analysis_stage_seconds histogram under the given stage name. Use a new timer per
+    block; a decorated function can be called from any number of threads.
+    """
+    __slots__ = ('stage', 'histogram', '_start')
+
+    def __init__(self, stage, registry=None):
+        self.stage = stage
+        self.histogram = (registry or REGISTRY).histogram('analysis_stage_seconds', "Seconds spent per pipeline stage",
+                                                          stage=stage)
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self._start)
+        return False
+
+    def __call__(self, function):
+        histogram = self.histogram
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+
+def count(name, amount=1, help='', **labels):
+    """Add amount to a counter in the default registry."""
+    REGISTRY.counter(name, help, **labels).inc(amount)
+
+def stage_summary(registry=None):
+    """Timing rows for every stage run so far: [{'stage', 'calls', 'mean_ms', 'p95_ms', 'max_ms', 'total_s'}]."""
+    rows = []
+    for labels, histogram in sorted((registry or REGISTRY).collect('analysis_stage_seconds').items()):
+        if not histogram.count:
+            continue
+        rows.append({
+            'stage': dict(labels)['stage'],
+            'calls': histogram.count,
+            'mean_ms': round(histogram.mean * 1000, 3),
+            'p95_ms': round(histogram.quantile(0.95) * 1000, 3),
+            'max_ms': round(histogram.max * 1000, 3),
+            'total_s': round(histogram.sum, 3)
+        })
+    return rows
+
+def profile_call(function, *args, profiler="cprofile", limit=30, **kwargs):
+    """
+    Run function(*args, **kwargs) under a profiler and return (result, report text).
+    Only the calling thread is profiled, so run work inline when capturing (e.g.
+    AnalysisPipeline.run(text, concurrent=False)). "pyinstrument" needs
+    `pip install pyinstrument`; "cprofile" reports the top `limit` functions by
+    cumulative time.
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler '{profiler}', expected one of {PROFILERS}")
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as e:
+            raise ImportError("The 'pyinstrument' profiler requires pyinstrument: pip install pyinstrument") from e
+        session = Profiler()
+        session.start()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            session.stop()
+        return result, session.output_text(unicode=True, color=False)
+
+    session = cProfile.Profile()
+    result = session.runcall(function, *args, **kwargs)
+    report = io.StringIO()
+    pstats.Stats(session, stream=report).sort_stats('cumulative').print_stats(limit)
+    return result, report.getvalue()
@@ -0,0 +1,85 @@
+"""
+Rolling analysis of a transcript that grows chunk by chunk.
+
+RollingAnalyzer keeps sentiment, tone and flag results up to date while a recording
+is still being transcribed (see speech_to_text.iter_transcription and
+transcribe_stream). Each update only analyzes the new chunk:
+
+- tone is exact: RollingToneAnalysis resumes its scan where the previous chunk ended
+- sentiment is the word-weighted mean of the per-chunk VADER scores, an estimate of
+  the whole-transcript score that is cheap to update; run analyze_sentiment on the
+  final transcript for the exact value
+"""
+from sentiment_analysis import SentimentAnalyzer
+from tone_analysis import ToneAnalyzer
+from red_green_flag import FlagDetector
+
+SENTIMENT_KEYS = ('neg', 'neu', 'pos', 'compound')
+
+class RollingAnalyzer:
+    def __init__(self, sentiment_analyzer, tone_analyzer, flag_detector):
+        self.sentiment_analyzer = sentiment_analyzer
+        self.flag_detector = flag_detector
+        self.tone = tone_analyzer.rolling()
+        self.parts = []
+        self._sentiment_totals = dict.fromkeys(SENTIMENT_KEYS, 0.0)
+        self._sentiment_weight = 0
+
+    def update(self, text):
+        """
+        Add the next transcript chunk and return the updated snapshot.
+        Empty chunks (nothing recognized) leave the results unchanged.
+        """
+        text = text.strip() if isinstance(text, str) else ''
+        if text:
+            self.parts.append(text)
+            self.tone.append(text)
+            scores = self.sentiment_analyzer.analyze_sentiment(text)
+            weight = len(text.split())
+            for key in SENTIMENT_KEYS:
+                self._sentiment_totals[key] += scores[key] * weight
+            self._sentiment_weight += weight
+        return self.snapshot()
+
+    def snapshot(self):
+        """
+        Current results: {'transcript', 'sentiment', 'sentiment_label', 'tone', 'flags'}.
+        Flags use sentiment and tone only; emotion needs the whole transcript.
+        """
+        if self._sentiment_weight:
+            sentiment = {key: round(total / self._sentiment_weight, 4) for key, total in self._sentiment_totals.items()}
+        else:
+            sentiment = dict.fromkeys(SENTIMENT_KEYS, 0.0)
+        sentiment_label = self.sentiment_analyzer.get_sentiment_label(sentiment['compound'])
+        tone = self.tone.result()
+        return {
+            'transcript': ' '.join(self.parts),
+            'sentiment': sentiment,
+            'sentiment_label': sentiment_label,
+            'tone': tone,
+            'flags': self.flag_detector.detect_flags(sentiment_label, None, tone['dominant_tone'], {
+                'compound': sentiment['compound'],
+                'tone_confidence': tone['confidence_level']
+            })
+        }
+
+def analyze_transcript_stream(chunks, sentiment_analyzer, tone_analyzer, flag_detector):
+    """
+    Wrap a (chunk_index, start_ms, end_ms, text) iterator with rolling analysis,
+    yielding (chunk_index, start_ms, end_ms, text, snapshot) for every chunk.
+    """
+    rolling = RollingAnalyzer(sentiment_analyzer, tone_analyzer, flag_detector)
+    for chunk_index, start_ms, end_ms, text in chunks:
+        yield chunk_index, start_ms, end_ms, text, rolling.update(text)
+
+if __name__ == '__main__':
+    transcript = [
+        (0, 0, 2100, "I really appreciate you coming today"),
+        (1, 2400, 5200, "but honestly this is STUPID and I hate it"),
+        (2, 5600, 8000, "why would you do that")
+    ]
+    stream = analyze_transcript_stream(transcript, SentimentAnalyzer(), ToneAnalyzer(), FlagDetector())
+    for chunk_index, start_ms, end_ms, text, snapshot in stream:
+        print(f"[{start_ms / 1000:.1f}s-{end_ms / 1000:.1f}s] {text}")
+        print(f"  sentiment: {snapshot['sentiment_label']} | tone: {snapshot['tone']['dominant_tone']}"
+              f" | status: {snapshot['flags']['overall_status']}")
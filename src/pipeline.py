@@ -0,0 +1,153 @@
+"""
+One-request analysis pipeline shared by the app, the HTTP service and other callers.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from text_preprocessing import get_preprocessor
+
+# Version of the cached preprocessing record
+PREPROCESS_VERSION = "1"
+
+# Stages reported in a result's 'timings' (seconds), plus 'total'
+STAGES = ('tokenize', 'preprocess', 'sentiment', 'emotion', 'tone', 'flags')
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+class AnalysisPipeline:
+    """
+    Runs every analyzer on one input with a single clean_text pass.
+    The cleaned text is split once into a TokenStream that preprocessing, sentiment
+    and tone share through their *_tokens entry points, so the text is not
+    re-tokenized, re-lowercased or re-scanned per analyzer. The emotion model keeps
+    its own subword tokenizer and receives the cleaned text.
+
+    Sentiment, emotion and tone only depend on the token stream, so run() starts
+    them together: the transformer on its own dedicated thread (one model call at a
+    time, and torch releases the GIL while it runs) and sentiment and tone on a
+    small pool, while preprocessing runs in the calling thread. The flags are
+    computed once all three are done. With workers=0 every stage runs inline.
+    """
+    def __init__(self, sentiment_analyzer, emotion_analyzer, tone_analyzer, flag_detector, preprocessor=None, cache=None,
+                 workers=2):
+        self.preprocessor = preprocessor or get_preprocessor()
+        self.sentiment_analyzer = sentiment_analyzer
+        self.emotion_analyzer = emotion_analyzer
+        self.tone_analyzer = tone_analyzer
+        self.flag_detector = flag_detector
+        # Optional ResultCache for the preprocessing record (the analyzers cache their own results)
+        self.cache = cache
+        self._emotion_executor = None
+        self._cpu_executor = None
+        if workers:
+            if emotion_analyzer is not None:
+                self._emotion_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="emotion")
+            self._cpu_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analyzer")
+
+    def close(self):
+        """Stop the worker threads."""
+        for executor in (self._emotion_executor, self._cpu_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def run(self, text, concurrent=True):
+        """
+        Analyze text and return {'preprocessing', 'sentiment', 'sentiment_label',
+        'emotion', 'emotion_label', 'tone', 'flags', 'timings'}, where timings holds
+        the seconds each stage took (see STAGES) and the request's 'total'.
+        concurrent=False runs every stage in the calling thread, e.g. under a profiler.
+        """
+        start = time.perf_counter()
+        stream, tokenize_time = _timed(self.preprocessor.token_stream, text)
+
+        # Longest stage first, so it starts before the others queue up
+        stages = (
+            ('emotion', self._emotion_executor, self._analyze_emotion),
+            ('sentiment', self._cpu_executor, self.sentiment_analyzer.analyze_sentiment_tokens),
+            ('tone', self._cpu_executor, self.tone_analyzer.analyze_tone_tokens)
+        )
+        pending = {}
+        for name, executor, function in stages:
+            if executor is not None and concurrent:
+                pending[name] = executor.submit(_timed, function, stream)
+                # Yield the GIL so the worker starts now rather than after the next
+                # switch interval (5 ms), which would eat most of the overlap
+                time.sleep(0)
+        preprocessing, preprocess_time = _timed(self._cached_preprocess, text, stream)
+        outputs = {name: pending[name].result() if name in pending else _timed(function, stream)
+                   for name, _, function in stages}
+
+        timings = {'tokenize': tokenize_time, 'preprocess': preprocess_time}
+        timings.update((name, seconds) for name, (_, seconds) in outputs.items())
+        result = self._combine(preprocessing, outputs['sentiment'][0], outputs['emotion'][0], outputs['tone'][0], timings)
+        result['timings']['total'] = time.perf_counter() - start
+        return result
+
+    def run_batch(self, texts):
+        """
+        run() for many texts, with one batched emotion-model call for all of them
+        (see EmotionAnalyzer.analyze_emotions). Returns results in input order; each
+        result's 'emotion' timing is its share of the batched call.
+        """
+        streams, tokenize_time = _timed(lambda: [self.preprocessor.token_stream(text) for text in texts])
+        emotion_time = 0.0
+        if self.emotion_analyzer is not None:
+            emotions, emotion_time = _timed(self.emotion_analyzer.analyze_emotions, [stream.text for stream in streams])
+        else:
+            emotions = [None] * len(streams)
+        shared_timings = {'tokenize': tokenize_time / len(texts), 'emotion': emotion_time / len(texts)} if texts else {}
+
+        results = []
+        for text, stream, emotion in zip(texts, streams, emotions):
+            start = time.perf_counter()
+            preprocessing, preprocess_time = _timed(self._cached_preprocess, text, stream)
+            sentiment, sentiment_time = _timed(self.sentiment_analyzer.analyze_sentiment_tokens, stream)
+            tone, tone_time = _timed(self.tone_analyzer.analyze_tone_tokens, stream)
+            timings = dict(shared_timings, preprocess=preprocess_time, sentiment=sentiment_time, tone=tone_time)
+            result = self._combine(preprocessing, sentiment, emotion, tone, timings)
+            result['timings']['total'] = sum(shared_timings.values()) + time.perf_counter() - start
+            results.append(result)
+        return results
+
+    def _analyze_emotion(self, stream):
+        if self.emotion_analyzer is None:
+            return None
+        return self.emotion_analyzer.analyze_emotion(stream.text)
+
+    def _cached_preprocess(self, text, stream):
+        if self.cache is not None:
+            return self.cache.get_or_compute("preprocess", PREPROCESS_VERSION, text,
+                                             lambda: self._preprocess(text, stream))
+        return self._preprocess(text, stream)
+
+    def _combine(self, preprocessing, sentiment, emotion, tone, timings):
+        """Feed the analyzer results to the flag detector and assemble the result."""
+        start = time.perf_counter()
+        sentiment_label = self.sentiment_analyzer.get_sentiment_label(sentiment['compound'])
+        emotion_label = emotion['label'] if emotion else "neutral"
+        scores = {
+            'compound': sentiment['compound'],
+            'emotion_score': emotion['score'] if emotion else None,
+            'tone_confidence': tone['confidence_level']
+        }
+        flags = self.flag_detector.detect_flags(sentiment_label, emotion_label, tone['dominant_tone'], scores)
+        timings['flags'] = time.perf_counter() - start
+
+        return {
+            'preprocessing': preprocessing,
+            'sentiment': sentiment,
+            'sentiment_label': sentiment_label,
+            'emotion': emotion,
+            'emotion_label': emotion_label,
+            'tone': tone,
+            'flags': flags,
+            'timings': timings
+        }
+
+    def _preprocess(self, text, stream):
+        record = {'original_text': text}
+        record.update(self.preprocessor.preprocess_tokens(stream))
+        return record
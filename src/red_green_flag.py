@@ -1,62 +1,82 @@
-class FlagDetector:
-    def __init__(self):
-        pass
+"""
+Rule-based red/green flag detection.
+
+The rules are declared in a YAML/JSON file (see flag_rules) that FlagDetector
+compiles into a decision table indexed by integer (sentiment, emotion, tone) codes,
+so detect_flags is a single lookup plus the few score and combination rules, and
+detect_flags_batch evaluates whole NumPy columns at once. The file is reloaded when
+it changes. Message strings are only built when asked for, and flags are always
+listed in rule file order.
+"""
+import numpy as np
 
-    def detect_flags(self, sentiment_label, emotion_label, dominant_tone):
+from flag_rules import STATUS_LABELS, RuleFile, compile_rules, rules_path
+from instrumentation import timer
+
+class FlagDetector:
+    def __init__(self, rules=None, rules_file=None, reload_interval=1.0):
         """
-        Detects red or green flags based on sentiment, emotion, and tone analysis.
-        This is a rule-based system for demonstration.
+        rules: a rule spec dict (same layout as the rule file) to use instead of a
+        file; it is never reloaded. Otherwise rules come from rules_file (default:
+        BRAVE_HAVEN_FLAG_RULES or rules/flag_rules.yaml), which is checked for changes
+        at most every reload_interval seconds.
         """
-        red_flags = []
-        green_flags = []
-        
-        # Rule 1: Sentiment-based flags
-        if sentiment_label == "Negative":
-            red_flags.append("Overall negative sentiment detected.")
-        elif sentiment_label == "Positive":
-            green_flags.append("Overall positive sentiment detected.")
+        if rules is not None:
+            self.rule_file = None
+            self._static_rules = compile_rules(rules)
+        else:
+            self.rule_file = RuleFile(rules_file or rules_path(), check_interval=reload_interval)
+            self._static_rules = None
 
-        # Rule 2: Emotion-based flags
-        if emotion_label in ["anger", "fear", "disgust", "sadness"]:
-            red_flags.append(f"Strong emotion of '{emotion_label}' detected.")
-        elif emotion_label == "joy":
-            green_flags.append("Emotion of 'joy' detected.")
+    @property
+    def rules(self):
+        """The active CompiledRules (reloading the rule file if it changed)."""
+        return self._static_rules or self.rule_file.current()
 
-        # Rule 3: Tone-based flags
-        if dominant_tone == "aggressive":
-            red_flags.append("Aggressive tone detected.")
-        elif dominant_tone == "confident":
-            green_flags.append("Confident tone detected.")
-        elif dominant_tone == "tentative":
-            red_flags.append("Tentative tone detected, indicating uncertainty or hesitation.")
-        elif dominant_tone == "emotional":
-            red_flags.append("Highly emotional tone detected.")
+    def encode(self, sentiment_labels, emotion_labels, dominant_tones):
+        """
+        Turn label sequences into the int arrays detect_flags_batch takes.
+        Unknown labels (and None) get code 0, which no label condition matches.
+        Codes come from the active rules' vocabularies, which reloads only extend.
+        """
+        return tuple(np.fromiter((codes.get(label, 0) for label in labels), dtype=np.int64, count=len(labels))
+                     for codes, labels in zip(self.rules.codes, (sentiment_labels, emotion_labels, dominant_tones)))
 
-        # Rule 4: Combinatorial flags (examples)
-        if "Overall negative sentiment detected." in red_flags and \
-           "Strong emotion of 'anger' detected." in red_flags and \
-           "Aggressive tone detected." in red_flags:
-            red_flags.append("Critical combination: Negative sentiment, anger, and aggressive tone.")
-            
-        if "Overall positive sentiment detected." in green_flags and \
-           "Emotion of 'joy' detected." in green_flags and \
-           "Confident tone detected." in green_flags:
-            green_flags.append("Excellent combination: Positive sentiment, joy, and confident tone.")
+    @timer("detect_flags")
+    def detect_flags(self, sentiment_label, emotion_label, dominant_tone, scores=None):
+        """
+        Detects red or green flags based on sentiment, emotion, and tone analysis.
+        This is a rule-based system for demonstration.
+        scores optionally maps 'compound', 'emotion_score' and 'tone_confidence' to
+        numbers for rules with score conditions (those rules do not fire without them).
+        Returns {'overall_status', 'red_flags', 'green_flags'}.
+        """
+        rules = self.rules
+        sentiment_codes, emotion_codes, tone_codes = rules.codes
+        cell = (sentiment_codes.get(sentiment_label, 0), emotion_codes.get(emotion_label, 0),
+                tone_codes.get(dominant_tone, 0))
+        return rules.describe(rules.evaluate(cell, scores))
 
-        # Determine overall flag status
-        overall_status = "Neutral"
-        if red_flags and not green_flags:
-            overall_status = "Red Flag"
-        elif green_flags and not red_flags:
-            overall_status = "Green Flag"
-        elif red_flags and green_flags:
-            overall_status = "Mixed (Both Red and Green Flags)"
+    @timer("detect_flags_batch")
+    def detect_flags_batch(self, sentiment_codes, emotion_codes, tone_codes, scores=None, messages=False):
+        """
+        Vectorized flag detection over integer-coded arrays (see encode).
+        scores optionally maps 'compound', 'emotion_score' and 'tone_confidence' to
+        arrays (NaN where a score is missing).
+        Returns {'status': int8 status codes (index into STATUS_LABELS),
+        'flags': uint64 bitmasks (bit i is rule i of the rule file)}; with
+        messages=True, a list of detect_flags-style dictionaries instead.
+        """
+        rules = self.rules
+        cells = (np.asarray(sentiment_codes), np.asarray(emotion_codes), np.asarray(tone_codes))
+        flags = rules.evaluate_batch(cells, scores)
+        if messages:
+            return [rules.describe(mask) for mask in flags.tolist()]
+        return {'status': rules.status_codes(flags), 'flags': flags}
 
-        return {
-            "overall_status": overall_status,
-            "red_flags": list(set(red_flags)), # Use set to remove duplicates
-            "green_flags": list(set(green_flags))
-        }
+    def describe(self, mask):
+        """detect_flags-style dictionary for one flag bitmask of the active rules."""
+        return self.rules.describe(mask)
 
 if __name__ == '__main__':
     detector = FlagDetector()
@@ -86,4 +106,8 @@ if __name__ == '__main__':
     result5 = detector.detect_flags("Positive", "fear", "analytical")
     print(result5)
 
-
+    # Batch: integer-coded columns, messages only on request
+    print("\n--- Batch ---")
+    codes = detector.encode(["Negative", "Positive", "Neutral"], ["anger", "joy", None], ["aggressive", "confident", "neutral"])
+    batch = detector.detect_flags_batch(*codes)
+    print([STATUS_LABELS[code] for code in batch['status']], batch['flags'])
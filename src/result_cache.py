@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from instrumentation import REGISTRY
+
+class ResultCache:
+    """
+    Content-addressed cache for analyzer results.
+    Keys are a SHA-256 of the analyzer namespace, its version string and the input
+    text, so changing an analyzer or model version never serves stale results.
+    Values must be JSON-serializable; they are stored as JSON and decoded on every
+    hit, so callers can freely mutate what they get back.
+
+    Tiers:
+    - in-process LRU holding up to max_entries results
+    - optional SQLite file (db_path) evicting least recently used rows once the
+      stored values exceed max_disk_bytes
+    """
+    def __init__(self, max_entries=1024, db_path=None, max_disk_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'disk_evictions': 0}
+        # The same events, summed over every cache of the process, for /metrics
+        self._event_metrics = {event: REGISTRY.counter('analysis_cache_events_total', "Result cache lookups and evictions",
+                                                       event=event)
+                               for event in self._counters}
+
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results(last_access)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(namespace, version, text):
+        """Hash of namespace, version and text."""
+        digest = hashlib.sha256()
+        for part in (namespace, version, text):
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached value for key, or None."""
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self._count('memory_hits')
+                return json.loads(payload)
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self._remember(key, row[0])
+                    self._count('disk_hits')
+                    return json.loads(row[0])
+
+            self._count('misses')
+            return None
+
+    def set(self, key, value):
+        """Store value under key in every tier."""
+        payload = json.dumps(value)
+        with self._lock:
+            self._remember(key, payload)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, payload, len(payload.encode('utf-8')), time.time())
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def get_or_compute(self, namespace, version, text, compute):
+        """Return the cached result for (namespace, version, text), calling compute() on a miss."""
+        key = self.make_key(namespace, version, text)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def _count(self, event):
+        self._counters[event] += 1
+        self._event_metrics[event].inc()
+
+    def stats(self):
+        """Hit/miss counters and current tier sizes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+            if self._db is not None:
+                entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+                stats['disk_entries'] = entries
+                stats['disk_bytes'] = size
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0
+        return stats
+
+    def clear(self):
+        """Drop every cached result (counters are kept)."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key, payload):
+        """Insert into the LRU tier; caller holds the lock."""
+        self._memory[key] = payload
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        """Delete least recently used rows until the disk tier fits; caller holds the lock."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM results ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            self._count('disk_evictions')
+
+if __name__ == '__main__':
+    cache = ResultCache(max_entries=2)
+
+    for text in ["hello", "world", "hello", "again", "world"]:
+        result = cache.get_or_compute("demo", "1", text, lambda: {'length': len(text)})
+        print(f"{text}: {result}")
+
+    print(cache.stats())
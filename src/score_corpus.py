@@ -0,0 +1,271 @@
+"""
+Offline corpus scoring.
+
+Reads a JSONL or CSV corpus, splits it into fixed-size shards, scores the shards in a
+process pool (each worker loads its analyzers once) and writes one JSONL or Parquet
+output in input order. Finished shards are kept on disk, so re-running the same
+command after a crash only scores the shards that are missing.
+
+Usage:
+    python src/score_corpus.py corpus.jsonl scores.jsonl --workers 4
+    python src/score_corpus.py corpus.csv scores.parquet --text-field message --id-field msg_id
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import numpy as np
+
+from text_preprocessing import get_preprocessor
+from sentiment_analysis import SentimentAnalyzer
+from tone_analysis import ToneAnalyzer
+from red_green_flag import FlagDetector
+
+# Analyzers of the current worker process, built once by _init_worker
+_worker_analyzers = None
+
+def read_records(path, text_field='text', id_field='id'):
+    """
+    Lazily yield (record_id, text) from a JSONL or CSV file.
+    Records without an id_field use their position in the file.
+    """
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for index, row in enumerate(csv.DictReader(f)):
+                yield row.get(id_field) or index, row.get(text_field) or ''
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                yield record.get(id_field, index), record.get(text_field) or ''
+                index += 1
+
+def iter_shards(records, shard_size):
+    """Group records into consecutive (shard_index, [records]) lists."""
+    records = iter(records)
+    shard_index = 0
+    while True:
+        shard = list(islice(records, shard_size))
+        if not shard:
+            return
+        yield shard_index, shard
+        shard_index += 1
+
+def _init_worker(with_emotion):
+    global _worker_analyzers
+    _worker_analyzers = {
+        'preprocessor': get_preprocessor(),
+        'sentiment': SentimentAnalyzer(),
+        'tone': ToneAnalyzer(),
+        'flag': FlagDetector()
+    }
+    # Only cleaned_text is used, so stopwords and WordNet are never needed; load VADER up front
+    _worker_analyzers['sentiment'].warmup()
+    if with_emotion:
+        from emotion_analysis import EmotionAnalyzer
+        _worker_analyzers['emotion'] = EmotionAnalyzer()
+
+def score_records(records, analyzers):
+    """Score a list of (record_id, text) with the given analyzers; returns result dicts."""
+    cleaned = [analyzers['preprocessor'].preprocess_fields(text, ('cleaned_text',))['cleaned_text'] for _, text in records]
+    tone = analyzers['tone'].analyze_tone_batch(cleaned)
+    sentiment = analyzers['sentiment'].analyze_sentiment_batch(cleaned)
+    emotions = analyzers['emotion'].analyze_emotions(cleaned) if 'emotion' in analyzers else [None] * len(records)
+
+    # Flags for the whole shard in one decision-table lookup
+    sentiment_labels = [analyzers['sentiment'].get_sentiment_label(float(compound)) for compound in sentiment['compound']]
+    emotion_labels = [emotion['label'] if emotion else None for emotion in emotions]
+    flag_detector = analyzers['flag']
+    scores = {
+        'compound': sentiment['compound'],
+        'emotion_score': np.array([emotion['score'] if emotion else np.nan for emotion in emotions], dtype=float),
+        'tone_confidence': tone['confidence_level']
+    }
+    all_flags = flag_detector.detect_flags_batch(*flag_detector.encode(sentiment_labels, emotion_labels, tone['dominant_tone']),
+                                                 scores=scores, messages=True)
+
+    results = []
+    for i, (record_id, _) in enumerate(records):
+        compound = float(sentiment['compound'][i])
+        sentiment_label = sentiment_labels[i]
+        emotion_label = emotion_labels[i]
+        dominant_tone = str(tone['dominant_tone'][i])
+        flags = all_flags[i]
+        results.append({
+            'id': record_id,
+            'compound': compound,
+            'pos': float(sentiment['pos'][i]),
+            'neu': float(sentiment['neu'][i]),
+            'neg': float(sentiment['neg'][i]),
+            'sentiment_label': sentiment_label,
+            'emotion_label': emotion_label,
+            'emotion_score': emotions[i]['score'] if emotions[i] else None,
+            'dominant_tone': dominant_tone,
+            'tone_confidence': float(tone['confidence_level'][i]),
+            'overall_status': flags['overall_status'],
+            'red_flags': flags['red_flags'],
+            'green_flags': flags['green_flags']
+        })
+    return results
+
+def _score_shard(shard_index, records, shard_path):
+    """Worker entry point: score one shard and publish it atomically."""
+    results = score_records(records, _worker_analyzers)
+    tmp_path = shard_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for result in results:
+            f.write(json.dumps(result) + '\n')
+    os.replace(tmp_path, shard_path)
+    return shard_index, len(results)
+
+def shard_path_for(shard_dir, shard_index):
+    return os.path.join(shard_dir, f"shard-{shard_index:06d}.jsonl")
+
+def run(input_path, output_path, workers=None, shard_size=1000, text_field='text', id_field='id',
+        shard_dir=None, with_emotion=False):
+    """
+    Score input_path into output_path (.jsonl or .parquet), resuming from finished shards.
+    Returns a summary dictionary with record counts and throughput.
+    """
+    workers = workers or os.cpu_count() or 1
+    shard_dir = shard_dir or output_path + '.shards'
+    os.makedirs(shard_dir, exist_ok=True)
+    _check_manifest(shard_dir, {'input': os.path.abspath(input_path), 'shard_size': shard_size,
+                                'text_field': text_field, 'id_field': id_field, 'with_emotion': with_emotion})
+
+    start = time.perf_counter()
+    scored = 0
+    skipped_shards = 0
+    total_shards = 0
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(with_emotion,)) as pool:
+        for shard_index, records in iter_shards(read_records(input_path, text_field, id_field), shard_size):
+            total_shards += 1
+            shard_path = shard_path_for(shard_dir, shard_index)
+            if os.path.exists(shard_path):
+                skipped_shards += 1
+                continue
+
+            # Keep a bounded number of shards in flight so memory does not grow with the corpus
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                scored += _report(done, start, scored)
+            pending.add(pool.submit(_score_shard, shard_index, records, shard_path))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            scored += _report(done, start, scored)
+
+    written = _merge_shards(shard_dir, total_shards, output_path)
+    elapsed = time.perf_counter() - start
+    summary = {
+        'shards': total_shards,
+        'resumed_shards': skipped_shards,
+        'records_scored': scored,
+        'records_written': written,
+        'seconds': round(elapsed, 2),
+        'records_per_second': round(scored / elapsed, 1) if elapsed > 0 else 0
+    }
+    print(json.dumps(summary), file=sys.stderr)
+    return summary
+
+def _check_manifest(shard_dir, manifest):
+    """
+    Refuse to resume from shards produced with a different input, shard size, text or
+    id field, or emotion setting, so one output never mixes two configurations.
+    """
+    manifest_path = os.path.join(shard_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise ValueError(f"{shard_dir} holds shards for {previous}, not {manifest}; use another --shard-dir")
+    else:
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+def _report(done, start, scored_before):
+    """Print progress for finished shard futures and return how many records they scored."""
+    count = 0
+    for future in done:
+        shard_index, n = future.result()
+        count += n
+        elapsed = time.perf_counter() - start
+        total = scored_before + count
+        print(f"shard {shard_index} done | {total} records | {total / elapsed:.1f} records/s", file=sys.stderr)
+    return count
+
+def _iter_shard_results(shard_dir, total_shards):
+    for shard_index in range(total_shards):
+        with open(shard_path_for(shard_dir, shard_index), 'r', encoding='utf-8') as f:
+            yield [json.loads(line) for line in f]
+
+def _merge_shards(shard_dir, total_shards, output_path):
+    """Concatenate shard files in order into the final JSONL or Parquet output."""
+    written = 0
+    tmp_path = output_path + '.tmp'
+    if output_path.lower().endswith('.parquet'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow") from e
+
+        # One explicit schema: types inferred from a single shard can be too narrow
+        # (all-empty flag lists, no emotion labels, ids mixing numbers and strings)
+        schema = pa.schema([
+            ('id', pa.string()),
+            ('compound', pa.float64()),
+            ('pos', pa.float64()),
+            ('neu', pa.float64()),
+            ('neg', pa.float64()),
+            ('sentiment_label', pa.string()),
+            ('emotion_label', pa.string()),
+            ('emotion_score', pa.float64()),
+            ('dominant_tone', pa.string()),
+            ('tone_confidence', pa.float64()),
+            ('overall_status', pa.string()),
+            ('red_flags', pa.list_(pa.string())),
+            ('green_flags', pa.list_(pa.string()))
+        ])
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for rows in _iter_shard_results(shard_dir, total_shards):
+                for row in rows:
+                    row['id'] = str(row['id'])
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                written += len(rows)
+    else:
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            for rows in _iter_shard_results(shard_dir, total_shards):
+                for row in rows:
+                    out.write(json.dumps(row) + '\n')
+                written += len(rows)
+    os.replace(tmp_path, output_path)
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a JSONL or CSV corpus with the Brave Haven analyzers.")
+    parser.add_argument('input', help="Input .jsonl or .csv file")
+    parser.add_argument('output', help="Output .jsonl or .parquet file")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--shard-size', type=int, default=1000, help="Records per shard")
+    parser.add_argument('--text-field', default='text', help="Field/column holding the message text")
+    parser.add_argument('--id-field', default='id', help="Field/column holding the record id")
+    parser.add_argument('--shard-dir', default=None, help="Checkpoint directory (default: <output>.shards)")
+    parser.add_argument('--emotion', action='store_true', help="Also run the transformer EmotionAnalyzer")
+    args = parser.parse_args(argv)
+
+    run(args.input, args.output, workers=args.workers, shard_size=args.shard_size,
+        text_field=args.text_field, id_field=args.id_field, shard_dir=args.shard_dir,
+        with_emotion=args.emotion)
+
+if __name__ == '__main__':
+    main()
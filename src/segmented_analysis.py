@@ -0,0 +1,303 @@
+"""
+Segmented analysis of long texts such as call transcripts.
+
+The whole-text analyzers see a long document as one input: the emotion model
+truncates it at its maximum sequence length and tone analysis scores it as one bag
+of words. SegmentedAnalyzer instead splits the cleaned text into sentences or
+overlapping word windows, runs every segment through each analyzer in one batched
+call (analyze_sentiment_batch, analyze_emotions, analyze_tone_batch,
+detect_flags_batch) and then pools the segment results into document-level labels.
+
+Pooling:
+- "max": the strongest segment decides (most extreme sentiment, most confident
+  emotion, highest score per tone)
+- "mean": every segment counts the same
+- "weighted": segments count by word count times their confidence (|compound|,
+  emotion score, tone confidence), so long, clear-cut segments dominate
+
+With an emotion analyzer, segments longer than the emotion model's maximum sequence
+length in subword tokens are split further, so the model never truncates a segment.
+
+The result includes a per-segment timeline with each segment's labels and flags,
+so it shows where in the conversation red flags occur.
+"""
+import numpy as np
+
+from text_preprocessing import get_preprocessor
+from tone_analysis import TONE_CATEGORIES
+
+SEGMENTATIONS = ("sentence", "window")
+POOLINGS = ("max", "mean", "weighted")
+SENTIMENT_KEYS = ('neg', 'neu', 'pos', 'compound')
+SENTENCE_END_CHARS = '.!?'
+SENTENCE_TRAILING_CHARS = '"\')]'
+
+def split_words(n_words, window, stride, start=0, costs=None):
+    """
+    (start, end) word index ranges of windows of `window` words, each starting
+    `stride` words after the previous one (stride < window overlaps them), with the
+    last window ending at n_words.
+    With costs (one number per word, e.g. its subword token count), window and
+    stride are measured in cost instead of words; a window always holds at least one word.
+    """
+    if window < 1 or not 1 <= stride <= window:
+        raise ValueError("window must be at least 1 word and stride between 1 and window words")
+    if costs is None:
+        ranges = []
+        position = start
+        while True:
+            end = min(position + window, n_words)
+            ranges.append((position, end))
+            if end >= n_words:
+                return ranges
+            position += stride
+
+    # cumulative[i] is the cost of words start..i-1
+    cumulative = np.concatenate(([0], np.cumsum(costs[start:n_words])))
+    ranges = []
+    position = 0
+    while True:
+        end = max(position + 1, int(np.searchsorted(cumulative, cumulative[position] + window, side='right')) - 1)
+        end = min(end, n_words - start)
+        ranges.append((start + position, start + end))
+        if end >= n_words - start:
+            return ranges
+        step = int(np.searchsorted(cumulative, cumulative[position] + stride, side='left'))
+        position = min(max(step, position + 1), end)
+
+def segment_ranges(tokens, segmentation="sentence", window=128, stride=96):
+    """
+    (start, end) word index ranges of the segments of a token sequence.
+    "sentence" ends a segment after every token ending in . ! or ? (optionally
+    followed by closing quotes or brackets) and splits sentences longer than window
+    words into windows; "window" slides a window of window words by stride words.
+    """
+    if segmentation not in SEGMENTATIONS:
+        raise ValueError(f"Unknown segmentation '{segmentation}', expected one of {SEGMENTATIONS}")
+    n_words = len(tokens)
+    if not n_words:
+        return []
+    if segmentation == "window":
+        return split_words(n_words, window, stride)
+
+    ranges = []
+    start = 0
+    for i, token in enumerate(tokens):
+        stripped = token.rstrip(SENTENCE_TRAILING_CHARS)
+        if (stripped and stripped[-1] in SENTENCE_END_CHARS) or i == n_words - 1:
+            if i + 1 - start > window:
+                ranges.extend(split_words(i + 1, window, stride, start))
+            else:
+                ranges.append((start, i + 1))
+            start = i + 1
+    return ranges
+
+def _weights(pooling, words, confidence):
+    if pooling == "weighted":
+        weights = words * confidence
+        if weights.sum() > 0:
+            return weights
+    return np.ones_like(words)
+
+def _pool_label(pooling, labels, scores, weights):
+    """Winning label and its score: the top segment for "max", else the label with the most weight."""
+    if not len(labels):
+        return None, 0.0
+    if pooling == "max":
+        best = int(np.argmax(scores))
+        return labels[best], float(scores[best])
+    totals = {}
+    for label, weight in zip(labels, weights):
+        totals[label] = totals.get(label, 0.0) + weight
+    winner = max(totals, key=totals.get)
+    mask = np.array([label == winner for label in labels])
+    if weights[mask].sum() > 0:
+        return winner, float(np.average(scores[mask], weights=weights[mask]))
+    return winner, float(scores[mask].mean())
+
+def fit_token_budget(ranges, costs, budget):
+    """Split every (start, end) word range whose cost exceeds budget into consecutive pieces within it."""
+    fitted = []
+    for start, end in ranges:
+        if sum(costs[start:end]) > budget:
+            fitted.extend(split_words(end, budget, budget, start, costs))
+        else:
+            fitted.append((start, end))
+    return fitted
+
+class SegmentedAnalyzer:
+    """
+    Sentence or sliding-window analysis of long texts with pooled document labels.
+    emotion_analyzer may be None. window and stride are in words; with an emotion
+    analyzer, a segment over the model's maximum length in subword tokens (counted
+    word by word with its tokenizer) is split into consecutive pieces within it, so
+    only a single word longer than the limit can be truncated.
+    """
+    def __init__(self, sentiment_analyzer, emotion_analyzer, tone_analyzer, flag_detector, preprocessor=None,
+                 segmentation="sentence", pooling="weighted", window=128, stride=96):
+        if pooling not in POOLINGS:
+            raise ValueError(f"Unknown pooling '{pooling}', expected one of {POOLINGS}")
+        if segmentation not in SEGMENTATIONS:
+            raise ValueError(f"Unknown segmentation '{segmentation}', expected one of {SEGMENTATIONS}")
+        self.sentiment_analyzer = sentiment_analyzer
+        self.emotion_analyzer = emotion_analyzer
+        self.tone_analyzer = tone_analyzer
+        self.flag_detector = flag_detector
+        self.preprocessor = preprocessor or get_preprocessor()
+        self.segmentation = segmentation
+        self.pooling = pooling
+        self.window = window
+        self.stride = stride
+
+    def segments(self, text):
+        """Segments of the cleaned text: [{'index', 'start_word', 'end_word', 'start', 'end', 'text'}]."""
+        stream = self.preprocessor.token_stream(text)
+        offsets = stream.offsets
+        ranges = segment_ranges(stream.tokens, self.segmentation, self.window, self.stride)
+        budget = self._token_budget()
+        if budget and ranges:
+            tokenizer = self.emotion_analyzer.tokenizer
+            costs = [len(ids) for ids in tokenizer(list(stream.tokens), add_special_tokens=False)['input_ids']]
+            ranges = fit_token_budget(ranges, costs, budget)
+        segments = []
+        for index, (start_word, end_word) in enumerate(ranges):
+            start, end = offsets[start_word][0], offsets[end_word - 1][1]
+            segments.append({'index': index, 'start_word': start_word, 'end_word': end_word,
+                             'start': start, 'end': end, 'text': stream.text[start:end]})
+        return segments
+
+    def _token_budget(self):
+        """Subword tokens a segment may hold without truncation by the emotion model, or None."""
+        if self.emotion_analyzer is None:
+            return None
+        self.emotion_analyzer.warmup()
+        tokenizer = getattr(self.emotion_analyzer, 'tokenizer', None)
+        # Tokenizers without a configured limit report a huge model_max_length
+        if tokenizer is None or tokenizer.model_max_length > 100_000:
+            return None
+        return tokenizer.model_max_length - tokenizer.num_special_tokens_to_add()
+
+    def analyze(self, text):
+        """
+        Analyze text segment by segment and return {'segmentation', 'pooling',
+        'sentiment', 'sentiment_label', 'emotion', 'emotion_label', 'tone', 'flags',
+        'red_flag_segments', 'timeline'}. Document-level labels are pooled from the
+        segments; timeline has one entry per segment (see segments()) with its
+        'sentiment', 'sentiment_label', 'emotion', 'emotion_label', 'dominant_tone',
+        'tone_confidence' and 'flags'. red_flag_segments lists the indexes of
+        segments with red flags.
+        """
+        segments = self.segments(text)
+        texts = [segment['text'] for segment in segments]
+        n = len(texts)
+
+        sentiment = self.sentiment_analyzer.analyze_sentiment_batch(texts)
+        tone = self.tone_analyzer.analyze_tone_batch(texts)
+        if self.emotion_analyzer is not None:
+            emotions = self.emotion_analyzer.analyze_emotions(texts)
+        else:
+            emotions = [None] * n
+        sentiment_labels = [self.sentiment_analyzer.get_sentiment_label(score) for score in sentiment['compound']]
+        emotion_labels = [emotion['label'] if emotion else "neutral" for emotion in emotions]
+        emotion_scores = np.array([emotion['score'] if emotion else np.nan for emotion in emotions], dtype=float)
+        segment_flags = self.flag_detector.detect_flags_batch(
+            *self.flag_detector.encode(sentiment_labels, emotion_labels, list(tone['dominant_tone'])),
+            scores={'compound': sentiment['compound'], 'emotion_score': emotion_scores,
+                    'tone_confidence': tone['confidence_level']},
+            messages=True
+        ) if n else []
+
+        timeline = []
+        for i, segment in enumerate(segments):
+            timeline.append(dict(segment,
+                                 sentiment=float(sentiment['compound'][i]),
+                                 sentiment_label=sentiment_labels[i],
+                                 emotion=emotions[i],
+                                 emotion_label=emotion_labels[i],
+                                 dominant_tone=str(tone['dominant_tone'][i]),
+                                 tone_confidence=float(tone['confidence_level'][i]),
+                                 flags=segment_flags[i]))
+
+        words = np.array([segment['end_word'] - segment['start_word'] for segment in segments], dtype=float)
+        pooled_sentiment = self._pool_sentiment(sentiment, words)
+        sentiment_label = self.sentiment_analyzer.get_sentiment_label(pooled_sentiment['compound'])
+        pooled_emotion = self._pool_emotion(emotions, words)
+        emotion_label = pooled_emotion['label'] if pooled_emotion else "neutral"
+        pooled_tone = self._pool_tone(tone, words)
+        flags = self.flag_detector.detect_flags(sentiment_label, emotion_label, pooled_tone['dominant_tone'], {
+            'compound': pooled_sentiment['compound'],
+            'emotion_score': pooled_emotion['score'] if pooled_emotion else None,
+            'tone_confidence': pooled_tone['confidence_level']
+        })
+
+        return {
+            'segmentation': self.segmentation,
+            'pooling': self.pooling,
+            'sentiment': pooled_sentiment,
+            'sentiment_label': sentiment_label,
+            'emotion': pooled_emotion,
+            'emotion_label': emotion_label,
+            'tone': pooled_tone,
+            'flags': flags,
+            'red_flag_segments': [entry['index'] for entry in timeline if entry['flags']['red_flags']],
+            'timeline': timeline
+        }
+
+    def _pool_sentiment(self, sentiment, words):
+        if not len(words):
+            return dict.fromkeys(SENTIMENT_KEYS, 0.0)
+        compound = sentiment['compound']
+        if self.pooling == "max":
+            best = int(np.argmax(np.abs(compound)))
+            return {key: round(float(sentiment[key][best]), 4) for key in SENTIMENT_KEYS}
+        weights = _weights(self.pooling, words, np.abs(compound))
+        return {key: round(float(np.average(sentiment[key], weights=weights)), 4) for key in SENTIMENT_KEYS}
+
+    def _pool_emotion(self, emotions, words):
+        found = [(i, emotion) for i, emotion in enumerate(emotions) if emotion]
+        if not found:
+            return None
+        labels = [emotion['label'] for _, emotion in found]
+        scores = np.array([emotion['score'] for _, emotion in found], dtype=float)
+        weights = _weights(self.pooling, words[[i for i, _ in found]], scores)
+        label, score = _pool_label(self.pooling, labels, scores, weights)
+        return {'label': label, 'score': round(score, 4)}
+
+    def _pool_tone(self, tone, words):
+        """Pooled normalized tone scores (0-100, summing to 100), dominant tone and its share."""
+        scores = np.zeros(len(TONE_CATEGORIES))
+        if len(words):
+            columns = np.column_stack([tone['normalized_scores'][name] for name in TONE_CATEGORIES])
+            if self.pooling == "max":
+                scores = columns.max(axis=0)
+            else:
+                weights = _weights(self.pooling, words, tone['confidence_level'])
+                scores = np.average(columns, axis=0, weights=weights)
+        total = scores.sum()
+        if total <= 0:
+            return {'normalized_scores': dict.fromkeys(TONE_CATEGORIES, 0.0), 'dominant_tone': 'neutral',
+                    'confidence_level': 0.0}
+        normalized = np.round(scores / total * 100, 2)
+        dominant = int(np.argmax(normalized))
+        return {
+            'normalized_scores': {name: float(value) for name, value in zip(TONE_CATEGORIES, normalized)},
+            'dominant_tone': TONE_CATEGORIES[dominant],
+            'confidence_level': float(normalized[dominant])
+        }
+
+if __name__ == '__main__':
+    from sentiment_analysis import SentimentAnalyzer
+    from tone_analysis import ToneAnalyzer
+    from red_green_flag import FlagDetector
+
+    transcript = ("Thanks for coming today, I really appreciate it. "
+                  "But honestly this is STUPID and I hate it!! Why would you do that? "
+                  "Maybe we could talk about it tomorrow.")
+    for pooling in POOLINGS:
+        analyzer = SegmentedAnalyzer(SentimentAnalyzer(), None, ToneAnalyzer(), FlagDetector(), pooling=pooling)
+        result = analyzer.analyze(transcript)
+        print(f"{pooling}: {result['sentiment_label']}, {result['tone']['dominant_tone']}, "
+              f"{result['flags']['overall_status']}, red flags in segments {result['red_flag_segments']}")
+    for entry in result['timeline']:
+        print(f"  [{entry['index']}] {entry['sentiment_label']:>8} {entry['dominant_tone']:>10} "
+              f"{entry['flags']['overall_status']:<10} {entry['text']}")
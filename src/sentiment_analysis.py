@@ -1,15 +1,52 @@
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from concurrent.futures import ProcessPoolExecutor
+from nltk.sentiment.vader import SentimentIntensityAnalyzer, SentiText, VaderConstants
 import nltk
+import numpy as np
+import string
+import threading
 
-try:
-    nltk.data.find("sentiment/vader_lexicon")
-except LookupError:
-    nltk.download("vader_lexicon")
+from assets import ensure_nltk_resource, timed_load
+from instrumentation import timer
+
+# Bump when scoring changes so cached results are not reused
+ANALYZER_VERSION = "1"
+
+# What VADER's REGEX_REMOVE_PUNCTUATION strips, as a str.translate table
+_REMOVE_PUNCTUATION = str.maketrans('', '', string.punctuation)
+
+_PUNC_SET = frozenset(VaderConstants.PUNC_LIST)
+
+SENTIMENT_KEYS = ("neg", "neu", "pos", "compound")
 
 class SentimentAnalyzer:
-    def __init__(self):
-        self.analyzer = SentimentIntensityAnalyzer()
+    def __init__(self, cache=None):
+        """
+        cache: optional ResultCache shared with the other analyzers.
+        The VADER lexicon is loaded on first use or by warmup().
+        """
+        self._analyzer = None
+        self._load_lock = threading.Lock()
+        self.cache = cache
+        self.cache_version = f"{ANALYZER_VERSION}:nltk-{nltk.__version__}"
+
+    @property
+    def analyzer(self):
+        """The NLTK SentimentIntensityAnalyzer, loaded on first access."""
+        if self._analyzer is None:
+            self.warmup()
+        return self._analyzer
+
+    def warmup(self):
+        """Load the VADER lexicon now (downloading it unless offline mode is on)."""
+        if self._analyzer is not None:
+            return
+        with self._load_lock:
+            if self._analyzer is None:
+                with timed_load("vader_lexicon"):
+                    ensure_nltk_resource("vader_lexicon")
+                    self._analyzer = SentimentIntensityAnalyzer()
 
+    @timer("analyze_sentiment")
     def analyze_sentiment(self, text):
         """
         Analyzes the sentiment of the given text using VADER.
@@ -18,9 +55,150 @@ class SentimentAnalyzer:
         if not text or not isinstance(text, str):
             return {"neg": 0.0, "neu": 0.0, "pos": 0.0, "compound": 0.0}
         
+        if self.cache is not None:
+            return self.cache.get_or_compute("sentiment", self.cache_version, text,
+                                             lambda: self.analyzer.polarity_scores(text))
+
         vs = self.analyzer.polarity_scores(text)
         return vs
 
+    @timer("analyze_sentiment_tokens")
+    def analyze_sentiment_tokens(self, stream):
+        """
+        analyze_sentiment for a TokenStream. VADER normally re-splits the text and
+        builds a (words x punctuation) lookup table to strip punctuation from each
+        word; here its word list is derived from the stream's tokens instead.
+        Scores are identical to analyze_sentiment(stream.text).
+        """
+        if not stream.text:
+            return {"neg": 0.0, "neu": 0.0, "pos": 0.0, "compound": 0.0}
+        
+        if self.cache is not None:
+            return self.cache.get_or_compute("sentiment", self.cache_version, stream.text,
+                                             lambda: self._score_tokens(stream.text, stream.tokens))
+        return self._score_tokens(stream.text, stream.tokens)
+
+    @timer("analyze_sentiment_batch")
+    def analyze_sentiment_batch(self, texts, processes=None, chunk_size=5000):
+        """
+        Scores many texts at once, e.g. for backfills.
+        Tokens are interned across the batch, so each distinct token is stripped,
+        lowercased and looked up in the VADER lexicon once; tokens outside the lexicon
+        skip VADER's negation/booster/caps rule passes, which leave them at 0 anyway.
+        Returns {'neg', 'neu', 'pos', 'compound'} NumPy float arrays in input order,
+        identical to analyze_sentiment on each text (empty or non-string inputs score 0).
+        With processes > 1 the texts are split into chunk_size chunks and scored by a
+        process pool whose workers each load their own analyzer.
+        """
+        texts = list(texts)
+        if processes and processes > 1 and len(texts) > chunk_size:
+            chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_batch_worker) as pool:
+                parts = list(pool.map(_score_batch_chunk, chunks))
+            return {key: np.concatenate([part[key] for part in parts]) for key in SENTIMENT_KEYS}
+        return self._score_batch(texts)
+
+    def _score_batch(self, texts):
+        scores = {key: np.zeros(len(texts)) for key in SENTIMENT_KEYS}
+        token_info = {}
+        for row, text in enumerate(texts):
+            if not text or not isinstance(text, str):
+                continue
+            if self.cache is not None:
+                result = self.cache.get_or_compute("sentiment", self.cache_version, text,
+                                                   lambda: self._score_tokens(text, text.split(), token_info))
+            else:
+                result = self._score_tokens(text, text.split(), token_info)
+            for key in SENTIMENT_KEYS:
+                scores[key][row] = result[key]
+        return scores
+
+    def _score_tokens(self, text, tokens, token_info=None):
+        """polarity_scores(text) from the text's whitespace tokens."""
+        token_info = {} if token_info is None else token_info
+        return self._score_sentitext(self._sentitext(text, tokens, token_info), token_info)
+
+    def _token_info(self, token, token_info):
+        """(punctuation-free form, lowercase form, in lexicon, is booster) of a token, computed once per batch."""
+        info = token_info.get(token)
+        if info is None:
+            lower = token.lower()
+            info = token_info[token] = (token.translate(_REMOVE_PUNCTUATION), lower, lower in self.analyzer.lexicon,
+                                        lower in self.analyzer.constants.BOOSTER_DICT)
+        return info
+
+    def _sentitext(self, text, tokens, token_info=None):
+        """SentiText for text built from its whitespace tokens."""
+        token_info = {} if token_info is None else token_info
+        constants = self.analyzer.constants
+        sentitext = SentiText.__new__(SentiText)
+        sentitext.text = text
+        sentitext.PUNC_LIST = constants.PUNC_LIST
+        sentitext.REGEX_REMOVE_PUNCTUATION = constants.REGEX_REMOVE_PUNCTUATION
+        
+        # SentiText maps 'p+word' and 'word+p' (p in PUNC_LIST, word a punctuation-free
+        # word of the text) to 'word'; a word never contains punctuation, so p is the
+        # whole leading or trailing punctuation run of the token
+        words_only = {word for word in (self._token_info(token, token_info)[0] for token in tokens) if len(word) > 1}
+        words_and_emoticons = []
+        for token in tokens:
+            if len(token) <= 1:
+                continue
+            if token[-1] in string.punctuation:
+                stripped = token.rstrip(string.punctuation)
+                if stripped in words_only and token[len(stripped):] in _PUNC_SET:
+                    token = stripped
+            elif token[0] in string.punctuation:
+                stripped = token.lstrip(string.punctuation)
+                if stripped in words_only and token[:len(token) - len(stripped)] in _PUNC_SET:
+                    token = stripped
+            words_and_emoticons.append(token)
+        
+        sentitext.words_and_emoticons = words_and_emoticons
+        sentitext.is_cap_diff = sentitext.allcap_differential(words_and_emoticons)
+        return sentitext
+
+    def _score_sentitext(self, sentitext, token_info=None):
+        """The scoring half of SentimentIntensityAnalyzer.polarity_scores."""
+        token_info = {} if token_info is None else token_info
+        analyzer = self.analyzer
+        words_and_emoticons = sentitext.words_and_emoticons
+        first_index = {}
+        for index, token in enumerate(words_and_emoticons):
+            first_index.setdefault(token, index)
+        
+        sentiments = []
+        for item in words_and_emoticons:
+            _, lower, in_lexicon, is_booster = self._token_info(item, token_info)
+            i = first_index[item]
+            if (
+                i < len(words_and_emoticons) - 1
+                and lower == "kind"
+                and words_and_emoticons[i + 1].lower() == "of"
+            ) or is_booster:
+                sentiments.append(0)
+                continue
+            if not in_lexicon:
+                # sentiment_valence only adjusts lexicon words
+                sentiments.append(0)
+                continue
+            sentiments = analyzer.sentiment_valence(0, sentitext, item, i, sentiments)
+        
+        sentiments = analyzer._but_check(words_and_emoticons, sentiments)
+        return analyzer.score_valence(sentiments, sentitext.text)
+
+    def __getstate__(self):
+        # The cache holds locks and a database handle; pickled copies (e.g. sent to
+        # worker processes) run uncached
+        state = self.__dict__.copy()
+        state['cache'] = None
+        del state['_load_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load_lock = threading.Lock()
+
     def get_sentiment_label(self, compound_score, threshold=0.05):
         """
         Returns a sentiment label (positive, negative, neutral) based on the compound score.
@@ -32,6 +210,16 @@ class SentimentAnalyzer:
         else:
             return "Neutral"
 
+# Analyzer of the current analyze_sentiment_batch worker process
+_worker_analyzer = None
+
+def _init_batch_worker():
+    global _worker_analyzer
+    _worker_analyzer = SentimentAnalyzer()
+
+def _score_batch_chunk(texts):
+    return _worker_analyzer._score_batch(texts)
+
 if __name__ == '__main__':
     analyzer = SentimentAnalyzer()
 
@@ -0,0 +1,379 @@
+"""
+HTTP/JSON analysis service for other systems.
+
+An asyncio server (standard library only) that loads the analyzers once and serves
+the AnalysisPipeline:
+
+    POST /analyze        {"text": "..."}           -> AnalysisPipeline.run result
+    POST /analyze/batch  {"texts": ["...", ...]}   -> list of results
+    GET  /healthz                                  -> {"status": "ok"}
+    GET  /metrics                                  -> Prometheus text format
+    GET  /metrics?format=json                      -> the same metrics as JSON
+
+Requests that arrive within max_wait_ms of each other are merged into one
+AnalysisPipeline.run_batch call (one emotion-model batch of up to max_batch_size
+texts), run on a single inference thread so the event loop keeps accepting
+requests. At most max_queue texts may wait for inference; beyond that requests are
+rejected right away with 503 and a Retry-After header instead of queueing
+unbounded work.
+
+Usage:
+    python src/server.py --port 8080 [--max-batch-size 32] [--max-wait-ms 5] [--no-emotion]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from instrumentation import REGISTRY
+from pipeline import AnalysisPipeline
+from red_green_flag import FlagDetector
+from result_cache import ResultCache
+from sentiment_analysis import SentimentAnalyzer
+from text_preprocessing import get_preprocessor
+from tone_analysis import ToneAnalyzer
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADER_LINES = 100
+MAX_TEXTS_PER_REQUEST = 256
+# Seconds an idle keep-alive connection is kept open
+KEEP_ALIVE_TIMEOUT = 30
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+ROUTES = ('/analyze', '/analyze/batch', '/healthz', '/metrics')
+
+class Overloaded(Exception):
+    """The inference queue is full."""
+
+class ServerMetrics:
+    """Request, batching and backpressure metrics, kept in the instrumentation registry."""
+    def __init__(self, registry=REGISTRY):
+        self.registry = registry
+        self.batch_sizes = registry.histogram('analysis_batch_size', "Texts per inference batch",
+                                              buckets=BATCH_SIZE_BUCKETS)
+        self.batch_seconds = registry.histogram('analysis_batch_seconds', "Seconds per inference batch")
+        self.rejected = registry.counter('analysis_rejected_total', "Requests rejected because the queue was full")
+        self.started = time.time()
+
+    def observe_request(self, path, status, seconds):
+        # Unknown paths share one label so clients cannot grow the label set
+        path = path if path in ROUTES else 'other'
+        self.registry.counter('analysis_requests_total', "HTTP requests", path=path, status=status).inc()
+        self.registry.histogram('analysis_request_seconds', "HTTP request latency", path=path).observe(seconds)
+
+    def update_gauges(self, batcher):
+        self.registry.gauge('analysis_queue_depth', "Texts waiting for inference").set(batcher.pending)
+        self.registry.gauge('analysis_queue_capacity', "Most texts allowed to wait").set(batcher.max_queue)
+        self.registry.gauge('analysis_uptime_seconds', "Seconds since the server started").set(
+            round(time.time() - self.started, 3))
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching: submit() queues one item and waits for its result; a
+    single worker task takes the first waiting item, keeps collecting until
+    max_batch_size items or max_wait_ms have passed, and runs process_batch(items)
+    on the executor. While a batch runs, new items queue up for the next one.
+    """
+    def __init__(self, process_batch, executor, max_batch_size=32, max_wait_ms=5, max_queue=256, metrics=None):
+        self.process_batch = process_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.metrics = metrics
+        self.pending = 0
+        self._queue = asyncio.Queue()
+        self._worker = None
+
+    def start(self):
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    def reserve(self, n):
+        """Admit n items or raise Overloaded, so a request is accepted or rejected as a whole."""
+        if self.pending + n > self.max_queue:
+            if self.metrics is not None:
+                self.metrics.rejected.inc()
+            raise Overloaded()
+        self.pending += n
+
+    async def submit(self, item):
+        """Queue one item admitted by reserve() and return its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Drain whatever else is already waiting, up to the batch size
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            items = [item for item, _ in batch]
+            start = time.perf_counter()
+            results = await loop.run_in_executor(self.executor, self._process, items)
+            if self.metrics is not None:
+                self.metrics.batch_sizes.observe(len(batch))
+                self.metrics.batch_seconds.observe(time.perf_counter() - start)
+            self.pending -= len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue  # The client went away
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _process(self, items):
+        """Run one batch; if it fails, retry item by item so one bad input only fails its own request."""
+        try:
+            return self.process_batch(items)
+        except Exception as e:
+            if len(items) == 1:
+                return [e]
+        results = []
+        for item in items:
+            try:
+                results.append(self.process_batch([item])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+def _json_default(value):
+    # NumPy scalars and arrays from the analyzers
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class AnalysisServer:
+    def __init__(self, pipeline, max_batch_size=32, max_wait_ms=5, max_queue=256):
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+        self.pipeline = pipeline
+        # A request larger than the queue could never be admitted, so it is refused outright
+        self.max_texts = min(MAX_TEXTS_PER_REQUEST, max_queue)
+        self.metrics = ServerMetrics()
+        # One inference thread: batches run one after another and never contend for the model
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.batcher = MicroBatcher(pipeline.run_batch, self.executor, max_batch_size=max_batch_size,
+                                    max_wait_ms=max_wait_ms, max_queue=max_queue, metrics=self.metrics)
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.stop()
+        self.executor.shutdown(wait=False)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HTTPError as e:
+                    await self._respond(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                path, _, query = target.partition('?')
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                start = time.perf_counter()
+                try:
+                    status, payload, extra_headers = await self._route(method, path, query, body)
+                except HTTPError as e:
+                    status, payload, extra_headers = e.status, {'error': str(e)}, e.headers
+                except Exception as e:
+                    status, payload, extra_headers = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}, {}
+                self.metrics.observe_request(path, int(status), time.perf_counter() - start)
+                await self._respond(writer, status, payload, extra_headers, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Parse one HTTP/1.1 request; returns None when the client closed the connection."""
+        request_line = await self._read_line(reader, HTTPStatus.REQUEST_URI_TOO_LONG, "Request line too long")
+        if not request_line:
+            return None
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line") from None
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await self._read_line(reader, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Header line too long")
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+        if version == 'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive':
+            headers['connection'] = 'close'
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length") from None
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+
+    @staticmethod
+    async def _read_line(reader, status, message):
+        """One line from reader; a line longer than the reader's limit raises HTTPError(status)."""
+        try:
+            return await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            raise HTTPError(status, message) from None
+
+    async def _route(self, method, path, query, body):
+        if path == '/analyze' or path == '/analyze/batch':
+            if method != 'POST':
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST")
+            request = self._parse_json(body)
+            if path == '/analyze':
+                texts = [request.get('text')]
+            else:
+                texts = request.get('texts')
+                if not isinstance(texts, list):
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "'texts' must be a list of strings")
+                if len(texts) > self.max_texts:
+                    raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                    f"'texts' may hold at most {self.max_texts} strings")
+            if not all(isinstance(text, str) for text in texts):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Texts must be strings")
+
+            try:
+                self.batcher.reserve(len(texts))
+            except Overloaded:
+                raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server is overloaded, retry later",
+                                {'Retry-After': '1'}) from None
+            results = await asyncio.gather(*(self.batcher.submit(text) for text in texts))
+            return HTTPStatus.OK, results[0] if path == '/analyze' else results, {}
+
+        if method != 'GET':
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET")
+        if path == '/healthz':
+            return HTTPStatus.OK, {'status': 'ok'}, {}
+        if path == '/metrics':
+            self.metrics.update_gauges(self.batcher)
+            if 'format=json' in query:
+                return HTTPStatus.OK, self.metrics.registry.snapshot(), {}
+            return HTTPStatus.OK, self.metrics.registry.render_prometheus(), {'Content-Type': 'text/plain; version=0.0.4'}
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+
+    @staticmethod
+    def _parse_json(body):
+        try:
+            request = json.loads(body)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be JSON") from None
+        if not isinstance(request, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+        return request
+
+    @staticmethod
+    async def _respond(writer, status, payload, extra_headers=None, keep_alive=True):
+        status = HTTPStatus(status)
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+        else:
+            body = json.dumps(payload, default=_json_default).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body)),
+                   'Connection': 'keep-alive' if keep_alive else 'close'}
+        headers.update(extra_headers or {})
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode('latin-1') + b'\r\n' + body)
+        await writer.drain()
+
+def build_pipeline(with_emotion=True, cache_db=None):
+    """Load every analyzer once and warm them up before the server accepts requests."""
+    cache = ResultCache(max_entries=4096, db_path=cache_db)
+    preprocessor = get_preprocessor()
+    sentiment = SentimentAnalyzer(cache=cache)
+    emotion = None
+    if with_emotion:
+        from emotion_analysis import EmotionAnalyzer
+        emotion = EmotionAnalyzer(cache=cache)
+    for component in (preprocessor, sentiment, emotion):
+        if component is not None:
+            component.warmup()
+    # run_batch does its own batching, so the per-request stage threads are not needed
+    return AnalysisPipeline(sentiment, emotion, ToneAnalyzer(cache=cache), FlagDetector(), preprocessor=preprocessor,
+                            cache=cache, workers=0)
+
+async def serve(args):
+    pipeline = build_pipeline(with_emotion=not args.no_emotion, cache_db=args.cache_db)
+    server = AnalysisServer(pipeline, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms,
+                            max_queue=args.max_queue)
+    listener = await server.start(args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port}", flush=True)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the analysis pipeline over HTTP/JSON.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-size', type=int, default=32, help="Most texts per inference batch")
+    parser.add_argument('--max-wait-ms', type=float, default=5, help="How long a batch waits to fill up")
+    parser.add_argument('--max-queue', type=int, default=256, help="Most texts waiting before requests get 503")
+    parser.add_argument('--no-emotion', action='store_true', help="Skip the transformer emotion model")
+    parser.add_argument('--cache-db', default=os.environ.get("BRAVE_HAVEN_CACHE_DB"),
+                        help="SQLite file for the result cache (default: BRAVE_HAVEN_CACHE_DB)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+import numpy as np
+
+# Per-millisecond energy is computed over blocks of this many milliseconds, so
+# memory stays bounded for hour-long recordings
+ENERGY_BLOCK_MS = 60000
+
+def samples_from_segment(audio_segment):
+    """
+    Returns the interleaved samples of a pydub AudioSegment as a signed integer array,
+    read the same way audioop (and therefore AudioSegment.rms) reads them.
+    """
+    data = audio_segment.raw_data
+    width = audio_segment.sample_width
+    if width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        return np.where(samples >= 1 << 23, samples - (1 << 24), samples)
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}[width]
+    return np.frombuffer(data, dtype=dtype)
+
+def ms_frame_boundaries(n_ms, frame_rate):
+    """
+    First frame of every millisecond 0..n_ms, computed like AudioSegment slicing
+    (int(ms * (frame_rate / 1000.0))).
+    """
+    return np.floor(np.arange(n_ms + 1) * (frame_rate / 1000.0)).astype(np.int64)
+
+def ms_energy(samples, channels, boundaries):
+    """
+    Sum of squared samples for each millisecond bin [boundaries[j], boundaries[j + 1]).
+    Frames past the end of samples count as zeros, like AudioSegment's padding.
+    """
+    n_frames = len(samples) // channels
+    n_bins = len(boundaries) - 1
+    energy = np.zeros(n_bins, dtype=np.float64 if samples.dtype.itemsize >= 4 else np.int64)
+    for block_start in range(0, n_bins, ENERGY_BLOCK_MS):
+        block_end = min(block_start + ENERGY_BLOCK_MS, n_bins)
+        first_frame = min(boundaries[block_start], n_frames)
+        last_frame = min(boundaries[block_end], n_frames)
+        if last_frame <= first_frame:
+            continue
+        block = samples[first_frame * channels:last_frame * channels].astype(energy.dtype)
+        frame_energy = (block * block).reshape(-1, channels).sum(axis=1)
+        frame_cumsum = np.concatenate(([0], np.cumsum(frame_energy)))
+        edges = np.clip(boundaries[block_start:block_end + 1], first_frame, last_frame) - first_frame
+        energy[block_start:block_end] = np.diff(frame_cumsum[edges])
+    return energy
+
+def silence_threshold_amplitude(silence_thresh, sample_width):
+    """dBFS threshold converted to an RMS amplitude, as pydub.silence does."""
+    return (10 ** (silence_thresh / 20.0)) * (2 ** (sample_width * 8) / 2)
+
+def silent_window_starts(energy, boundaries, channels, min_silence_len, threshold):
+    """
+    Boolean array over window starts 0..len(energy) - min_silence_len: True where the
+    integer RMS of the min_silence_len window is at or below threshold.
+    """
+    n_windows = len(energy) - min_silence_len + 1
+    if n_windows <= 0:
+        return np.zeros(0, dtype=bool)
+    energy_cumsum = np.concatenate(([0], np.cumsum(energy)))
+    starts = np.arange(n_windows)
+    window_energy = energy_cumsum[starts + min_silence_len] - energy_cumsum[starts]
+    window_samples = (boundaries[starts + min_silence_len] - boundaries[starts]) * channels
+    rms = np.floor(np.sqrt(window_energy / np.maximum(window_samples, 1)))
+    return rms <= threshold
+
+def silent_ranges_from_starts(silent, min_silence_len, offset=0):
+    """
+    Merges silent window starts into [start, end] ms ranges; windows closer than
+    min_silence_len are joined, like pydub.silence.detect_silence with seek_step=1.
+    """
+    starts = np.flatnonzero(silent)
+    if not len(starts):
+        return []
+    breaks = np.flatnonzero(np.diff(starts) > min_silence_len)
+    range_starts = np.concatenate(([starts[0]], starts[breaks + 1]))
+    range_ends = np.concatenate((starts[breaks], [starts[-1]])) + min_silence_len
+    return [[int(start) + offset, int(end) + offset] for start, end in zip(range_starts, range_ends)]
+
+def nonsilent_from_silent(silent_ranges, seg_len):
+    """Complement of silent ranges within [0, seg_len], like pydub.silence.detect_nonsilent."""
+    if not silent_ranges:
+        return [[0, seg_len]]
+    if silent_ranges[0][0] == 0 and silent_ranges[0][1] == seg_len:
+        return []
+
+    nonsilent_ranges = []
+    prev_end = 0
+    for start, end in silent_ranges:
+        nonsilent_ranges.append([prev_end, start])
+        prev_end = end
+    if silent_ranges[-1][1] != seg_len:
+        nonsilent_ranges.append([prev_end, seg_len])
+    if nonsilent_ranges[0] == [0, 0]:
+        nonsilent_ranges.pop(0)
+    return nonsilent_ranges
+
+def pad_ranges(nonsilent_ranges, keep_silence):
+    """Extends ranges by keep_silence ms, splitting overlaps evenly as pydub does."""
+    output_ranges = [[start - keep_silence, end + keep_silence] for start, end in nonsilent_ranges]
+    for current, following in zip(output_ranges, output_ranges[1:]):
+        if following[0] < current[1]:
+            current[1] = (current[1] + following[0]) // 2
+            following[0] = current[1]
+    return output_ranges
+
+def detect_silence(audio_segment, min_silence_len=1000, silence_thresh=-16):
+    """
+    Vectorized pydub.silence.detect_silence (seek_step=1): silent [start, end] ranges in ms.
+    """
+    seg_len = len(audio_segment)
+    if seg_len < min_silence_len:
+        return []
+    channels = audio_segment.channels
+    boundaries = ms_frame_boundaries(seg_len, audio_segment.frame_rate)
+    energy = ms_energy(samples_from_segment(audio_segment), channels, boundaries)
+    threshold = silence_threshold_amplitude(silence_thresh, audio_segment.sample_width)
+    silent = silent_window_starts(energy, boundaries, channels, min_silence_len, threshold)
+    return silent_ranges_from_starts(silent, min_silence_len)
+
+def detect_nonsilent(audio_segment, min_silence_len=1000, silence_thresh=-16):
+    """
+    Vectorized pydub.silence.detect_nonsilent (seek_step=1): speech [start, end] ranges in ms.
+    """
+    return nonsilent_from_silent(detect_silence(audio_segment, min_silence_len, silence_thresh), len(audio_segment))
+
+def speech_ranges(audio_segment, min_silence_len=1000, silence_thresh=-16, keep_silence=100):
+    """
+    [start, end] ms ranges of the chunks split_on_silence returns, clipped to the audio.
+    """
+    seg_len = len(audio_segment)
+    if isinstance(keep_silence, bool):
+        keep_silence = seg_len if keep_silence else 0
+    padded = pad_ranges(detect_nonsilent(audio_segment, min_silence_len, silence_thresh), keep_silence)
+    return [[max(start, 0), min(end, seg_len)] for start, end in padded]
+
+def split_on_silence(audio_segment, min_silence_len=1000, silence_thresh=-16, keep_silence=100):
+    """
+    Drop-in replacement for pydub.silence.split_on_silence (seek_step=1) that measures
+    window RMS over the whole sample array with NumPy instead of slice by slice.
+    """
+    return [audio_segment[start:end]
+            for start, end in speech_ranges(audio_segment, min_silence_len, silence_thresh, keep_silence)]
+
+class StreamingSplitter:
+    """
+    Incremental split_on_silence for PCM that arrives in windows (e.g. from a decoder pipe).
+    feed() returns the speech chunks that became final with the new audio and finish()
+    returns the rest, each as (start_ms, end_ms, pcm_bytes). Chunk boundaries match
+    split_on_silence on the whole recording, except that with max_chunk_ms set a
+    segment with no pause is cut every max_chunk_ms. Only the audio of the pending
+    chunk is buffered, so memory does not grow with the recording length.
+    """
+    def __init__(self, frame_rate, sample_width=2, channels=1, min_silence_len=1000, silence_thresh=-16,
+                 keep_silence=100, max_chunk_ms=None):
+        if isinstance(keep_silence, bool):
+            raise ValueError("StreamingSplitter needs keep_silence in ms; the recording length is not known upfront")
+        self.frame_rate = frame_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.frame_width = sample_width * channels
+        self.min_silence_len = min_silence_len
+        self.keep_silence = keep_silence
+        self.max_chunk_ms = max_chunk_ms
+        self.threshold = silence_threshold_amplitude(silence_thresh, sample_width)
+        self._dtype = {1: np.int8, 2: np.int16, 4: np.int32}[sample_width]
+
+        self._buffer = bytearray()
+        self._buffer_start_frame = 0
+        self._total_frames = 0
+        self._partial = b''  # bytes of an incomplete trailing frame
+
+        self._energy = np.zeros(0, dtype=np.float64 if sample_width >= 4 else np.int64)
+        self._energy_start_ms = 0  # ms bin of self._energy[0]
+        self._next_bin = 0         # next ms bin whose energy is not computed yet
+        self._next_window = 0      # next window start not evaluated yet
+
+        self._range = None         # open silent range [first start, last start]
+        self._pending_start = 0    # start of the chunk being collected
+        self._pending_end = None   # set once the chunk's silence started but its padding is not final
+        self._last_silence_end = None
+        self._finished = False
+
+    def _boundary(self, ms):
+        return int(np.floor(ms * (self.frame_rate / 1000.0)))
+
+    def feed(self, pcm):
+        """Add raw PCM bytes; returns newly completed chunks."""
+        if self._finished:
+            raise ValueError("feed() called after finish()")
+        pcm = self._partial + bytes(pcm)
+        usable = len(pcm) - len(pcm) % self.frame_width
+        self._partial = pcm[usable:]
+        self._buffer += pcm[:usable]
+        self._total_frames += usable // self.frame_width
+
+        # Energy for every millisecond bin that is now complete
+        last_bin = self._next_bin
+        while self._boundary(last_bin + 1) <= self._total_frames:
+            last_bin += 1
+        self._add_energy(last_bin)
+
+        chunks = []
+        self._evaluate_windows(len(self._energy) + self._energy_start_ms - self.min_silence_len, chunks)
+        self._force_cut(chunks)
+        self._trim()
+        return chunks
+
+    def finish(self):
+        """Flush the end of the recording; returns the remaining chunks."""
+        self._finished = True
+        seg_len = round(1000 * (self._total_frames / self.frame_rate))
+        chunks = []
+        if self._next_bin > seg_len:
+            self._energy = self._energy[:max(seg_len - self._energy_start_ms, 0)]
+            self._next_bin = seg_len
+        # Bins past the decoded frames count as silence, like AudioSegment's padding
+        self._add_energy(seg_len)
+        self._evaluate_windows(seg_len - self.min_silence_len, chunks)
+        if self._range is not None:
+            self._close_range(chunks, seg_len)
+
+        # Trailing speech after the last silence (or the whole recording without silence)
+        if self._last_silence_end != seg_len and seg_len > self._pending_start:
+            chunks.append(self._emit(self._pending_start, seg_len))
+        return chunks
+
+    def _add_energy(self, end_bin):
+        """Compute energy for bins [next_bin, end_bin)."""
+        if end_bin <= self._next_bin:
+            return
+        boundaries = ms_frame_boundaries(end_bin, self.frame_rate)[self._next_bin:]
+        first_frame = boundaries[0]
+        start = (first_frame - self._buffer_start_frame) * self.frame_width
+        samples = np.frombuffer(bytes(self._buffer[start:]), dtype=self._dtype)
+        new_energy = ms_energy(samples, self.channels, boundaries - first_frame)
+        self._energy = np.concatenate((self._energy, new_energy.astype(self._energy.dtype)))
+        self._next_bin = end_bin
+
+    def _evaluate_windows(self, last_window, chunks):
+        """Classify window starts next_window..last_window and advance the range state machine."""
+        if last_window < self._next_window:
+            return
+        offset = self._next_window - self._energy_start_ms
+        energy = self._energy[offset:offset + last_window - self._next_window + self.min_silence_len]
+        boundaries = ms_frame_boundaries(last_window + self.min_silence_len, self.frame_rate)[self._next_window:]
+        silent = silent_window_starts(energy, boundaries, self.channels, self.min_silence_len, self.threshold)
+
+        starts = np.flatnonzero(silent) + self._next_window
+        if len(starts):
+            breaks = np.flatnonzero(np.diff(starts) > 1)
+            run_starts = np.concatenate(([starts[0]], starts[breaks + 1]))
+            run_ends = np.concatenate((starts[breaks], [starts[-1]]))
+            for run_start, run_end in zip(run_starts.tolist(), run_ends.tolist()):
+                # Starts inside a run are consecutive, so only the first can open a new range
+                self._silent_start(run_start, chunks)
+                self._range[1] = run_end
+                self._maybe_emit_early(chunks)
+
+        self._next_window = last_window + 1
+        # No later window can merge into a range whose last start is min_silence_len behind
+        if self._range is not None and last_window >= self._range[1] + self.min_silence_len:
+            self._close_range(chunks)
+
+    def _silent_start(self, p, chunks):
+        if self._range is not None and p > self._range[1] + self.min_silence_len:
+            self._close_range(chunks)
+        if self._range is None:
+            self._range = [p, p]
+            # Speech precedes every silence except one starting at 0 ms
+            if p > 0:
+                self._pending_end = p
+        else:
+            self._range[1] = p
+        self._maybe_emit_early(chunks)
+
+    def _maybe_emit_early(self, chunks):
+        """The chunk before a silence is final once the silence is long enough for its padding."""
+        if self._pending_end is None:
+            return
+        silence_start, last_start = self._range
+        if last_start + self.min_silence_len - silence_start >= 2 * self.keep_silence:
+            chunks.append(self._emit(self._pending_start, silence_start + self.keep_silence))
+            self._pending_end = None
+
+    def _close_range(self, chunks, seg_len=None):
+        silence_start, last_start = self._range
+        silence_end = last_start + self.min_silence_len
+        if self._pending_end is not None and silence_end == seg_len:
+            # Silence runs to the end of the recording: nothing follows to share the padding with
+            chunks.append(self._emit(self._pending_start, min(silence_start + self.keep_silence, seg_len)))
+            self._pending_end = None
+        elif self._pending_end is not None:
+            # Short silence: the padding of both neighbours overlaps, split it evenly
+            split = (silence_start + self.keep_silence + silence_end - self.keep_silence) // 2
+            chunks.append(self._emit(self._pending_start, split))
+            self._pending_end = None
+            self._pending_start = split
+        else:
+            self._pending_start = max(silence_end - self.keep_silence, 0)
+        self._last_silence_end = silence_end
+        self._range = None
+
+    def _force_cut(self, chunks):
+        """Cut an uninterrupted speech segment every max_chunk_ms to bound the buffer."""
+        if self.max_chunk_ms is None or self._range is not None or self._pending_end is not None:
+            return
+        while self._next_window - self._pending_start > self.max_chunk_ms:
+            cut = self._pending_start + self.max_chunk_ms
+            chunks.append(self._emit(self._pending_start, cut))
+            self._pending_start = cut
+
+    def _emit(self, start_ms, end_ms):
+        """Slice [start_ms, end_ms) out of the buffer, zero-padding past the decoded audio."""
+        start = (self._boundary(start_ms) - self._buffer_start_frame) * self.frame_width
+        end = (self._boundary(end_ms) - self._buffer_start_frame) * self.frame_width
+        pcm = bytes(self._buffer[start:end])
+        if len(pcm) < end - start:
+            pcm += b'\0' * (end - start - len(pcm))
+        return start_ms, end_ms, pcm
+
+    def _trim(self):
+        """Drop audio and energy no future chunk or window can need."""
+        keep_from_ms = self._pending_start
+        if self._range is not None and self._pending_end is None:
+            silence_start, last_start = self._range
+            earliest_end = last_start + self.min_silence_len
+            if earliest_end - silence_start >= 2 * self.keep_silence:
+                next_start = earliest_end - self.keep_silence
+            else:
+                next_start = min(earliest_end - self.keep_silence, (silence_start + earliest_end) // 2)
+            keep_from_ms = max(keep_from_ms, next_start)
+        keep_from_ms = min(keep_from_ms, self._next_window)
+        drop_frames = self._boundary(keep_from_ms) - self._buffer_start_frame
+        if drop_frames > 0:
+            del self._buffer[:drop_frames * self.frame_width]
+            self._buffer_start_frame += drop_frames
+
+        drop_bins = self._next_window - self._energy_start_ms
+        if drop_bins > 0:
+            self._energy = self._energy[drop_bins:]
+            self._energy_start_ms = self._next_window
@@ -1,52 +1,393 @@
+import numpy as np
 import speech_recognition as sr
 from pydub import AudioSegment
-from pydub.silence import split_on_silence
+from silence_detection import StreamingSplitter, speech_ranges
+from instrumentation import count, timer
+from assets import resolve_model, timed_load
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import io
 import os
+import shutil
+import subprocess
+import threading
 
-def convert_audio_to_text(audio_path):
+# Streaming ingestion decodes to mono 16-bit PCM at this rate (what recognizers expect)
+STREAM_FRAME_RATE = 16000
+STREAM_SAMPLE_WIDTH = 2
+# Containers ffmpeg can decode from a pipe; others (e.g. m4a) may need to seek
+STREAMABLE_FORMATS = ("wav", "mp3")
+
+class GoogleRecognizer:
+    """
+    Recognizer backend using the Google Web Speech API.
+    A backend is any object with recognize(audio_data) -> str that raises
+    sr.UnknownValueError when nothing intelligible was said and sr.RequestError
+    when the service cannot be reached. Backends that can transcribe several chunks
+    in one call also provide recognize_batch(audio_datas) -> [str] and a batch_size.
+    """
+    def __init__(self, language="en-US"):
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, audio_data):
+        return self.recognizer.recognize_google(audio_data, language=self.language)
+
+class WhisperRecognizer:
+    """
+    Offline recognizer backend running a Whisper checkpoint on the CPU with transformers.
+    The model is loaded once per instance and reused; recognize_batch transcribes up
+    to batch_size chunks per generate() call. Chunks longer than Whisper's 30 s window
+    are transcribed window by window and joined.
+    """
+    SAMPLE_RATE = 16000
+    WINDOW_SECONDS = 30
+
+    def __init__(self, model_name="openai/whisper-tiny.en", language=None, batch_size=8, local_files_only=False):
+        import torch
+        from transformers import WhisperForConditionalGeneration, WhisperProcessor
+
+        self.torch = torch
+        self.model_name = model_name
+        self.language = language
+        self.batch_size = batch_size
+        # A copy bundled by `assets.py prefetch` is preferred, and offline mode never downloads
+        path, local_files_only = resolve_model(model_name, local_files_only)
+        with timed_load(f"whisper:{model_name}"):
+            self.processor = WhisperProcessor.from_pretrained(path, local_files_only=local_files_only)
+            self.model = WhisperForConditionalGeneration.from_pretrained(path, local_files_only=local_files_only)
+        self.model.eval()
+
+    def _windows(self, audio_data):
+        """Float samples of a chunk at 16 kHz, cut into Whisper-sized windows."""
+        raw = audio_data.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2)
+        samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+        window = self.SAMPLE_RATE * self.WINDOW_SECONDS
+        return [samples[i:i + window] for i in range(0, len(samples), window)] or [samples]
+
+    def recognize(self, audio_data):
+        text = self.recognize_batch([audio_data])[0]
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+    def recognize_batch(self, audio_datas):
+        windows = []
+        owners = []
+        for index, audio_data in enumerate(audio_datas):
+            for window in self._windows(audio_data):
+                windows.append(window)
+                owners.append(index)
+
+        generate_kwargs = {"language": self.language, "task": "transcribe"} if self.language else {}
+        texts = []
+        for start in range(0, len(windows), self.batch_size):
+            features = self.processor(windows[start:start + self.batch_size], sampling_rate=self.SAMPLE_RATE,
+                                      return_tensors="pt").input_features
+            with self.torch.inference_mode():
+                predicted_ids = self.model.generate(features, **generate_kwargs)
+            texts.extend(self.processor.batch_decode(predicted_ids, skip_special_tokens=True))
+
+        results = [[] for _ in audio_datas]
+        for index, text in zip(owners, texts):
+            if text.strip():
+                results[index].append(text.strip())
+        return [" ".join(parts) for parts in results]
+
+# Backends selectable by name (recognizer="whisper"); instances are created once and reused
+RECOGNIZER_BACKENDS = {
+    "google": GoogleRecognizer,
+    "whisper": WhisperRecognizer
+}
+_recognizers = {}
+_recognizers_lock = threading.Lock()
+
+def get_recognizer(recognizer=None):
+    """
+    Resolve the recognizer argument of the transcription functions: None selects
+    Google, a name from RECOGNIZER_BACKENDS selects that backend (loaded on first
+    use and shared afterwards) and any other object is used as the backend itself.
+    """
+    if recognizer is None:
+        recognizer = "google"
+    if not isinstance(recognizer, str):
+        return recognizer
+    if recognizer not in RECOGNIZER_BACKENDS:
+        raise ValueError(f"Unknown recognizer {recognizer!r}, expected one of {sorted(RECOGNIZER_BACKENDS)}")
+    with _recognizers_lock:
+        if recognizer not in _recognizers:
+            _recognizers[recognizer] = RECOGNIZER_BACKENDS[recognizer]()
+        return _recognizers[recognizer]
+
+@timer("audio_recognize")
+def recognize_chunks(recognizer, audio_datas):
+    """
+    Transcribe a list of sr.AudioData, in one call when the backend supports batching.
+    Returns [(text, error)] per chunk: an unintelligible chunk gives ("", None) and a
+    failed one ("", exception), so a single bad chunk does not lose the whole transcript.
+    """
+    if len(audio_datas) > 1 and hasattr(recognizer, "recognize_batch"):
+        try:
+            results = [(text, None) for text in recognizer.recognize_batch(audio_datas)]
+            _count_chunks(results)
+            return results
+        except Exception:
+            pass  # retry chunk by chunk so only the failing chunks are lost
+
+    results = []
+    for audio_data in audio_datas:
+        try:
+            results.append((recognizer.recognize(audio_data), None))
+        except sr.UnknownValueError:
+            results.append(("", None))
+        except Exception as e:
+            results.append(("", e))
+    _count_chunks(results)
+    return results
+
+def _count_chunks(results):
+    for text, error in results:
+        outcome = "failed" if error is not None else "recognized" if text else "empty"
+        count("analysis_audio_chunks_total", help="Audio chunks sent to the recognizer", outcome=outcome)
+
+def load_audio(audio_source, format=None):
+    """
+    Decodes a file path, file-like object, bytes buffer (e.g. an upload's getbuffer())
+    or AudioSegment into an AudioSegment without writing anything to disk.
+    """
+    if isinstance(audio_source, AudioSegment):
+        return audio_source
+    if isinstance(audio_source, (bytes, bytearray, memoryview)):
+        audio_source = io.BytesIO(audio_source)
+    return AudioSegment.from_file(audio_source, format=format)
+
+def segment_to_audio_data(segment):
+    """
+    Wraps a chunk's in-memory PCM as sr.AudioData (mono, 16-bit, like sr.AudioFile produces).
+    """
+    segment = segment.set_channels(1).set_sample_width(2)
+    return sr.AudioData(segment.raw_data, segment.frame_rate, segment.sample_width)
+
+def iter_transcription(audio_source, recognizer=None, max_workers=4, format=None, errors=None):
+    """
+    Transcribes an in-memory recording chunk by chunk.
+    Chunks (or batches of chunks, for backends with recognize_batch) are transcribed
+    concurrently by up to max_workers threads; yields (chunk_index, start_ms, end_ms, text)
+    in chunk order as soon as each chunk and all chunks before it are done.
+    recognizer is a backend object or name (see get_recognizer). A chunk that fails
+    yields empty text; pass a list as errors to collect (chunk_index, exception) pairs.
+    """
+    recognizer = get_recognizer(recognizer)
+    batch_size = getattr(recognizer, "batch_size", 1) if hasattr(recognizer, "recognize_batch") else 1
+
+    # Load the audio file
+    with timer("audio_decode"):
+        audio = load_audio(audio_source, format=format)
+
+    # Split audio into chunks where silence is detected
+    # Adjust these parameters based on your audio characteristics
+    with timer("audio_split"):
+        ranges = speech_ranges(audio,
+                               min_silence_len=500,  # milliseconds of silence
+                               silence_thresh=-40,   # dBFS below reference
+                               keep_silence=200      # milliseconds of silence to keep at the end of chunk
+                              )
+
+    def transcribe_batch(batch_ranges):
+        with timer("audio_export"):
+            audio_datas = [segment_to_audio_data(audio[start:end]) for start, end in batch_ranges]
+        return recognize_chunks(recognizer, audio_datas)
+
+    pending = deque()
+    next_index = 0
+
+    def finish_oldest():
+        nonlocal next_index
+        batch, future = pending.popleft()
+        for (start, end), (text, error) in zip(batch, future.result()):
+            if error is not None and errors is not None:
+                errors.append((next_index, error))
+            yield next_index, start, end, text
+            next_index += 1
+
+    # Keep a bounded number of batches in flight; if the consumer stops early, the
+    # queued ones are cancelled instead of transcribing the rest of the file
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for i in range(0, len(ranges), batch_size):
+            if len(pending) >= max_workers * 2:
+                yield from finish_oldest()
+            batch = ranges[i:i + batch_size]
+            pending.append((batch, executor.submit(transcribe_batch, batch)))
+        while pending:
+            yield from finish_oldest()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+def convert_audio_to_text(audio_source, recognizer=None, max_workers=4, format=None):
     """
     Converts an audio file to text using Google Web Speech API.
     For longer audio files, it splits the audio into chunks.
+    Chunks are transcribed concurrently by up to max_workers threads (pass another
+    recognizer backend or its name, e.g. "whisper", to replace Google); the transcript
+    keeps the chunk order. audio_source is anything load_audio accepts; audio never
+    touches the disk. Chunks that fail are left out; the call only fails if all of them do.
     """
-    r = sr.Recognizer()
-    full_text = ""
-
+    errors = []
     try:
-        # Load the audio file
-        audio = AudioSegment.from_file(audio_path)
-
-        # Split audio into chunks where silence is detected
-        # Adjust these parameters based on your audio characteristics
-        chunks = split_on_silence(audio,
-                                  min_silence_len=500,  # milliseconds of silence
-                                  silence_thresh=-40,   # dBFS below reference
-                                  keep_silence=200      # milliseconds of silence to keep at the end of chunk
-                                 )
-
-        if not chunks:
-            return "Error: No speech detected or audio too short."
-
-        for i, chunk in enumerate(chunks):
-            # Export chunk to a temporary WAV file
-            chunk_filename = f"temp_chunk_{i}.wav"
-            chunk.export(chunk_filename, format="wav")
-
-            with sr.AudioFile(chunk_filename) as source:
-                audio_listened = r.record(source)
+        texts = [text for _, _, _, text in iter_transcription(audio_source, recognizer, max_workers, format, errors)]
+    except Exception as e:
+        return f"Error processing audio file: {e}"
+
+    return _join_transcript(texts, errors)
+
+def _join_transcript(texts, errors):
+    if not texts:
+        return "Error: No speech detected or audio too short."
+    if errors and len(errors) == len(texts):
+        error = errors[0][1]
+        if isinstance(error, sr.RequestError):
+            return f"Could not request results from Google Speech Recognition service; {error}"
+        return f"Error processing audio file: {error}"
+    return " ".join(text for text in texts if text).strip()
+
+def can_stream(format):
+    """Whether transcribe_stream can decode this format here: it needs an ffmpeg binary."""
+    return format in STREAMABLE_FORMATS and shutil.which(AudioSegment.converter) is not None
+
+def decode_pcm_stream(audio_source, frame_rate=STREAM_FRAME_RATE, window_ms=1000):
+    """
+    Decodes audio with an ffmpeg subprocess and yields mono 16-bit PCM in windows of
+    window_ms, so only one window is in memory at a time. audio_source is a file
+    path, a bytes buffer or a binary file-like object (fed to ffmpeg's stdin).
+    """
+    converter = shutil.which(AudioSegment.converter) or AudioSegment.converter
+    from_path = isinstance(audio_source, (str, os.PathLike))
+    command = [converter, "-loglevel", "error", "-i", os.fspath(audio_source) if from_path else "pipe:0",
+               "-vn", "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(frame_rate), "pipe:1"]
+    process = subprocess.Popen(command, stdin=subprocess.DEVNULL if from_path else subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    feeder = None
+    if not from_path:
+        if isinstance(audio_source, (bytes, bytearray, memoryview)):
+            audio_source = io.BytesIO(audio_source)
+
+        def feed_stdin():
+            try:
+                while True:
+                    block = audio_source.read(64 * 1024)
+                    if not block:
+                        break
+                    process.stdin.write(block)
+            except (BrokenPipeError, ValueError):
+                pass  # ffmpeg stopped reading (error or early close)
+            finally:
                 try:
-                    text = r.recognize_google(audio_listened)
-                    full_text += text + " "
-                except sr.UnknownValueError:
-                    # print(f"Could not understand audio in chunk {i}")
+                    process.stdin.close()
+                except OSError:
                     pass
-                except sr.RequestError as e:
-                    return f"Could not request results from Google Speech Recognition service; {e}"
-            os.remove(chunk_filename) # Clean up temp file
 
+        feeder = threading.Thread(target=feed_stdin, daemon=True)
+        feeder.start()
+
+    window_bytes = frame_rate * STREAM_SAMPLE_WIDTH * window_ms // 1000
+    try:
+        while True:
+            window = process.stdout.read(window_bytes)
+            if not window:
+                break
+            yield window
+        process.wait()
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to decode audio: {process.stderr.read().decode(errors='ignore').strip()}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        if feeder is not None:
+            feeder.join(timeout=1)
+        process.stdout.close()
+        process.stderr.close()
+
+def transcribe_stream(audio_source, recognizer=None, max_workers=4, window_ms=1000, max_chunk_ms=60000, errors=None):
+    """
+    Streaming variant of iter_transcription for long recordings.
+    Decodes in fixed-size windows, detects silence incrementally and sends each speech
+    segment (or each full batch, for batching backends) to the recognizer as soon as it
+    is complete, so peak memory does not depend on the recording length. Yields
+    (chunk_index, start_ms, end_ms, text) in chunk order while decoding is still
+    running; failed chunks are handled as in iter_transcription.
+    """
+    recognizer = get_recognizer(recognizer)
+    batch_size = getattr(recognizer, "batch_size", 1) if hasattr(recognizer, "recognize_batch") else 1
+    splitter = StreamingSplitter(STREAM_FRAME_RATE, STREAM_SAMPLE_WIDTH, 1,
+                                 min_silence_len=500, silence_thresh=-40, keep_silence=200,
+                                 max_chunk_ms=max_chunk_ms)
+
+    def transcribe_batch(pcms):
+        with timer("audio_export"):
+            audio_datas = [sr.AudioData(pcm, STREAM_FRAME_RATE, STREAM_SAMPLE_WIDTH) for pcm in pcms]
+        return recognize_chunks(recognizer, audio_datas)
+
+    pending = deque()
+    batch = []
+    next_index = 0
+
+    def drain(block):
+        # Hand back finished batches in order; block if too many are queued
+        nonlocal next_index
+        while pending and (block or pending[0][1].done() or len(pending) > max_workers * 2):
+            bounds, future = pending.popleft()
+            for (start_ms, end_ms), (text, error) in zip(bounds, future.result()):
+                if error is not None and errors is not None:
+                    errors.append((next_index, error))
+                yield next_index, start_ms, end_ms, text
+                next_index += 1
+
+    def submit(chunks, flush=False):
+        batch.extend(chunks)
+        while len(batch) >= batch_size or (flush and batch):
+            current = batch[:batch_size]
+            del batch[:batch_size]
+            pending.append(([(start_ms, end_ms) for start_ms, end_ms, _ in current],
+                            executor.submit(transcribe_batch, [pcm for _, _, pcm in current])))
+
+    # Closing early stops ffmpeg and cancels the batches that have not started
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    windows = decode_pcm_stream(audio_source, window_ms=window_ms)
+    try:
+        while True:
+            with timer("audio_decode"):
+                window = next(windows, None)
+            if window is None:
+                break
+            with timer("audio_split"):
+                chunks = splitter.feed(window)
+            submit(chunks)
+            yield from drain(False)
+
+        with timer("audio_split"):
+            chunks = splitter.finish()
+        submit(chunks, flush=True)
+        yield from drain(True)
+    finally:
+        windows.close()
+        executor.shutdown(cancel_futures=True)
+
+def convert_audio_stream_to_text(audio_source, recognizer=None, max_workers=4):
+    """
+    Same result as convert_audio_to_text, but with streaming ingestion (see transcribe_stream).
+    """
+    texts = []
+    errors = []
+    try:
+        for _, _, _, text in transcribe_stream(audio_source, recognizer=recognizer, max_workers=max_workers, errors=errors):
+            texts.append(text)
     except Exception as e:
         return f"Error processing audio file: {e}"
 
-    return full_text.strip()
+    return _join_transcript(texts, errors)
 
 if __name__ == '__main__':
     # Example usage (requires an audio file named 'test_audio.wav' in the same directory)
@@ -0,0 +1,166 @@
+import re
+
+# One scan finds every feature: runs of sentence punctuation (which also give the
+# exclamation, question and ellipsis counts and the sentence boundaries), ALL CAPS
+# words and runs of 3+ identical characters. A character run is only tried where the
+# other two fail, so it never starts on punctuation or inside a caps word and every
+# feature is found where its own pattern would find it; character runs inside
+# punctuation runs and caps words are counted afterwards.
+FEATURE_PATTERN = re.compile(r'(?P<punct>[.!?]+)|(?P<caps>\b[A-Z]{2,}\b)|(?P<repeat>(?P<char>.)(?P=char){2,})')
+REPEATED_CHARS_PATTERN = re.compile(r'(.)\1{2,}')
+WORD_STRIP_CHARS = '.,!?;:'
+
+class TextFeatures:
+    """
+    Surface features of a text gathered in a single scan: punctuation counts,
+    ALL CAPS words, repeated-character runs, sentences and words.
+    Counts are identical to running the separate ToneAnalyzer patterns
+    (exclamations '!+', questions '\\?+', caps words, ellipsis '\\.{3,}',
+    repeated chars '(.)\\1{2,}') and splitting sentences on '[.!?]+'.
+    Share one instance between analyzers through TokenStream.features; words can be
+    passed in when the whitespace split is already known (e.g. from a TokenStream).
+    """
+    __slots__ = ('text', 'words', 'exclamations', 'questions', 'caps_words', 'ellipsis', 'repeated_chars',
+                 'sentence_count', 'word_length_total', 'first_sentence_open', 'last_sentence_open')
+
+    def __init__(self, text, words=None):
+        self.text = text
+        self.exclamations = 0
+        self.questions = 0
+        self.caps_words = 0
+        self.ellipsis = 0
+        self.repeated_chars = 0
+        self.sentence_count = 0
+
+        segment_start = 0
+        first_segment = None
+        for match in FEATURE_PATTERN.finditer(text):
+            kind = match.lastgroup
+            if kind == 'punct':
+                # The text between two punctuation runs is a sentence if it is not blank
+                start, end = match.span()
+                segment_open = bool(text[segment_start:start].strip())
+                if first_segment is None:
+                    first_segment = segment_open
+                self.sentence_count += segment_open
+                segment_start = end
+                if end - start == 1:
+                    char = text[start]
+                    if char == '!':
+                        self.exclamations += 1
+                    elif char == '?':
+                        self.questions += 1
+                else:
+                    self._count_punctuation_run(text[start:end])
+            elif kind == 'caps':
+                self.caps_words += 1
+                word = match.group()
+                if len(word) > 2:
+                    self.repeated_chars += len(REPEATED_CHARS_PATTERN.findall(word))
+            else:
+                self.repeated_chars += 1
+
+        last_open = bool(text[segment_start:].strip())
+        self.sentence_count += last_open
+        self.first_sentence_open = last_open if first_segment is None else first_segment
+        self.last_sentence_open = last_open
+
+        self.words = tuple(text.split()) if words is None else tuple(words)
+        self.word_length_total = sum(map(len, [word.strip(WORD_STRIP_CHARS) for word in self.words]))
+
+    def _count_punctuation_run(self, run):
+        # Split the run into runs of one character ('!!?...' -> '!!', '?', '...')
+        start = 0
+        for end in range(1, len(run) + 1):
+            if end < len(run) and run[end] == run[start]:
+                continue
+            char, length = run[start], end - start
+            if char == '!':
+                self.exclamations += 1
+            elif char == '?':
+                self.questions += 1
+            elif length >= 3:
+                self.ellipsis += 1
+            if length >= 3:
+                self.repeated_chars += 1
+            start = end
+
+    @property
+    def word_count(self):
+        return len(self.words)
+
+    @property
+    def char_count(self):
+        return len(self.text)
+
+    def punctuation_counts(self):
+        """Counts in ToneAnalyzer.analyze_punctuation's format."""
+        return {
+            'exclamations': self.exclamations,
+            'questions': self.questions,
+            'caps_words': self.caps_words,
+            'ellipsis': self.ellipsis,
+            'repeated_chars': self.repeated_chars
+        }
+
+    def text_statistics(self):
+        """Statistics in ToneAnalyzer.get_text_statistics's format."""
+        word_count = len(self.words)
+        return {
+            'word_count': word_count,
+            'char_count': len(self.text),
+            'sentence_count': self.sentence_count,
+            'avg_word_length': self.word_length_total / word_count if word_count else 0,
+            'avg_sentence_length': word_count / self.sentence_count if self.sentence_count else 0
+        }
+
+class TokenStream:
+    """
+    Canonical token stream of one cleaned text, shared by every analyzer of a request
+    through their *_tokens entry points: whitespace tokens, their (start, end)
+    character offsets, the lowercased text and the TextFeatures scan. Everything
+    but the tokens is computed on first use and then reused.
+    """
+    __slots__ = ('text', 'tokens', '_offsets', '_lower', '_features')
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tuple(text.split())
+        self._offsets = None
+        self._lower = None
+        self._features = None
+
+    def __len__(self):
+        return len(self.tokens)
+
+    @property
+    def offsets(self):
+        """(start, end) of every token in text."""
+        if self._offsets is None:
+            offsets = []
+            position = 0
+            for token in self.tokens:
+                position = self.text.find(token, position)
+                offsets.append((position, position + len(token)))
+                position += len(token)
+            self._offsets = tuple(offsets)
+        return self._offsets
+
+    @property
+    def lower(self):
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    @property
+    def features(self):
+        if self._features is None:
+            self._features = TextFeatures(self.text, self.tokens)
+        return self._features
+
+def text_features(text):
+    """
+    TextFeatures for a text. Nothing is cached across calls, so memory stays flat on
+    long streams; to share one scan between analyzers, pass a TokenStream around.
+    """
+    return TextFeatures(text)
@@ -1,43 +1,71 @@
+import json
 import re
-import nltk
+import threading
+from functools import lru_cache
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 from nltk.stem import WordNetLemmatizer
 import string
+from text_features import TokenStream
+from instrumentation import timer
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+from assets import ensure_nltk_resource, timed_load
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+# NLTK data (stopwords, wordnet) is loaded on first use or by warmup(), not at import
+# Patterns used by clean_text, compiled once
+URL_PATTERN = re.compile(r'http\S+')
+EMAIL_PATTERN = re.compile(r'\S+@\S+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
 
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet')
+# Fields a preprocessing record can contain
+RECORD_FIELDS = ('original_text', 'cleaned_text', 'tokens', 'processed_text')
 
 class TextPreprocessor:
-    def __init__(self):
-        self.stop_words = set(stopwords.words('english'))
+    def __init__(self, lemma_cache_size=50000):
+        self._stop_words = None
         self.lemmatizer = WordNetLemmatizer()
+        # Conversational text reuses a small vocabulary, so memoize lemmas per lowercased token
+        self._lemmatize_word = lru_cache(maxsize=lemma_cache_size)(self.lemmatizer.lemmatize)
+        self._warm = False
+        self._warmup_lock = threading.Lock()
+    
+    @property
+    def stop_words(self):
+        """English stopwords, loaded on first use."""
+        if self._stop_words is None:
+            with self._warmup_lock:
+                if self._stop_words is None:
+                    with timed_load("stopwords"):
+                        ensure_nltk_resource('stopwords')
+                        self._stop_words = set(stopwords.words('english'))
+        return self._stop_words
+    
+    def warmup(self):
+        """
+        Load the stopwords and WordNet now instead of on the first call that needs them.
+        Safe to call from several threads; each corpus is loaded once.
+        """
+        if self._warm:
+            return
+        self.stop_words
+        with self._warmup_lock:
+            if not self._warm:
+                with timed_load("wordnet"):
+                    ensure_nltk_resource('wordnet')
+                    self.lemmatizer.lemmatize('warmup')
+                self._warm = True
     
     def clean_text(self, text):
         """
         Clean the input text by removing special characters, extra spaces, etc.
         """
         # Remove URLs
-        text = re.sub(r'http\S+', '', text)
+        text = URL_PATTERN.sub('', text)
         
         # Remove email addresses
-        text = re.sub(r'\S+@\S+', '', text)
+        text = EMAIL_PATTERN.sub('', text)
         
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_PATTERN.sub(' ', text)
         
         # Remove leading and trailing whitespace
         text = text.strip()
@@ -66,19 +94,44 @@ class TextPreprocessor:
         """
         Lemmatize tokens to their root form.
         """
-        return [self.lemmatizer.lemmatize(token.lower()) for token in tokens]
+        if not self._warm:
+            self.warmup()
+        return [self._lemmatize_word(token.lower()) for token in tokens]
     
     def preprocess(self, text, remove_stopwords=True, lemmatize=True):
         """
         Complete preprocessing pipeline.
         Returns both the cleaned text and processed tokens.
         """
+        return self.preprocess_fields(text, RECORD_FIELDS, remove_stopwords, lemmatize)
+    
+    @timer("preprocess")
+    def preprocess_fields(self, text, fields, remove_stopwords=True, lemmatize=True):
+        """
+        Preprocessing pipeline that only keeps (and only computes) the requested fields.
+        """
+        record = {}
+        if 'original_text' in fields:
+            record['original_text'] = text
+        
         # Clean the text
         cleaned_text = self.clean_text(text)
+        if 'cleaned_text' in fields:
+            record['cleaned_text'] = cleaned_text
         
-        # Tokenize
-        tokens = self.tokenize(cleaned_text)
+        if 'tokens' in fields or 'processed_text' in fields:
+            tokens = self._filter_tokens(self.tokenize(cleaned_text), remove_stopwords, lemmatize)
+            
+            if 'tokens' in fields:
+                record['tokens'] = tokens
+            
+            # Join tokens back to create processed text
+            if 'processed_text' in fields:
+                record['processed_text'] = ' '.join(tokens)
         
+        return record
+    
+    def _filter_tokens(self, tokens, remove_stopwords, lemmatize):
         # Remove punctuation
         tokens = self.remove_punctuation(tokens)
         
@@ -90,22 +143,93 @@ class TextPreprocessor:
         if lemmatize:
             tokens = self.lemmatize(tokens)
         
-        # Join tokens back to create processed text
-        processed_text = ' '.join(tokens)
-        
+        return tokens
+    
+    @timer("tokenize")
+    def token_stream(self, text):
+        """
+        Clean the text once and return its TokenStream, which the analyzers'
+        token-accepting entry points share instead of re-tokenizing the text.
+        """
+        return TokenStream(self.clean_text(text))
+    
+    @timer("preprocess_tokens")
+    def preprocess_tokens(self, stream, remove_stopwords=True, lemmatize=True):
+        """
+        preprocess() for an already cleaned TokenStream: reuses its tokens and
+        returns the 'cleaned_text', 'tokens' and 'processed_text' fields.
+        """
+        tokens = self._filter_tokens(list(stream.tokens), remove_stopwords, lemmatize)
         return {
-            'original_text': text,
-            'cleaned_text': cleaned_text,
+            'cleaned_text': stream.text,
             'tokens': tokens,
-            'processed_text': processed_text
+            'processed_text': ' '.join(tokens)
         }
+    
+    def preprocess_stream(self, texts, fields=('cleaned_text', 'tokens'), remove_stopwords=True, lemmatize=True):
+        """
+        Lazily preprocess an iterable of texts, yielding one compact record per text.
+        Only the requested fields are kept, so memory stays flat for any input size.
+        """
+        unknown = set(fields) - set(RECORD_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields {sorted(unknown)}, expected a subset of {RECORD_FIELDS}")
+        
+        for text in texts:
+            yield self.preprocess_fields(text, fields, remove_stopwords, lemmatize)
+
+def iter_texts(path, text_key='text', encoding='utf-8'):
+    """
+    Read texts lazily, one per line, from a plain-text or JSONL file (*.jsonl / *.ndjson).
+    JSONL lines are objects whose text_key holds the message; blank lines, lines that
+    are not objects and objects without a string text_key are skipped.
+    """
+    is_jsonl = path.lower().endswith(('.jsonl', '.ndjson'))
+    with open(path, 'r', encoding=encoding) as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                continue
+            if is_jsonl:
+                record = json.loads(line)
+                text = record.get(text_key) if isinstance(record, dict) else None
+                if not isinstance(text, str):
+                    continue
+                yield text
+            else:
+                yield line
+
+_shared_preprocessor = None
+_shared_preprocessor_lock = threading.Lock()
+
+def get_preprocessor():
+    """
+    Return the process-wide TextPreprocessor, creating it on first use.
+    """
+    global _shared_preprocessor
+    if _shared_preprocessor is None:
+        with _shared_preprocessor_lock:
+            if _shared_preprocessor is None:
+                _shared_preprocessor = TextPreprocessor()
+    return _shared_preprocessor
+
+def warmup():
+    """
+    Build the shared preprocessor and load WordNet ahead of the first request.
+    """
+    get_preprocessor().warmup()
 
 def preprocess_text(text, remove_stopwords=True, lemmatize=True):
     """
     Convenience function for quick text preprocessing.
     """
-    preprocessor = TextPreprocessor()
-    return preprocessor.preprocess(text, remove_stopwords, lemmatize)
+    return get_preprocessor().preprocess(text, remove_stopwords, lemmatize)
+
+def preprocess_file(path, fields=('cleaned_text', 'tokens'), text_key='text', remove_stopwords=True, lemmatize=True):
+    """
+    Stream preprocessing records for every message in a plain-text or JSONL file.
+    """
+    return get_preprocessor().preprocess_stream(iter_texts(path, text_key), fields, remove_stopwords, lemmatize)
 
 if __name__ == '__main__':
     # Example usage
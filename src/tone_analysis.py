@@ -1,8 +1,154 @@
 import re
-from collections import Counter
+from collections import Counter, deque
+
+import numpy as np
+
+from instrumentation import timer
+from text_features import TextFeatures, text_features
+
+TONE_CATEGORIES = [
+    'aggressive', 'confident', 'tentative', 'analytical', 'emotional',
+    'formal', 'casual', 'urgent', 'questioning', 'supportive'
+]
+
+PUNCTUATION_FEATURES = ['exclamations', 'questions', 'caps_words', 'ellipsis', 'repeated_chars']
+
+# (punctuation feature, tone, weight) in the order analyze_tone applies them,
+# so the batch path accumulates floats exactly like the scalar path.
+PUNCTUATION_ADJUSTMENTS = [
+    ('exclamations', 'emotional', 1.5),
+    ('exclamations', 'aggressive', 1.0),
+    ('exclamations', 'urgent', 0.8),
+    ('exclamations', 'supportive', 0.5),
+    ('caps_words', 'aggressive', 1.0),
+    ('caps_words', 'confident', 0.7),
+    ('caps_words', 'urgent', 0.8),
+    ('questions', 'tentative', 0.8),
+    ('questions', 'questioning', 1.2),
+    ('questions', 'analytical', 0.4),
+    ('ellipsis', 'tentative', 0.6),
+    ('ellipsis', 'emotional', 0.3),
+    ('repeated_chars', 'casual', 0.5),
+    ('repeated_chars', 'emotional', 0.4)
+]
+
+# Bump when lexicons or scoring change so cached results are not reused
+ANALYZER_VERSION = "1"
+
+# Separator used when scanning a whole batch at once; none of the punctuation
+# patterns can match across a newline, so per-text counts are unchanged.
+_BATCH_SEPARATOR = '\n'
+
+class LexiconMatcher:
+    """
+    Aho-Corasick automaton over several named word lists.
+    Finds every entry of every list that occurs in a text in a single pass,
+    so the cost per text no longer depends on the number of lists or entries.
+    """
+    def __init__(self, lexicons):
+        self.names = list(lexicons.keys())
+        self.lexicons = {name: list(words) for name, words in lexicons.items()}
+
+        # Trie over the lowercased entries; a phrase shared by several lists
+        # (or repeated inside one list) is a single pattern with several owners.
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self._owners = []
+        pattern_ids = {}
+        for name_index, name in enumerate(self.names):
+            for position, word in enumerate(self.lexicons[name]):
+                pattern = word.lower()
+                if not pattern:
+                    continue
+                if pattern not in pattern_ids:
+                    pattern_ids[pattern] = len(self._owners)
+                    self._owners.append([])
+                    self._add_pattern(pattern, pattern_ids[pattern])
+                self._owners[pattern_ids[pattern]].append((name_index, position))
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern, pattern_id):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][ch] = next_state
+            state = next_state
+        self._output[state] = self._output[state] + (pattern_id,)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                # Patterns ending at the failure state also end here
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def scan(self, text_lower, state=0, found=None):
+        """
+        Run the automaton over an already lowercased text, starting from state.
+        Returns (state, found) with the pattern ids seen added to found; passing both
+        back in with the next piece continues the scan as if the pieces were one text.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set() if found is None else found
+        for ch in text_lower:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found.update(output[state])
+        return state, found
+
+    def find_pattern_ids(self, text_lower):
+        """Return the set of pattern ids occurring anywhere in an already lowercased text."""
+        return self.scan(text_lower)[1]
+
+    def count(self, text):
+        """Return the number of matched entries per lexicon, in lexicon order."""
+        counts = [0] * len(self.names)
+        for pattern_id in self.find_pattern_ids(text.lower()):
+            for name_index, _ in self._owners[pattern_id]:
+                counts[name_index] += 1
+        return counts
+
+    def match(self, text):
+        """
+        Match all lexicons against the text.
+        Returns {name: (count, matched_words)} with matched words in list order,
+        identical to calling ToneAnalyzer.count_word_matches once per list.
+        """
+        return self.matches_for_ids(self.find_pattern_ids(text.lower()))
+
+    def matches_for_ids(self, pattern_ids):
+        """Turn a set of pattern ids from scan() into match()'s {name: (count, matched_words)}."""
+        hits = [[] for _ in self.names]
+        for pattern_id in pattern_ids:
+            for name_index, position in self._owners[pattern_id]:
+                hits[name_index].append(position)
+
+        results = {}
+        for name_index, name in enumerate(self.names):
+            words = self.lexicons[name]
+            positions = sorted(hits[name_index])
+            results[name] = (len(positions), [words[position] for position in positions])
+        return results
 
 class ToneAnalyzer:
-    def __init__(self):
+    def __init__(self, cache=None):
+        # Optional ResultCache shared with the other analyzers
+        self.cache = cache
+        
         # Define word lists for different tones
         
         # Aggressive/Negative Words
@@ -145,6 +291,32 @@ class ToneAnalyzer:
         self.question_pattern = r'\?+'
         self.caps_pattern = r'\b[A-Z]{2,}\b'
         self.ellipsis_pattern = r'\.{3,}'
+        self.repeated_chars_pattern = r'(.)\1{2,}'
+        
+        # Compiled once for the batch path
+        self._punctuation_regexes = {
+            'exclamations': re.compile(self.exclamation_pattern),
+            'questions': re.compile(self.question_pattern),
+            'caps_words': re.compile(self.caps_pattern),
+            'ellipsis': re.compile(self.ellipsis_pattern),
+            'repeated_chars': re.compile(self.repeated_chars_pattern)
+        }
+        self._sentence_split_regex = re.compile(r'[.!?]+')
+        
+        # All tone lexicons compiled into one matcher (built once, reused per text)
+        self.tone_lexicons = {
+            'aggressive': self.aggressive_words,
+            'confident': self.confident_words,
+            'tentative': self.tentative_words,
+            'analytical': self.analytical_words,
+            'emotional': self.emotional_words,
+            'formal': self.formal_words,
+            'casual': self.casual_words,
+            'urgent': self.urgent_words,
+            'questioning': self.questioning_words,
+            'supportive': self.supportive_words
+        }
+        self.lexicon_matcher = LexiconMatcher(self.tone_lexicons)
         
     def count_word_matches(self, text, word_list):
         """Count how many words from word_list appear in the text with improved matching."""
@@ -167,36 +339,14 @@ class ToneAnalyzer:
     
     def analyze_punctuation(self, text):
         """Analyze punctuation patterns in the text with enhanced detection."""
-        exclamations = len(re.findall(self.exclamation_pattern, text))
-        questions = len(re.findall(self.question_pattern, text))
-        caps_words = len(re.findall(self.caps_pattern, text))
-        ellipsis = len(re.findall(self.ellipsis_pattern, text))
-        
-        # Additional punctuation analysis
-        repeated_chars = len(re.findall(r'(.)\1{2,}', text))  # Like "sooo" or "yesss"
-        
-        return {
-            'exclamations': exclamations,
-            'questions': questions,
-            'caps_words': caps_words,
-            'ellipsis': ellipsis,
-            'repeated_chars': repeated_chars
-        }
+        # Exclamations, questions, caps words, ellipsis and repeated characters like "sooo" or "yesss"
+        return text_features(text).punctuation_counts()
     
     def get_text_statistics(self, text):
         """Get comprehensive text statistics."""
-        words = text.split()
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        
-        return {
-            'word_count': len(words),
-            'char_count': len(text),
-            'sentence_count': len(sentences),
-            'avg_word_length': sum(len(word.strip('.,!?;:')) for word in words) / len(words) if words else 0,
-            'avg_sentence_length': len(words) / len(sentences) if sentences else 0
-        }
+        return text_features(text).text_statistics()
     
+    @timer("analyze_tone")
     def analyze_tone(self, text):
         """
         Enhanced tone analysis with all categories and improved scoring.
@@ -205,23 +355,51 @@ class ToneAnalyzer:
         if not text or not isinstance(text, str):
             return self._get_empty_analysis()
         
-        # Get text statistics
-        text_stats = self.get_text_statistics(text)
-        
-        # Count matches for each tone category (now returns matched words too)
-        aggressive_score, aggressive_matches = self.count_word_matches(text, self.aggressive_words)
-        confident_score, confident_matches = self.count_word_matches(text, self.confident_words)
-        tentative_score, tentative_matches = self.count_word_matches(text, self.tentative_words)
-        analytical_score, analytical_matches = self.count_word_matches(text, self.analytical_words)
-        emotional_score, emotional_matches = self.count_word_matches(text, self.emotional_words)
-        formal_score, formal_matches = self.count_word_matches(text, self.formal_words)
-        casual_score, casual_matches = self.count_word_matches(text, self.casual_words)
-        urgent_score, urgent_matches = self.count_word_matches(text, self.urgent_words)
-        questioning_score, questioning_matches = self.count_word_matches(text, self.questioning_words)
-        supportive_score, supportive_matches = self.count_word_matches(text, self.supportive_words)
+        if self.cache is not None:
+            return self.cache.get_or_compute("tone", ANALYZER_VERSION, text, lambda: self._analyze_tone(text))
+        return self._analyze_tone(text)
+    
+    @timer("analyze_tone_tokens")
+    def analyze_tone_tokens(self, stream):
+        """
+        analyze_tone for a TokenStream: reuses its lowercased text and feature scan
+        instead of lowercasing and scanning the text again.
+        """
+        if not stream.text:
+            return self._get_empty_analysis()
+        
+        if self.cache is not None:
+            return self.cache.get_or_compute("tone", ANALYZER_VERSION, stream.text,
+                                             lambda: self._analyze_tone(stream.text, stream.features, stream.lower))
+        return self._analyze_tone(stream.text, stream.features, stream.lower)
+    
+    def _analyze_tone(self, text, features=None, text_lower=None):
+        """Uncached analyze_tone for a non-empty string."""
+        # Punctuation, caps, sentences and words come from one shared scan
+        features = features or text_features(text)
+        text_stats = features.text_statistics()
+        
+        # Count matches for each tone category in a single pass over the text
+        matches = self.lexicon_matcher.matches_for_ids(
+            self.lexicon_matcher.find_pattern_ids(text.lower() if text_lower is None else text_lower))
         
         # Analyze punctuation
-        punct_analysis = self.analyze_punctuation(text)
+        punct_analysis = features.punctuation_counts()
+        
+        return self._score_analysis(text_stats, matches, punct_analysis)
+    
+    def _score_analysis(self, text_stats, matches, punct_analysis):
+        """Turn text statistics, lexicon matches and punctuation counts into the analyze_tone result."""
+        aggressive_score, aggressive_matches = matches['aggressive']
+        confident_score, confident_matches = matches['confident']
+        tentative_score, tentative_matches = matches['tentative']
+        analytical_score, analytical_matches = matches['analytical']
+        emotional_score, emotional_matches = matches['emotional']
+        formal_score, formal_matches = matches['formal']
+        casual_score, casual_matches = matches['casual']
+        urgent_score, urgent_matches = matches['urgent']
+        questioning_score, questioning_matches = matches['questioning']
+        supportive_score, supportive_matches = matches['supportive']
         
         # Enhanced punctuation-based adjustments
         if punct_analysis['exclamations'] > 0:
@@ -318,6 +496,141 @@ class ToneAnalyzer:
             'analysis_summary': self._generate_summary(dominant_tone, confidence, tone_scores)
         }
     
+    def rolling(self):
+        """Start a RollingToneAnalysis for a text that arrives piece by piece."""
+        return RollingToneAnalysis(self)
+    
+    @timer("analyze_tone_batch")
+    def analyze_tone_batch(self, texts, return_dicts=False):
+        """
+        Columnar tone analysis for a sequence of texts.
+        Returns a dictionary of NumPy arrays (one entry per message) with the same
+        layout as analyze_tone: 'raw_scores' and 'normalized_scores' map each tone
+        to an array, plus 'dominant_tone', 'confidence_level',
+        'punctuation_analysis' and 'text_statistics' columns.
+        With return_dicts=True, a list of analyze_tone-style dictionaries is returned instead.
+        """
+        texts = [text if text and isinstance(text, str) else '' for text in texts]
+        n = len(texts)
+        
+        # Lexicon counts, one row per message
+        counts = np.array([self.lexicon_matcher.count(text) for text in texts], dtype=float).reshape(n, len(TONE_CATEGORIES))
+        tone_index = {tone: i for i, tone in enumerate(self.lexicon_matcher.names)}
+        scores = np.zeros((n, len(TONE_CATEGORIES)))
+        for tone in TONE_CATEGORIES:
+            scores[:, TONE_CATEGORIES.index(tone)] = counts[:, tone_index[tone]]
+        
+        # Punctuation: each pattern runs once over the whole batch, and matches are
+        # assigned back to their message by offset
+        punct = self._count_punctuation_batch(texts)
+        
+        # Text statistics
+        word_count = np.zeros(n, dtype=int)
+        char_count = np.zeros(n, dtype=int)
+        sentence_count = np.zeros(n, dtype=int)
+        word_length_total = np.zeros(n, dtype=int)
+        for i, text in enumerate(texts):
+            words = text.split()
+            word_count[i] = len(words)
+            char_count[i] = len(text)
+            sentence_count[i] = sum(1 for s in self._sentence_split_regex.split(text) if s.strip())
+            word_length_total[i] = sum(len(word.strip('.,!?;:')) for word in words)
+        avg_word_length = np.divide(word_length_total, word_count, out=np.zeros(n), where=word_count > 0)
+        avg_sentence_length = np.divide(word_count, sentence_count, out=np.zeros(n), where=sentence_count > 0)
+        
+        # Punctuation-based adjustments
+        for feature, tone, weight in PUNCTUATION_ADJUSTMENTS:
+            scores[:, TONE_CATEGORIES.index(tone)] += punct[feature] * weight
+        
+        # Context-based adjustments
+        analytical = TONE_CATEGORIES.index('analytical')
+        formal = TONE_CATEGORIES.index('formal')
+        casual = TONE_CATEGORIES.index('casual')
+        long_texts = word_count > 100
+        medium_texts = (word_count > 50) & ~long_texts
+        scores[:, analytical] += np.where(long_texts, 1.0, np.where(medium_texts, 0.5, 0.0))
+        scores[:, formal] += np.where(long_texts, 0.7, np.where(medium_texts, 0.3, 0.0))
+        scores[:, casual] += np.where((word_count < 15) & (scores[:, casual] > 0), 1.0, 0.0)
+        
+        # Dominant tone, confidence and normalization (summed left to right like sum())
+        total_score = np.zeros(n)
+        for column in range(len(TONE_CATEGORIES)):
+            total_score += scores[:, column]
+        dominant_index = np.argmax(scores, axis=1) if n else np.zeros(0, dtype=int)
+        dominant_score = scores[np.arange(n), dominant_index]
+        tone_names = np.array(TONE_CATEGORIES + ['neutral'])
+        dominant_tone = tone_names[np.where(dominant_score > 0, dominant_index, len(TONE_CATEGORIES))]
+        has_score = total_score > 0
+        safe_total = np.where(has_score, total_score, 1.0)
+        confidence = np.where(has_score, dominant_score / safe_total * 100, 0.0)
+        normalized = np.where(has_score[:, None], np.round(scores / safe_total[:, None] * 100, 2), 0.0)
+        
+        batch = {
+            'raw_scores': {tone: scores[:, i] for i, tone in enumerate(TONE_CATEGORIES)},
+            'normalized_scores': {tone: normalized[:, i] for i, tone in enumerate(TONE_CATEGORIES)},
+            'dominant_tone': dominant_tone,
+            'confidence_level': np.round(confidence, 2),
+            'punctuation_analysis': punct,
+            'text_statistics': {
+                'word_count': word_count,
+                'char_count': char_count,
+                'sentence_count': sentence_count,
+                'avg_word_length': avg_word_length,
+                'avg_sentence_length': avg_sentence_length
+            }
+        }
+        
+        if not return_dicts:
+            return batch
+        return [self._batch_record(batch, i, texts[i]) for i in range(n)]
+    
+    def _count_punctuation_batch(self, texts):
+        """Count every punctuation pattern per text with one regex scan over the joined batch."""
+        n = len(texts)
+        joined = _BATCH_SEPARATOR.join(texts)
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=n)
+        offsets = np.concatenate(([0], np.cumsum(lengths + len(_BATCH_SEPARATOR))[:-1])) if n else lengths
+        
+        punct = {}
+        for feature in PUNCTUATION_FEATURES:
+            starts = np.fromiter((m.start() for m in self._punctuation_regexes[feature].finditer(joined)), dtype=np.int64)
+            owners = np.searchsorted(offsets, starts, side='right') - 1
+            punct[feature] = np.bincount(owners, minlength=n)
+        return punct
+    
+    def _batch_record(self, batch, i, text):
+        """Build the analyze_tone dictionary for message i of a columnar batch."""
+        if not text:
+            return self._get_empty_analysis()
+        
+        tone_scores = {tone: float(batch['raw_scores'][tone][i]) for tone in TONE_CATEGORIES}
+        dominant_tone = str(batch['dominant_tone'][i])
+        total_score = sum(tone_scores.values())
+        confidence = (tone_scores[dominant_tone] / total_score * 100) if total_score > 0 and dominant_tone in tone_scores else 0
+        if total_score > 0:
+            normalized_scores = {k: round((v / total_score) * 100, 2) for k, v in tone_scores.items()}
+        else:
+            normalized_scores = {k: 0 for k in tone_scores.keys()}
+        
+        matches = self.lexicon_matcher.match(text)
+        stats = batch['text_statistics']
+        return {
+            'raw_scores': tone_scores,
+            'normalized_scores': normalized_scores,
+            'dominant_tone': dominant_tone,
+            'confidence_level': round(confidence, 2),
+            'punctuation_analysis': {k: int(v[i]) for k, v in batch['punctuation_analysis'].items()},
+            'text_statistics': {
+                'word_count': int(stats['word_count'][i]),
+                'char_count': int(stats['char_count'][i]),
+                'sentence_count': int(stats['sentence_count'][i]),
+                'avg_word_length': float(stats['avg_word_length'][i]),
+                'avg_sentence_length': float(stats['avg_sentence_length'][i])
+            },
+            'matched_words': {tone: matches[tone][1][:5] for tone in TONE_CATEGORIES},
+            'analysis_summary': self._generate_summary(dominant_tone, confidence, tone_scores)
+        }
+    
     def _get_empty_analysis(self):
         """Return empty analysis for invalid input."""
         empty_scores = {
@@ -395,6 +708,68 @@ Avg word length: {stats['avg_word_length']:.1f} | Avg sentence length: {stats['a
         
         return report
 
+class RollingToneAnalysis:
+    """
+    Tone analysis of a growing text, such as a transcript that arrives chunk by chunk.
+    append() only scans the new piece: lexicon matching resumes from the saved
+    automaton state and punctuation, word and sentence counts are accumulated, so
+    the total work is linear in the final text length. result() equals
+    analyze_tone(' '.join(pieces)) for the stripped, non-empty pieces appended so far.
+    """
+    def __init__(self, analyzer, separator=' '):
+        self.analyzer = analyzer
+        self.separator = separator
+        self.pieces = 0
+        self._state = 0
+        self._found = set()
+        self._punct = dict.fromkeys(PUNCTUATION_FEATURES, 0)
+        self._word_count = 0
+        self._word_length_total = 0
+        self._char_count = 0
+        self._sentence_count = 0
+        # Whether the text so far ends inside a sentence (one the next piece continues)
+        self._open_sentence = False
+    
+    def append(self, piece):
+        """Add the next piece of text; empty pieces are ignored."""
+        piece = piece.strip() if isinstance(piece, str) else ''
+        if not piece:
+            return
+        if self.pieces:
+            self._char_count += len(self.separator)
+            self._state, _ = self.analyzer.lexicon_matcher.scan(self.separator, self._state, self._found)
+        self.pieces += 1
+        
+        self._state, _ = self.analyzer.lexicon_matcher.scan(piece.lower(), self._state, self._found)
+        features = TextFeatures(piece)
+        for feature, count in features.punctuation_counts().items():
+            self._punct[feature] += count
+        
+        self._word_count += features.word_count
+        self._word_length_total += features.word_length_total
+        self._char_count += len(piece)
+        
+        # A sentence left open by the previous piece continues into this one
+        self._sentence_count += features.sentence_count
+        if self._open_sentence and features.first_sentence_open:
+            self._sentence_count -= 1
+        self._open_sentence = features.last_sentence_open
+    
+    def result(self):
+        """Tone analysis of everything appended so far, in analyze_tone's format."""
+        if not self.pieces:
+            return self.analyzer._get_empty_analysis()
+        
+        text_stats = {
+            'word_count': self._word_count,
+            'char_count': self._char_count,
+            'sentence_count': self._sentence_count,
+            'avg_word_length': self._word_length_total / self._word_count if self._word_count else 0,
+            'avg_sentence_length': self._word_count / self._sentence_count if self._sentence_count else 0
+        }
+        matches = self.analyzer.lexicon_matcher.matches_for_ids(self._found)
+        return self.analyzer._score_analysis(text_stats, matches, dict(self._punct))
+
 # Example usage and testing
 if __name__ == '__main__':
     analyzer = ToneAnalyzer()
@@ -0,0 +1,175 @@
+import itertools
+import json
+
+import numpy as np
+import pytest
+
+from flag_rules import (DEFAULT_RULES_PATH, EMOTION_LABELS, SENTIMENT_LABELS, STATUS_LABELS, TONE_LABELS, RuleError,
+                        RuleFile, compile_rules)
+from red_green_flag import FlagDetector
+
+VERY_NEGATIVE_RULE = {
+    'id': 'very_negative_emotion',
+    'kind': 'red',
+    'message': "Very negative emotion detected.",
+    'when': {'emotion': ["Very Negative"]}
+}
+
+
+def test_rule_on_model_label_compiles_and_fires():
+    detector = FlagDetector(rules={'rules': [VERY_NEGATIVE_RULE]})
+
+    assert detector.detect_flags("Neutral", "Very Negative", "neutral")['red_flags'] == ["Very negative emotion detected."]
+    assert detector.detect_flags("Neutral", "Negative", "neutral")['red_flags'] == []
+    batch = detector.detect_flags_batch(*detector.encode(["Neutral", "Neutral"], ["Very Negative", "joy"],
+                                                         ["neutral", "neutral"]), messages=True)
+    assert [flags['overall_status'] for flags in batch] == ["Red Flag", "Neutral"]
+
+
+def test_labels_section_extends_vocabulary():
+    rule = dict(VERY_NEGATIVE_RULE, when={'emotion': ["optimism"]})
+    with pytest.raises(RuleError, match="unknown emotion label 'optimism'"):
+        compile_rules({'rules': [rule]})
+
+    rules = compile_rules({'rules': [rule], 'labels': {'emotion': ["optimism"]}})
+    emotion_codes = rules.codes[1]
+    assert emotion_codes["anger"] == 1
+    assert int(rules.evaluate((0, emotion_codes["optimism"], 0))) == 1
+    assert int(rules.evaluate((0, emotion_codes["anger"], 0))) == 0
+
+
+def _baseline_flags(sentiment_label, emotion_label, dominant_tone):
+    """The hand-written rules FlagDetector had before they moved to rules/flag_rules.yaml."""
+    red_flags, green_flags = [], []
+    if sentiment_label == "Negative":
+        red_flags.append("Overall negative sentiment detected.")
+    elif sentiment_label == "Positive":
+        green_flags.append("Overall positive sentiment detected.")
+    if emotion_label in ["anger", "fear", "disgust", "sadness"]:
+        red_flags.append(f"Strong emotion of '{emotion_label}' detected.")
+    elif emotion_label == "joy":
+        green_flags.append("Emotion of 'joy' detected.")
+    if dominant_tone == "aggressive":
+        red_flags.append("Aggressive tone detected.")
+    elif dominant_tone == "confident":
+        green_flags.append("Confident tone detected.")
+    elif dominant_tone == "tentative":
+        red_flags.append("Tentative tone detected, indicating uncertainty or hesitation.")
+    elif dominant_tone == "emotional":
+        red_flags.append("Highly emotional tone detected.")
+    if (sentiment_label, emotion_label, dominant_tone) == ("Negative", "anger", "aggressive"):
+        red_flags.append("Critical combination: Negative sentiment, anger, and aggressive tone.")
+    if (sentiment_label, emotion_label, dominant_tone) == ("Positive", "joy", "confident"):
+        green_flags.append("Excellent combination: Positive sentiment, joy, and confident tone.")
+    status = STATUS_LABELS[bool(red_flags) + 2 * bool(green_flags)]
+    return {"overall_status": status, "red_flags": red_flags, "green_flags": green_flags}
+
+
+def test_shipped_rules_match_baseline_for_every_label_combination():
+    detector = FlagDetector(rules_file=DEFAULT_RULES_PATH)
+    combinations = list(itertools.product(SENTIMENT_LABELS + ("unknown",), EMOTION_LABELS + ("unknown",),
+                                          TONE_LABELS + ("unknown",)))
+    batch = detector.detect_flags_batch(*detector.encode(*zip(*combinations)), messages=True)
+    statuses = detector.detect_flags_batch(*detector.encode(*zip(*combinations)))['status']
+
+    for labels, batch_flags, status in zip(combinations, batch, statuses):
+        expected = _baseline_flags(*labels)
+        assert detector.detect_flags(*labels) == expected, labels
+        assert batch_flags == expected, labels
+        assert STATUS_LABELS[status] == expected['overall_status'], labels
+
+
+def test_label_table_and_static_rules():
+    rules = compile_rules({'rules': [
+        {'id': 'negative', 'kind': 'red', 'message': "neg", 'when': {'sentiment': "Negative"}},
+        {'id': 'angry_or_aggressive', 'kind': 'red', 'message': "anger",
+         'when': {'emotion': ["anger"], 'tone': ["aggressive", "emotional"]}},
+        {'id': 'strong', 'kind': 'red', 'message': "strong", 'when': {'compound': {'lte': -0.5}}}
+    ]})
+    sentiment_codes, emotion_codes, tone_codes = rules.codes
+    negative = sentiment_codes["Negative"]
+    anger, joy = emotion_codes["anger"], emotion_codes["joy"]
+    aggressive, emotional = tone_codes["aggressive"], tone_codes["emotional"]
+
+    assert rules.static_mask == 0b011
+    assert [rule.id for rule in rules.dynamic_rules] == ['strong']
+    assert int(rules.label_table[negative, joy, aggressive]) == 0b101
+    assert int(rules.label_table[0, anger, emotional]) == 0b110
+    assert int(rules.label_table[0, anger, 0]) == 0b100
+
+
+def test_score_rules_skip_missing_scores():
+    detector = FlagDetector(rules={'rules': [
+        {'id': 'strong', 'kind': 'red', 'message': "strong", 'when': {'compound': {'lte': -0.5}}},
+        {'id': 'confident', 'kind': 'green', 'message': "sure", 'when': {'emotion_score': {'gte': 0.8}}}
+    ]})
+    compound = [-0.9, -0.1, np.nan, -0.6]
+    emotion_score = [0.9, np.nan, 0.95, 0.1]
+
+    batch = detector.detect_flags_batch(*detector.encode(["Neutral"] * 4, [None] * 4, ["neutral"] * 4),
+                                        scores={'compound': np.array(compound), 'emotion_score': np.array(emotion_score)},
+                                        messages=True)
+    scalar = [detector.detect_flags("Neutral", None, "neutral", {'compound': c, 'emotion_score': e})
+              for c, e in zip(compound, emotion_score)]
+    assert batch == scalar
+    assert [flags['overall_status'] for flags in batch] == [
+        "Mixed (Both Red and Green Flags)", "Neutral", "Green Flag", "Red Flag"]
+    assert detector.detect_flags("Neutral", None, "neutral")['overall_status'] == "Neutral"
+
+
+def test_requires_follows_dependency_order():
+    detector = FlagDetector(rules={'rules': [
+        {'id': 'both', 'kind': 'red', 'message': "both", 'requires': ['negative', 'strong']},
+        {'id': 'strong', 'kind': 'red', 'message': "strong", 'when': {'compound': {'lte': -0.5}}},
+        {'id': 'negative', 'kind': 'red', 'message': "neg", 'when': {'sentiment': ["Negative"]}}
+    ]})
+    assert [rule.id for rule in detector.rules.dynamic_rules] == ['strong', 'both']
+
+    flags = detector.detect_flags("Negative", None, "neutral", {'compound': -0.7})
+    # Flags stay in file order even though 'both' is evaluated last
+    assert flags['red_flags'] == ["both", "strong", "neg"]
+    assert detector.detect_flags("Negative", None, "neutral", {'compound': 0.2})['red_flags'] == ["neg"]
+
+
+@pytest.mark.parametrize('rules, message', [
+    ([{'id': 'a', 'kind': 'red', 'message': "a", 'requires': ['b']},
+      {'id': 'b', 'kind': 'red', 'message': "b", 'requires': ['a']}], "dependency cycle: a -> b -> a"),
+    ([{'id': 'a', 'kind': 'red', 'message': "a", 'requires': ['missing']}], "requires unknown rule 'missing'"),
+    ([{'id': 'a', 'kind': 'red', 'message': "a"}, {'id': 'a', 'kind': 'green', 'message': "b"}], "Duplicate rule id"),
+    ([{'id': 'a', 'kind': 'amber', 'message': "a"}], "'kind' must be one of"),
+    ([{'id': 'a', 'kind': 'red', 'message': "a", 'when': {'compound': {'about': 1}}}], "unknown comparison"),
+])
+def test_invalid_rules_are_rejected(rules, message):
+    with pytest.raises(RuleError, match=message):
+        compile_rules({'rules': rules})
+
+
+def _write_rules(path, rules):
+    path.write_text(json.dumps({'rules': rules}))
+
+
+def test_rule_file_hot_reload(tmp_path):
+    path = tmp_path / "rules.json"
+    _write_rules(path, [VERY_NEGATIVE_RULE])
+    rule_file = RuleFile(str(path), check_interval=0)
+    detector = FlagDetector(rules_file=str(path), reload_interval=0)
+    old_rules = rule_file.current()
+    old_codes = detector.encode(["Neutral"], ["Very Negative"], ["neutral"])
+
+    joy_rule = {'id': 'joy', 'kind': 'green', 'message': "Joy detected.", 'when': {'emotion': ["joy"]}}
+    _write_rules(path, [VERY_NEGATIVE_RULE, joy_rule])
+    assert rule_file.current() is not old_rules
+    assert rule_file.reloads == 1
+    assert [rule.id for rule in rule_file.current().rules] == ['very_negative_emotion', 'joy']
+    assert detector.detect_flags("Neutral", "joy", "neutral")['green_flags'] == ["Joy detected."]
+    # Codes encoded before the reload still mean the same labels
+    assert detector.detect_flags_batch(*old_codes, messages=True)[0]['red_flags'] == ["Very negative emotion detected."]
+
+    path.write_text("{not json")
+    active = rule_file.current()
+    assert rule_file.last_error is not None
+    assert [rule.id for rule in active.rules] == ['very_negative_emotion', 'joy']
+
+    _write_rules(path, [joy_rule])
+    assert [rule.id for rule in rule_file.current().rules] == ['joy']
+    assert rule_file.last_error is None
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from assets import AssetUnavailableError, ensure_nltk_resource
+import score_corpus
+
+
+@pytest.fixture(autouse=True)
+def vader_lexicon():
+    try:
+        ensure_nltk_resource('vader_lexicon')
+    except AssetUnavailableError:
+        pytest.skip("NLTK vader_lexicon is not installed")
+
+
+def test_main_scores_through_process_pool(tmp_path):
+    texts = ["I love you, thank you!", "This is STUPID and I hate it!!", "", "ok", "maybe we could talk later?"]
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text("".join(json.dumps({'id': f"m{i}", 'text': text}) + "\n" for i, text in enumerate(texts)))
+    output = tmp_path / "scores.jsonl"
+
+    score_corpus.main([str(corpus), str(output), '--workers', '2', '--shard-size', '2'])
+
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row['id'] for row in rows] == [f"m{i}" for i in range(len(texts))]
+    assert rows[1]['sentiment_label'] == "Negative"
+    assert all(row['overall_status'] for row in rows)
+
+
+def test_resume_refuses_changed_configuration(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text(json.dumps({'id': "m0", 'text': "thank you"}) + "\n")
+    output = tmp_path / "scores.jsonl"
+    score_corpus.main([str(corpus), str(output), '--workers', '1'])
+
+    with pytest.raises(ValueError, match="use another --shard-dir"):
+        score_corpus.main([str(corpus), str(output), '--workers', '1', '--text-field', 'message'])
+
+
+def test_parquet_merge_widens_first_shard_types(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    row = {'compound': 0.0, 'pos': 0.0, 'neu': 1.0, 'neg': 0.0, 'sentiment_label': "Neutral",
+           'emotion_label': None, 'emotion_score': None, 'dominant_tone': "neutral", 'tone_confidence': 0.0,
+           'overall_status': "Neutral", 'red_flags': [], 'green_flags': []}
+    shards = [
+        [dict(row, id=0), dict(row, id="m1")],
+        [dict(row, id=2, emotion_label="anger", emotion_score=0.9, overall_status="Red Flag",
+              red_flags=["Strong emotion of 'anger' detected."])]
+    ]
+    for shard_index, rows in enumerate(shards):
+        with open(score_corpus.shard_path_for(str(tmp_path), shard_index), 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(shard_row) + "\n" for shard_row in rows)
+    output = tmp_path / "scores.parquet"
+
+    assert score_corpus._merge_shards(str(tmp_path), len(shards), str(output)) == 3
+
+    table = pq.read_table(output)
+    assert table.column('id').to_pylist() == ["0", "m1", "2"]
+    assert table.column('emotion_label').to_pylist() == [None, None, "anger"]
+    assert table.column('red_flags').to_pylist() == [[], [], ["Strong emotion of 'anger' detected."]]
@@ -0,0 +1,11 @@
+from segmented_analysis import fit_token_budget, split_words
+
+
+def test_token_costs_match_word_windows_when_every_word_is_one_token():
+    for n_words in range(1, 20):
+        assert split_words(n_words, 5, 3, costs=[1] * n_words) == split_words(n_words, 5, 3)
+
+
+def test_fit_token_budget_splits_only_segments_over_budget():
+    costs = [1, 5, 2, 9, 1, 1, 1, 3]
+    assert fit_token_budget([(0, 4), (4, 8)], costs, 6) == [(0, 2), (2, 3), (3, 4), (4, 8)]
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import threading
+
+from server import AnalysisServer
+
+
+class EchoPipeline:
+    def run_batch(self, texts):
+        return [{'text': text} for text in texts]
+
+
+async def _exchange(server, raw):
+    """Send raw request bytes to a running server and return (status, headers, body)."""
+    port = server._server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, body
+
+
+def _serve(raw, pipeline=None, **options):
+    async def scenario():
+        server = AnalysisServer(pipeline or EchoPipeline(), **options)
+        await server.start(port=0)
+        try:
+            return await _exchange(server, raw)
+        finally:
+            await server.close()
+    return asyncio.run(scenario())
+
+
+def _post(path, payload):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    return (f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode() + body
+
+
+class BlockingPipeline(EchoPipeline):
+    def __init__(self):
+        self.release = threading.Event()
+
+    def run_batch(self, texts):
+        self.release.wait(5)
+        return super().run_batch(texts)
+
+
+def test_analyze_batch_returns_results_in_order():
+    status, _, body = _serve(_post('/analyze/batch', {'texts': ["a", "b", "c"]}))
+    assert status == 200
+    assert json.loads(body) == [{'text': "a"}, {'text': "b"}, {'text': "c"}]
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    pipeline = BlockingPipeline()
+
+    async def scenario():
+        server = AnalysisServer(pipeline, max_queue=1)
+        await server.start(port=0)
+        try:
+            first = asyncio.ensure_future(_exchange(server, _post('/analyze', {'text': "first"})))
+            while server.batcher.pending < 1:
+                await asyncio.sleep(0.01)
+            rejected = await _exchange(server, _post('/analyze', {'text': "second"}))
+            pipeline.release.set()
+            return rejected, await first
+        finally:
+            pipeline.release.set()
+            await server.close()
+
+    (status, headers, _), (first_status, _, first_body) = asyncio.run(scenario())
+    assert status == 503
+    assert headers['Retry-After'] == '1'
+    assert first_status == 200
+    assert json.loads(first_body) == {'text': "first"}
+
+
+def test_batch_larger_than_queue_gets_413():
+    status, _, body = _serve(_post('/analyze/batch', {'texts': ["a", "b", "c"]}), max_queue=2)
+    assert status == 413
+    assert "at most 2" in json.loads(body)['error']
+
+
+def test_oversize_body_gets_413():
+    raw = b"POST /analyze HTTP/1.1\r\nContent-Length: 2000000\r\n\r\n"
+    status, headers, _ = _serve(raw)
+    assert status == 413
+    assert headers['Connection'] == 'close'
+
+
+def test_negative_content_length_gets_400():
+    status, _, body = _serve(b"POST /analyze HTTP/1.1\r\nContent-Length: -5\r\n\r\n")
+    assert status == 400
+    assert json.loads(body) == {'error': "Invalid Content-Length"}
+
+
+def test_oversize_header_line_gets_431():
+    raw = b"GET /healthz HTTP/1.1\r\nX-Long: " + b"a" * 70000 + b"\r\n\r\n"
+    status, headers, body = _serve(raw)
+    assert status == 431
+    assert headers['Connection'] == 'close'
+    assert json.loads(body) == {'error': "Header line too long"}
@@ -0,0 +1,8 @@
+from text_preprocessing import iter_texts
+
+
+def test_iter_texts_skips_jsonl_lines_that_are_not_objects(tmp_path):
+    corpus = tmp_path / "messages.jsonl"
+    corpus.write_text('{"text": "hello"}\n"just a string"\n42\n[1, 2]\n\n{"text": 7}\n{"text": "bye"}\n')
+
+    assert list(iter_texts(str(corpus))) == ["hello", "bye"]